@@ -10,7 +10,7 @@ from alembic import context
 from app.core.database import Base
 from app.campaigns.models import Campaign
 from app.schedules.models import CampaignSchedule
-from app.evaluations.models import RuleEvaluationLog
+from app.evaluations.models import RuleEvaluationLog, EvaluationShardLease
 
 config = context.config
 
@@ -0,0 +1,24 @@
+"""evaluation fingerprint
+
+Revision ID: 3f9a6c1d2b7e
+Revises: 0d42979d1ae8
+Create Date: 2026-10-18 10:12:41.532118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a6c1d2b7e'
+down_revision = '0d42979d1ae8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('campaigns', sa.Column('evaluation_fingerprint', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('campaigns', 'evaluation_fingerprint')
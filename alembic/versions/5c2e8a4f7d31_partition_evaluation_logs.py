@@ -0,0 +1,107 @@
+"""partition evaluation logs
+
+Revision ID: 5c2e8a4f7d31
+Revises: 3f9a6c1d2b7e
+Create Date: 2026-10-18 11:02:17.204913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e8a4f7d31'
+down_revision = '3f9a6c1d2b7e'
+branch_labels = None
+depends_on = None
+
+
+# Партиций вперед от текущей даты (дальше их создает PartitionMaintenanceJob)
+PARTITIONS_AHEAD = 3
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE rule_evaluation_logs RENAME TO rule_evaluation_logs_old")
+    op.execute("ALTER INDEX rule_evaluation_logs_pkey RENAME TO rule_evaluation_logs_old_pkey")
+    op.execute(
+        "ALTER TABLE rule_evaluation_logs_old "
+        "RENAME CONSTRAINT rule_evaluation_logs_campaign_id_fkey TO rule_evaluation_logs_old_campaign_id_fkey"
+    )
+
+    op.execute("""
+        CREATE TABLE rule_evaluation_logs (
+            id UUID NOT NULL,
+            campaign_id UUID NOT NULL,
+            triggered_rule triggeredrule,
+            previous_target campaignstatus,
+            new_target campaignstatus NOT NULL,
+            context JSON NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+            CONSTRAINT rule_evaluation_logs_pkey PRIMARY KEY (id, created_at),
+            CONSTRAINT rule_evaluation_logs_campaign_id_fkey FOREIGN KEY (campaign_id)
+                REFERENCES campaigns (id) ON DELETE CASCADE
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.create_index(
+        'ix_rule_evaluation_logs_campaign_created',
+        'rule_evaluation_logs',
+        ['campaign_id', 'created_at'],
+    )
+    op.execute("CREATE TABLE rule_evaluation_logs_default PARTITION OF rule_evaluation_logs DEFAULT")
+
+    # Дневные партиции от самой старой записи до PARTITIONS_AHEAD дней вперед
+    op.execute(f"""
+        DO $$
+        DECLARE
+            day date;
+        BEGIN
+            FOR day IN
+                SELECT generate_series(
+                    LEAST(COALESCE(MIN(created_at)::date, CURRENT_DATE), CURRENT_DATE),
+                    CURRENT_DATE + {PARTITIONS_AHEAD},
+                    interval '1 day'
+                )::date
+                FROM rule_evaluation_logs_old
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF rule_evaluation_logs FOR VALUES FROM (%L) TO (%L)',
+                    'rule_evaluation_logs_p' || to_char(day, 'YYYYMMDD'),
+                    day,
+                    day + 1
+                );
+            END LOOP;
+        END $$
+    """)
+
+    op.execute("""
+        INSERT INTO rule_evaluation_logs
+            (id, campaign_id, triggered_rule, previous_target, new_target, context, created_at)
+        SELECT id, campaign_id, triggered_rule, previous_target, new_target, context,
+               COALESCE(created_at, now())
+        FROM rule_evaluation_logs_old
+    """)
+    op.drop_table('rule_evaluation_logs_old')
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE rule_evaluation_logs RENAME TO rule_evaluation_logs_partitioned")
+    op.execute("ALTER INDEX rule_evaluation_logs_pkey RENAME TO rule_evaluation_logs_partitioned_pkey")
+    op.create_table('rule_evaluation_logs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('campaign_id', sa.UUID(), nullable=False),
+    sa.Column('triggered_rule', postgresql.ENUM('DISABLED_MANAGEMENT', 'SCHEDULE', 'LOW_STOCK', 'BUDGET_EXCEEDED', 'NO_RESTRICTIONS', name='triggeredrule', create_type=False), nullable=True),
+    sa.Column('previous_target', postgresql.ENUM('ACTIVE', 'PAUSED', name='campaignstatus', create_type=False), nullable=True),
+    sa.Column('new_target', postgresql.ENUM('ACTIVE', 'PAUSED', name='campaignstatus', create_type=False), nullable=False),
+    sa.Column('context', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id'], ondelete='CASCADE', name='rule_evaluation_logs_campaign_id_fkey'),
+    sa.PrimaryKeyConstraint('id', name='rule_evaluation_logs_pkey')
+    )
+    op.execute("""
+        INSERT INTO rule_evaluation_logs
+            (id, campaign_id, triggered_rule, previous_target, new_target, context, created_at)
+        SELECT id, campaign_id, triggered_rule, previous_target, new_target, context, created_at
+        FROM rule_evaluation_logs_partitioned
+    """)
+    op.execute("DROP TABLE rule_evaluation_logs_partitioned CASCADE")
@@ -0,0 +1,35 @@
+"""history keyset index
+
+Revision ID: 8b1d4e6a9c20
+Revises: 5c2e8a4f7d31
+Create Date: 2026-10-18 11:48:03.611457
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1d4e6a9c20'
+down_revision = '5c2e8a4f7d31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_rule_evaluation_logs_campaign_created_id',
+        'rule_evaluation_logs',
+        ['campaign_id', sa.text('created_at DESC'), sa.text('id DESC')],
+    )
+    # Новый индекс покрывает тот же префикс (campaign_id, created_at)
+    op.drop_index('ix_rule_evaluation_logs_campaign_created', table_name='rule_evaluation_logs')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'ix_rule_evaluation_logs_campaign_created',
+        'rule_evaluation_logs',
+        ['campaign_id', 'created_at'],
+    )
+    op.drop_index('ix_rule_evaluation_logs_campaign_created_id', table_name='rule_evaluation_logs')
@@ -0,0 +1,38 @@
+"""evaluation hot path indexes
+
+Revision ID: a4c7e2f9b815
+Revises: 8b1d4e6a9c20
+Create Date: 2026-10-18 12:20:44.089312
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e2f9b815'
+down_revision = '8b1d4e6a9c20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # campaign_schedules.campaign_id уже покрыт uq_campaign_schedule_unique_slot (ведущая колонка)
+    op.create_index(
+        'ix_campaigns_needs_sync', 'campaigns', ['id'],
+        postgresql_where=sa.text('current_status <> target_status'),
+    )
+    op.create_index(
+        'ix_campaigns_managed', 'campaigns', ['id'],
+        postgresql_where=sa.text('is_managed'),
+    )
+    op.create_index(
+        'ix_campaigns_managed_schedule', 'campaigns', ['id'],
+        postgresql_where=sa.text('is_managed AND schedule_enabled'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_campaigns_managed_schedule', table_name='campaigns')
+    op.drop_index('ix_campaigns_managed', table_name='campaigns')
+    op.drop_index('ix_campaigns_needs_sync', table_name='campaigns')
@@ -0,0 +1,31 @@
+"""evaluation shard leases
+
+Revision ID: e1f3b7c9d245
+Revises: a4c7e2f9b815
+Create Date: 2026-10-18 12:58:10.517204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f3b7c9d245'
+down_revision = 'a4c7e2f9b815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('evaluation_shard_leases',
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('owner', sa.String(), nullable=True),
+    sa.Column('leased_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('evaluated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('shard')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('evaluation_shard_leases')
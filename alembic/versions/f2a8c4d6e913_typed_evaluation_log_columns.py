@@ -0,0 +1,104 @@
+"""typed evaluation log columns
+
+Revision ID: f2a8c4d6e913
+Revises: e1f3b7c9d245
+Create Date: 2026-10-18 14:41:52.730166
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a8c4d6e913'
+down_revision = 'e1f3b7c9d245'
+branch_labels = None
+depends_on = None
+
+
+# Колонки, которые после заполнения из context становятся NOT NULL
+NOT_NULL_COLUMNS = (
+    'current_status',
+    'is_managed',
+    'spend_today',
+    'schedule_enabled',
+    'current_weekday',
+    'schedules_count',
+    'engine_version',
+)
+
+
+def upgrade() -> None:
+    campaign_status = postgresql.ENUM('ACTIVE', 'PAUSED', name='campaignstatus', create_type=False)
+    op.add_column('rule_evaluation_logs', sa.Column('current_status', campaign_status, nullable=True))
+    op.add_column('rule_evaluation_logs', sa.Column('is_managed', sa.Boolean(), nullable=True))
+    op.add_column('rule_evaluation_logs', sa.Column('budget_limit', sa.Numeric(precision=10, scale=2), nullable=True))
+    op.add_column('rule_evaluation_logs', sa.Column('spend_today', sa.Numeric(precision=10, scale=2), nullable=True))
+    op.add_column('rule_evaluation_logs', sa.Column('stock_days_left', sa.Integer(), nullable=True))
+    op.add_column('rule_evaluation_logs', sa.Column('stock_days_min', sa.Integer(), nullable=True))
+    op.add_column('rule_evaluation_logs', sa.Column('schedule_enabled', sa.Boolean(), nullable=True))
+    op.add_column('rule_evaluation_logs', sa.Column('current_weekday', sa.SmallInteger(), nullable=True))
+    op.add_column('rule_evaluation_logs', sa.Column('schedules_count', sa.SmallInteger(), nullable=True))
+    op.add_column('rule_evaluation_logs', sa.Column('schedule_excerpt', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('rule_evaluation_logs', sa.Column('engine_version', sa.String(length=16), nullable=True))
+
+    # В context статус хранился значением enum ('active'), в колонке - именем ('ACTIVE')
+    op.execute("""
+        UPDATE rule_evaluation_logs SET
+            current_status = upper(context->>'current_status')::campaignstatus,
+            is_managed = (context->>'is_managed')::boolean,
+            budget_limit = (context->>'budget_limit')::numeric,
+            spend_today = (context->>'spend_today')::numeric,
+            stock_days_left = (context->>'stock_days_left')::integer,
+            stock_days_min = (context->>'stock_days_min')::integer,
+            schedule_enabled = (context->>'schedule_enabled')::boolean,
+            current_weekday = COALESCE(
+                (context->>'current_weekday')::smallint,
+                (extract(isodow FROM created_at) - 1)::smallint
+            ),
+            schedules_count = COALESCE((context->>'schedules_count')::smallint, 0),
+            schedule_excerpt = (
+                SELECT jsonb_agg(jsonb_build_array(slot->'day', slot->'start', slot->'end'))
+                FROM json_array_elements(context->'schedules') AS slot
+            ),
+            engine_version = COALESCE(context->>'engine_version', '1.0')
+    """)
+    for column in NOT_NULL_COLUMNS:
+        op.alter_column('rule_evaluation_logs', column, nullable=False)
+    op.drop_column('rule_evaluation_logs', 'context')
+
+
+def downgrade() -> None:
+    op.add_column('rule_evaluation_logs', sa.Column('context', sa.JSON(), nullable=True))
+    op.execute("""
+        UPDATE rule_evaluation_logs SET context = json_build_object(
+            'current_status', lower(current_status::text),
+            'is_managed', is_managed,
+            'budget_limit', CASE WHEN budget_limit <> 0 THEN budget_limit::text END,
+            'spend_today', spend_today::text,
+            'stock_days_left', stock_days_left,
+            'stock_days_min', stock_days_min,
+            'schedule_enabled', schedule_enabled,
+            'current_time', created_at,
+            'current_weekday', current_weekday,
+            'schedules_count', schedules_count,
+            'schedules', COALESCE((
+                SELECT json_agg(json_build_object('day', slot->0, 'start', slot->1, 'end', slot->2))
+                FROM jsonb_array_elements(schedule_excerpt) AS slot
+            ), '[]'::json),
+            'engine_version', engine_version
+        )
+    """)
+    op.alter_column('rule_evaluation_logs', 'context', nullable=False)
+    op.drop_column('rule_evaluation_logs', 'engine_version')
+    op.drop_column('rule_evaluation_logs', 'schedule_excerpt')
+    op.drop_column('rule_evaluation_logs', 'schedules_count')
+    op.drop_column('rule_evaluation_logs', 'current_weekday')
+    op.drop_column('rule_evaluation_logs', 'schedule_enabled')
+    op.drop_column('rule_evaluation_logs', 'stock_days_min')
+    op.drop_column('rule_evaluation_logs', 'stock_days_left')
+    op.drop_column('rule_evaluation_logs', 'spend_today')
+    op.drop_column('rule_evaluation_logs', 'budget_limit')
+    op.drop_column('rule_evaluation_logs', 'is_managed')
+    op.drop_column('rule_evaluation_logs', 'current_status')
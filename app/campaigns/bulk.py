@@ -0,0 +1,193 @@
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
+
+from pydantic import ValidationError
+from sqlalchemy import Boolean, and_, any_, bindparam, case, false, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from .models import Campaign
+from .schemas import CampaignCreate, CampaignBulkError, CampaignBulkResponse, CampaignMetricsUpdate
+
+NDJSON = "application/x-ndjson"
+TOO_MANY_ROWS = "At most {max_rows} rows per request"
+
+
+class TooManyRows(Exception):
+    pass
+
+
+def _validation_errors(exc: ValidationError) -> List[Dict[str, Any]]:
+    return exc.errors(include_url=False, include_context=False, include_input=False)
+
+
+class CampaignBulkIngest:
+    """
+    Массовое создание кампаний: строки валидируются и пишутся порциями по
+    chunk_size одним многострочным INSERT. Ошибка строки не прерывает
+    остальные: невалидные строки пропускаются, а если INSERT порции упал
+    в БД, порция откатывается до savepoint и вставляется построчно, чтобы
+    найти виноватые строки. Коммит делает вызывающий
+    """
+
+    def __init__(self, db: AsyncSession, chunk_size: Optional[int] = None, max_rows: Optional[int] = None):
+        self.db = db
+        self.chunk_size = chunk_size or settings.CAMPAIGN_BULK_CHUNK_SIZE
+        self.max_rows = max_rows or settings.CAMPAIGN_BULK_MAX_ROWS
+        self.ids: List[Optional[UUID]] = []
+        self.errors: List[CampaignBulkError] = []
+        self._chunk: List[Tuple[int, dict]] = []
+
+    async def add(self, raw: Any) -> None:
+        """Добавляет строку входных данных (разобранный JSON или ошибка разбора)"""
+        index = len(self.ids)
+        if index >= self.max_rows:
+            raise TooManyRows(TOO_MANY_ROWS.format(max_rows=self.max_rows))
+        self.ids.append(None)
+
+        if isinstance(raw, ValueError):
+            self._fail(index, [{"type": "json_invalid", "loc": [], "msg": str(raw)}])
+            return
+        try:
+            data = CampaignCreate.model_validate(raw)
+        except ValidationError as exc:
+            self._fail(index, _validation_errors(exc))
+            return
+
+        self._chunk.append((index, {"id": uuid4(), **data.model_dump()}))
+        if len(self._chunk) >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        chunk, self._chunk = self._chunk, []
+        if not chunk:
+            return
+        try:
+            await self._insert([row for _, row in chunk])
+        except DBAPIError:
+            # Построчно: находим строки, которые не принимает БД (переполнение Numeric и т.п.)
+            for index, row in chunk:
+                try:
+                    await self._insert([row])
+                except DBAPIError as exc:
+                    self._fail(index, [{"type": "db_error", "loc": [], "msg": str(exc.orig)}])
+                else:
+                    self.ids[index] = row["id"]
+            return
+        for index, row in chunk:
+            self.ids[index] = row["id"]
+
+    async def _insert(self, rows: List[dict]) -> None:
+        async with self.db.begin_nested():
+            await self.db.execute(insert(Campaign.__table__), rows)
+
+    def _fail(self, index: int, errors: List[Dict[str, Any]]) -> None:
+        self.errors.append(CampaignBulkError(index=index, errors=errors))
+
+    def result(self) -> CampaignBulkResponse:
+        errors = sorted(self.errors, key=lambda error: error.index)
+        return CampaignBulkResponse(
+            created=len(self.ids) - len(errors),
+            failed=len(errors),
+            ids=self.ids,
+            errors=errors
+        )
+
+
+async def ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """
+    Строки NDJSON из потока тела запроса по мере поступления.
+    Пустые строки пропускаются, невалидный JSON отдается как ValueError
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse(line)
+    if buffer.strip():
+        yield _parse(buffer)
+
+
+def _parse(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as exc:
+        return exc
+
+
+def _budget_exceeded(campaigns):
+    return func.coalesce(campaigns.c.spend_today >= campaigns.c.budget_limit, false())
+
+
+def _low_stock(campaigns):
+    return func.coalesce(campaigns.c.stock_days_left < campaigns.c.stock_days_min, false())
+
+
+async def update_metrics(
+    db: AsyncSession,
+    updates: Sequence[CampaignMetricsUpdate]
+) -> Tuple[List[UUID], List[UUID]]:
+    """
+    Обновляет spend_today и stock_days_left одним UPDATE ... FROM unnest(...).
+    Меняются только переданные поля; строки, где значения не изменились, не
+    переписываются. Возвращает id измененных кампаний и id тех из них
+    (управляемых), у которых сменился исход правила бюджета или остатков.
+    Коммит делает вызывающий
+    """
+    # Повтор id в одном запросе: побеждает последняя строка
+    latest = {item.id: item for item in updates}
+    if not latest:
+        return [], []
+    items = list(latest.values())
+
+    campaigns = Campaign.__table__
+    previous = campaigns.alias("previous")
+
+    def array(name, values, column):
+        return bindparam(name, values, type_=ARRAY(column.type))
+
+    metrics = func.unnest(
+        array("ids", [item.id for item in items], campaigns.c.id),
+        array("spend", [item.spend_today for item in items], campaigns.c.spend_today),
+        array("stock", [item.stock_days_left for item in items], campaigns.c.stock_days_left),
+        bindparam("set_spend", ["spend_today" in item.model_fields_set for item in items], type_=ARRAY(Boolean)),
+        bindparam("set_stock", ["stock_days_left" in item.model_fields_set for item in items], type_=ARRAY(Boolean)),
+    ).table_valued("id", "spend_today", "stock_days_left", "set_spend", "set_stock").render_derived(name="metrics")
+
+    changed_spend = and_(metrics.c.set_spend, campaigns.c.spend_today.is_distinct_from(metrics.c.spend_today))
+    changed_stock = and_(metrics.c.set_stock, campaigns.c.stock_days_left.is_distinct_from(metrics.c.stock_days_left))
+
+    # previous - та же строка до UPDATE: RETURNING видит campaigns уже с новыми значениями
+    affected = and_(
+        campaigns.c.is_managed,
+        or_(
+            _budget_exceeded(previous) != _budget_exceeded(campaigns),
+            _low_stock(previous) != _low_stock(campaigns)
+        )
+    )
+
+    stmt = (
+        update(campaigns)
+        .where(campaigns.c.id == metrics.c.id, previous.c.id == campaigns.c.id, or_(changed_spend, changed_stock))
+        .values(
+            spend_today=case((metrics.c.set_spend, metrics.c.spend_today), else_=campaigns.c.spend_today),
+            stock_days_left=case((metrics.c.set_stock, metrics.c.stock_days_left), else_=campaigns.c.stock_days_left)
+        )
+        .returning(campaigns.c.id, affected)
+    )
+    rows = (await db.execute(stmt)).all()
+    return [row[0] for row in rows], [row[0] for row in rows if row[1]]
+
+
+async def missing_campaigns(db: AsyncSession, ids: Sequence[UUID]) -> List[UUID]:
+    """Id из списка, которых нет в БД"""
+    if not ids:
+        return []
+    stmt = select(Campaign.id).where(Campaign.id == any_(bindparam("ids", list(ids), type_=ARRAY(Campaign.id.type))))
+    existing = set((await db.execute(stmt)).scalars())
+    return [campaign_id for campaign_id in ids if campaign_id not in existing]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Numeric, Integer, DateTime, Enum
+from sqlalchemy import Column, String, Boolean, Numeric, Integer, BigInteger, DateTime, Enum, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -20,5 +20,21 @@ class Campaign(Base):
     stock_days_left = Column(Integer, nullable=True)
     stock_days_min = Column(Integer, nullable=True)
     schedule_enabled = Column(Boolean, nullable=False, default=False)
+    evaluation_fingerprint = Column(BigInteger, nullable=True)  # отпечаток входов последнего лога
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+
+    __table_args__ = (
+        # needs_sync=true в списке кампаний (ORDER BY id)
+        Index(
+            "ix_campaigns_needs_sync", "id",
+            postgresql_where=text("current_status <> target_status")
+        ),
+        # evaluate-all: управляемые кампании
+        Index("ix_campaigns_managed", "id", postgresql_where=text("is_managed")),
+        # evaluate-all: управляемые кампании с расписанием (загрузка слотов)
+        Index(
+            "ix_campaigns_managed_schedule", "id",
+            postgresql_where=text("is_managed AND schedule_enabled")
+        ),
+    )
@@ -1,13 +1,25 @@
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
+import json
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.core.database import get_db
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.evaluations.dirty import dirty_campaigns, evaluate_dirty
+from app.evaluations.engine import RuleEngine, get_rule_engine
+from app.evaluations.snapshots import snapshot_cache
 from .models import Campaign
-from .schemas import CampaignCreate, CampaignUpdate, CampaignResponse
+from app.core.config import settings
+from .schemas import (
+    CampaignCreate, CampaignUpdate, CampaignResponse, CampaignBulkResponse,
+    CampaignMetricsUpdate, CampaignMetricsResponse
+)
+from .bulk import (
+    NDJSON, TOO_MANY_ROWS, CampaignBulkIngest, TooManyRows, ndjson_rows, update_metrics, missing_campaigns
+)
 
 router = APIRouter()
 
@@ -25,14 +37,95 @@ async def create_campaign(
     return campaign
 
 
+@router.post(
+    "/campaigns/bulk",
+    response_model=CampaignBulkResponse,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/CampaignCreate"}}},
+        NDJSON: {"schema": {"$ref": "#/components/schemas/CampaignCreate"}},
+    }}}
+)
+async def create_campaigns_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Массовое создание кампаний: JSON-массив или NDJSON-поток (Content-Type: application/x-ndjson)
+    объектов CampaignCreate. Невалидные строки не прерывают остальные - их ошибки
+    возвращаются по номеру строки в errors, ids - id созданных кампаний по строкам
+    """
+    ingest = CampaignBulkIngest(db)
+    try:
+        if request.headers.get("content-type", "").startswith(NDJSON):
+            async for raw in ndjson_rows(request.stream()):
+                await ingest.add(raw)
+        else:
+            try:
+                rows = json.loads(await request.body())
+            except ValueError:
+                raise HTTPException(400, "Invalid JSON")
+            if not isinstance(rows, list):
+                raise HTTPException(422, "Expected a JSON array of campaigns")
+            for raw in rows:
+                await ingest.add(raw)
+    except TooManyRows as exc:
+        raise HTTPException(413, str(exc))
+    
+    await ingest.flush()
+    await db.commit()
+    return ingest.result()
+
+
+@router.post("/campaigns/metrics", response_model=CampaignMetricsResponse)
+async def update_campaign_metrics(
+    updates: List[CampaignMetricsUpdate],
+    evaluate: bool = Query(False, description="Сразу пересчитать кампании, у которых сменился исход правила бюджета или остатков"),
+    db: AsyncSession = Depends(get_db),
+    engine: RuleEngine = Depends(get_rule_engine)
+):
+    """
+    Массовое обновление spend_today и stock_days_left (синхронизация с рекламной площадкой)
+    одним UPDATE. Пересчет нужен только кампаниям из affected: с evaluate=true они
+    пересчитываются в этом запросе, иначе помечаются для инкрементального пересчета
+    """
+    if len(updates) > settings.CAMPAIGN_BULK_MAX_ROWS:
+        raise HTTPException(413, TOO_MANY_ROWS.format(max_rows=settings.CAMPAIGN_BULK_MAX_ROWS))
+    
+    updated, affected = await update_metrics(db, updates)
+    changed = set(updated)
+    not_found = await missing_campaigns(db, list(dict.fromkeys(item.id for item in updates if item.id not in changed)))
+    await db.commit()
+    
+    for campaign_id in updated:
+        snapshot_cache.invalidate(campaign_id)
+    
+    results = []
+    if evaluate:
+        rows = await evaluate_dirty(db, engine, affected) if affected else []
+        results = [
+            {"campaign_id": campaign_id, "target_status": status, "triggered_rule": rule}
+            for campaign_id, status, rule in rows
+        ]
+    else:
+        for campaign_id in affected:
+            dirty_campaigns.mark(campaign_id)
+    
+    return CampaignMetricsResponse(updated=len(updated), not_found=not_found, affected=affected, results=results)
+
+
 @router.get("/campaigns", response_model=list[CampaignResponse])
 async def list_campaigns(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     needs_sync: Optional[bool] = Query(None, description="Только кампании где current_status != target_status"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Возвращает список кампаний с пагинацией и фильтрацией"""
+    """
+    Возвращает список кампаний с пагинацией и фильтрацией.
+    С cursor - keyset-пагинация по id (skip игнорируется)
+    """
     query = select(Campaign)
     
     if needs_sync is not None:
@@ -41,9 +134,22 @@ async def list_campaigns(
         else:
             query = query.where(Campaign.current_status == Campaign.target_status)
     
-    query = query.offset(skip).limit(limit)
+    if cursor is not None:
+        (last_id,) = decode_cursor(cursor, 1)
+        try:
+            query = query.where(Campaign.id > UUID(last_id))
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+    else:
+        query = query.offset(skip)
+    
+    query = query.order_by(Campaign.id).limit(limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    campaigns = result.scalars().all()
+    
+    if len(campaigns) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(campaigns[-1].id)
+    return campaigns
 
 
 @router.get("/campaigns/{id}", response_model=CampaignResponse)
@@ -73,5 +179,7 @@ async def update_campaign(
         setattr(campaign, field, value)
     
     await db.commit()
+    snapshot_cache.invalidate(id)
+    dirty_campaigns.mark(id)
     await db.refresh(campaign)
     return campaign
\ No newline at end of file
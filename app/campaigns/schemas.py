@@ -1,10 +1,11 @@
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from decimal import Decimal
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from app.core.enums import CampaignStatus
+from app.evaluations.schemas import BulkEvaluationItem
 
 
 class CampaignBase(BaseModel):
@@ -47,4 +48,38 @@ class CampaignResponse(CampaignBase):
     created_at: datetime
     updated_at: datetime
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CampaignBulkError(BaseModel):
+    index: int  # номер строки во входных данных (с 0)
+    errors: List[Dict[str, Any]]
+
+
+class CampaignBulkResponse(BaseModel):
+    created: int
+    failed: int
+    ids: List[Optional[UUID]]  # id по строкам входных данных, None - строка не создана
+    errors: List[CampaignBulkError]
+
+
+class CampaignMetricsUpdate(BaseModel):
+    """Метрики кампании от синхронизации с рекламной площадкой; не переданное поле не меняется"""
+    id: UUID
+    # Границы колонки Numeric(10, 2): ошибка - 422 по строке, а не сбой всего UPDATE
+    spend_today: Optional[Decimal] = Field(None, ge=0, max_digits=10, decimal_places=2)
+    stock_days_left: Optional[int] = None  # null - остатки неизвестны
+
+    @field_validator('spend_today')
+    @classmethod
+    def validate_spend_today(cls, v: Optional[Decimal]) -> Decimal:
+        if v is None:
+            raise ValueError('spend_today cannot be null')
+        return v
+
+
+class CampaignMetricsResponse(BaseModel):
+    updated: int  # кампании, у которых изменилась хотя бы одна метрика
+    not_found: List[UUID]
+    affected: List[UUID]  # управляемые кампании, у которых сменился исход правила бюджета или остатков
+    results: List[BulkEvaluationItem]  # пересчет affected при evaluate=true
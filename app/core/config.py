@@ -2,6 +2,8 @@ from pydantic_settings import BaseSettings
 from pydantic import PostgresDsn, ConfigDict
 from typing import Optional
 
+from app.core.enums import EvaluationBackend, LogPolicy, OverrunPolicy
+
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Движок правил"
@@ -14,6 +16,56 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     DATABASE_URL: Optional[PostgresDsn] = None
     
+    # Пул соединений и кэш подготовленных запросов asyncpg
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30  # сек ожидания свободного соединения
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_RECYCLE: int = -1  # сек; -1 - не пересоздавать
+    DB_STATEMENT_CACHE_SIZE: int = 100  # 0 - выключен (pgbouncer transaction mode)
+    
+    # POST /campaigns/bulk: строк в одной валидации/INSERT и максимум строк в запросе
+    CAMPAIGN_BULK_CHUNK_SIZE: int = 1000
+    CAMPAIGN_BULK_MAX_ROWS: int = 100000
+    
+    # Пакетная запись логов вычислений
+    EVALUATION_LOG_BATCH_SIZE: int = 1000
+    EVALUATION_LOG_USE_COPY: bool = False
+    EVALUATION_LOG_POLICY: LogPolicy = LogPolicy.ALWAYS
+    
+    # Пересчет кампаний сразу после записи (PATCH, расписание)
+    INCREMENTAL_EVALUATION: bool = True
+    INCREMENTAL_EVALUATION_DELAY: float = 0.5  # окно схлопывания записей, сек
+    INCREMENTAL_EVALUATION_BATCH_SIZE: int = 1000
+    INCREMENTAL_EVALUATION_MAX_BACKOFF: float = 60.0  # потолок паузы после сбоев БД, сек
+    
+    # Кэш снимков кампаний в памяти процесса (0 - выключен)
+    SNAPSHOT_CACHE_SIZE: int = 0
+    
+    # LRU скомпилированных расписаний (0 - компилировать при каждом вычислении)
+    SCHEDULE_INDEX_SIZE: int = 10000
+    
+    # Дневные партиции rule_evaluation_logs
+    LOG_PARTITION_MAINTENANCE: bool = True
+    LOG_RETENTION_DAYS: int = 0  # 0 - хранить все; удаление старых партиций - явный выбор
+    LOG_PARTITIONS_AHEAD: int = 3
+    LOG_MAINTENANCE_INTERVAL: float = 3600  # сек
+    
+    # Где считать правила в evaluate-all: в процессе или одним SQL-запросом в БД
+    EVALUATION_BACKEND: EvaluationBackend = EvaluationBackend.PYTHON
+    
+    # Шардированный evaluate-all на нескольких репликах (0 - выключен)
+    EVALUATION_SHARDS: int = 0  # не больше 65536
+    EVALUATION_SHARD_LEASE_TTL: float = 300  # сек; шард должен успевать вычислиться
+    EVALUATION_WORKER_ID: Optional[str] = None  # по умолчанию hostname:pid
+    
+    # Периодический evaluate-all внутри приложения (вместо внешнего cron)
+    PERIODIC_EVALUATION: bool = False
+    PERIODIC_EVALUATION_INTERVAL: float = 60  # сек
+    PERIODIC_EVALUATION_JITTER: float = 5  # случайная добавка к ожиданию, сек
+    PERIODIC_EVALUATION_OVERRUN: OverrunPolicy = OverrunPolicy.SKIP
+    PERIODIC_EVALUATION_DUE_INTERVAL: float = 5  # evaluate-due между прогонами, сек; 0 - выключен
+    
     model_config = ConfigDict(
         env_file=".env",
         case_sensitive=True,
@@ -1,9 +1,28 @@
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.core.pool import InstrumentedPool, pool_stats
 
-engine = create_async_engine(str(settings.DATABASE_URL))
+# Кэш подготовленных запросов: в диалекте SQLAlchemy (параметр URL) и в самом
+# asyncpg. 0 отключает оба - нужно за pgbouncer в режиме transaction
+database_url = make_url(str(settings.DATABASE_URL)).update_query_dict(
+    {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+)
+
+engine = create_async_engine(
+    database_url,
+    poolclass=InstrumentedPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    connect_args={"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+)
+instrument_engine(engine, pool_stats)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
 Base = declarative_base()
@@ -11,4 +30,4 @@ Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
@@ -11,4 +11,20 @@ class TriggeredRule(str, Enum):
     SCHEDULE = "schedule"
     LOW_STOCK = "low_stock"
     BUDGET_EXCEEDED = "budget_exceeded"
-    NO_RESTRICTIONS = "no_restrictions"
\ No newline at end of file
+    NO_RESTRICTIONS = "no_restrictions"
+
+
+class LogPolicy(str, Enum):
+    ALWAYS = "always"                    # лог на каждое вычисление
+    ON_TRANSITION = "on_transition"      # только при смене target_status
+    ON_INPUT_CHANGE = "on_input_change"  # при смене входных данных или target_status
+
+
+class OverrunPolicy(str, Enum):
+    SKIP = "skip"    # пропущенные за время долгого прогона запуски отбрасываются
+    QUEUE = "queue"  # после долгого прогона следующий запускается сразу
+
+
+class EvaluationBackend(str, Enum):
+    PYTHON = "python"  # кампании читаются в процесс, правила считает RuleEngine
+    SQL = "sql"        # правила компилируются в один SQL-запрос (app/evaluations/pushdown.py)
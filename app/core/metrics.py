@@ -0,0 +1,243 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Метрики в формате Prometheus (text exposition 0.0.4).
+#
+# Значения живут в памяти процесса и меняются только из event loop, поэтому
+# обходимся без блокировок: инкремент - одна операция со словарем. При
+# нескольких воркерах uvicorn каждый отдает свои значения (per-worker метрики).
+
+LabelValues = Tuple[str, ...]
+Collector = Callable[[], Dict[LabelValues, float]]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return lines
+
+
+class Gauge(Metric):
+    """
+    Значение по набору меток: set() или функция collect, которая вызывается
+    при отдаче /metrics (для значений, которые уже считаются в другом месте)
+    """
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Collector] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, labels: LabelValues = ()) -> None:
+        self._values[labels] = value
+
+    def value(self, labels: LabelValues = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        values = self._collect() if self._collect else self._values
+        for labels, value in values.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Counter(Gauge):
+    """Монотонный счетчик; имя по соглашению Prometheus оканчивается на _total"""
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, labels: LabelValues = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> [счетчики по корзинам (не накопительные), сумма]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, labels: LabelValues = ()) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        names = self.labelnames + ("le",)
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket", _format_labels(names, labels + (_format_value(bound),)), cumulative
+            plain = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum", plain, total
+            yield f"{self.name}_count", plain, cumulative
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ("method", "route", "status")
+))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds",
+    "Время выполнения SQL-запроса (cursor.execute)",
+    buckets=DB_BUCKETS
+))
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: гистограмма времени запросов по шаблону маршрута
+    (/campaigns/{id}, а не конкретный id). Не-HTTP запросы пропускаются как есть
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                (scope["method"], path, str(status))
+            )
+
+
+def instrument_engine(engine: AsyncEngine, pool_stats=None) -> None:
+    """
+    Подписывает db_query_duration на выполнение запросов движка SQLAlchemy
+    и регистрирует метрики пула соединений (pool_stats - app.core.pool.PoolStats)
+    """
+    sync_engine = engine.sync_engine
+
+    registry.register(Gauge(
+        "db_pool_connections",
+        "Соединения пула по состоянию",
+        ("state",),
+        collect=lambda: {(state,): value for state, value in sync_engine.pool.status_dict().items()}
+    ))
+    if pool_stats is not None:
+        registry.register(Counter(
+            "db_pool_checkouts_total", "Выдано соединений из пула",
+            collect=lambda: {(): pool_stats.checkouts}
+        ))
+        registry.register(Counter(
+            "db_pool_waits_total", "Выдач, которым пришлось ждать свободное соединение",
+            collect=lambda: {(): pool_stats.waits}
+        ))
+        registry.register(Counter(
+            "db_pool_timeouts_total", "Таймаутов ожидания соединения",
+            collect=lambda: {(): pool_stats.timeouts}
+        ))
+        registry.register(Gauge(
+            "db_pool_checkout_latency_seconds",
+            "Задержка выдачи соединения по последним выдачам",
+            ("quantile",),
+            collect=lambda: {
+                ("0.5",): pool_stats.percentile(0.5),
+                ("0.99",): pool_stats.percentile(0.99),
+            }
+        ))
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_started", None)
+        if started is not None:
+            db_query_duration.observe(time.perf_counter() - started)
@@ -0,0 +1,26 @@
+import base64
+import json
+from typing import Any, List
+
+from fastapi import HTTPException
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """Непрозрачный курсор keyset-пагинации из значений ключа сортировки"""
+    raw = json.dumps([str(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[str]:
+    """Значения ключа из курсора; 400 если курсор поврежден"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, str) for v in values):
+        raise HTTPException(400, "Invalid cursor")
+    return values
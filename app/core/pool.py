@@ -0,0 +1,86 @@
+import time
+from collections import deque
+from typing import Deque, Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """
+    Счетчики выдачи соединений из пула: сколько выдано, сколько раз пришлось
+    ждать свободное соединение, таймауты и задержка выдачи (по последним
+    window выдачам - для p50/p99)
+    """
+
+    def __init__(self, window: int = 1000):
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_latency = 0.0
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float, waited: bool) -> None:
+        self.checkouts += 1
+        self._latencies.append(latency)
+        self.max_latency = max(self.max_latency, latency)
+        if waited:
+            self.waits += 1
+            self.wait_seconds += latency
+
+    def percentile(self, q: float) -> float:
+        if not self._latencies:
+            return 0.0
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def reset(self) -> None:
+        self.__init__(self._latencies.maxlen)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "wait_seconds": round(self.wait_seconds, 6),
+            "latency_p50_ms": round(self.percentile(0.5) * 1000, 3),
+            "latency_p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "latency_max_ms": round(self.max_latency * 1000, 3),
+        }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool, который пишет задержку выдачи соединения
+    (ожидание в очереди, создание соединения, pre-ping) в pool_stats
+    """
+
+    stats = pool_stats
+
+    def connect(self):
+        # Ждать придется, если свободных нет и создавать новые уже нельзя
+        waited = (
+            self.checkedin() == 0
+            and self._max_overflow > -1
+            and self.overflow() >= self._max_overflow
+        )
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record(time.perf_counter() - started, waited)
+        return connection
+
+    def status_dict(self) -> Dict[str, int]:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+        }
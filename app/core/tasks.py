@@ -0,0 +1,28 @@
+import asyncio
+from typing import Optional
+
+
+class BackgroundTask:
+    """
+    Фоновая задача приложения: start() запускает run() в цикле событий,
+    stop() отменяет ее и дожидается завершения. Наследники реализуют run()
+    """
+
+    _task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run(self) -> None:
+        raise NotImplementedError
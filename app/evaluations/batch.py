@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+
+from app.core.enums import CampaignStatus
+from app.campaigns.models import Campaign
+from app.schedules.models import CampaignSchedule
+from app.schedules.index import CompiledSchedule, schedule_index
+
+
+# Коды статусов в колоночном представлении (индекс в STATUS_CODES)
+STATUS_CODES: tuple = tuple(CampaignStatus)
+STATUS_INDEX: Dict[CampaignStatus, int] = {status: i for i, status in enumerate(STATUS_CODES)}
+
+
+def _nullable(values: List[Optional[float]]) -> np.ndarray:
+    """NULL -> NaN, чтобы сравнения с ним всегда давали False"""
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+@dataclass
+class CampaignBatch:
+    """
+    Колоночное представление набора кампаний для пакетного вычисления.
+
+    NULL в числовых колонках хранится как NaN.
+    Numeric(10, 2) переводится в float64 без потери порядка сравнения.
+    """
+    ids: List[UUID]
+    is_managed: np.ndarray
+    spend_today: np.ndarray
+    budget_limit: np.ndarray
+    stock_days_left: np.ndarray
+    stock_days_min: np.ndarray
+    schedule_enabled: np.ndarray
+    has_schedules: np.ndarray
+    in_schedule: np.ndarray
+    target_status: np.ndarray
+    current_time: datetime
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_campaigns(
+        cls,
+        campaigns: Sequence[Campaign],
+        schedules_by_campaign: Optional[Dict[UUID, List[CampaignSchedule]]] = None,
+        current_time: Optional[datetime] = None,
+        compiled: Optional[Mapping[UUID, CompiledSchedule]] = None
+    ) -> "CampaignBatch":
+        """
+        Собирает колонки из ORM-объектов и их расписаний.
+        compiled - расписания, уже скомпилированные для этого прогона (schedule_index.get_many)
+        """
+        current_time = current_time or datetime.now()
+        schedules_by_campaign = schedules_by_campaign or {}
+        if compiled is None:
+            compiled = schedule_index.get_many(schedules_by_campaign)
+
+        has_schedules = []
+        in_schedule = []
+        for c in campaigns:
+            schedules = schedules_by_campaign.get(c.id, [])
+            has_schedules.append(bool(schedules))
+            in_schedule.append(bool(schedules) and compiled[c.id].contains(current_time))
+
+        return cls(
+            ids=[c.id for c in campaigns],
+            is_managed=np.array([bool(c.is_managed) for c in campaigns], dtype=bool),
+            spend_today=_nullable([c.spend_today for c in campaigns]),
+            budget_limit=_nullable([c.budget_limit for c in campaigns]),
+            stock_days_left=_nullable([c.stock_days_left for c in campaigns]),
+            stock_days_min=_nullable([c.stock_days_min for c in campaigns]),
+            schedule_enabled=np.array([bool(c.schedule_enabled) for c in campaigns], dtype=bool),
+            has_schedules=np.array(has_schedules, dtype=bool),
+            in_schedule=np.array(in_schedule, dtype=bool),
+            target_status=np.array(
+                [STATUS_INDEX[CampaignStatus(c.target_status or CampaignStatus.ACTIVE)] for c in campaigns],
+                dtype=np.int8
+            ),
+            current_time=current_time,
+        )
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.tasks import BackgroundTask
+from .engine import RuleEngine, get_rule_engine
+from .service import EvaluationRow, load_snapshots, evaluate_campaigns
+
+logger = logging.getLogger(__name__)
+
+
+class DirtyCampaigns:
+    """
+    Множество кампаний, у которых изменились входные данные правил.
+    Повторные записи одной кампании до обработки схлопываются в одну.
+    """
+
+    def __init__(self):
+        self._ids: Set[UUID] = set()
+        self._event = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def mark(self, campaign_id: UUID) -> None:
+        """Помечает кампанию для пересчета (вызывается после коммита записи)"""
+        if not settings.INCREMENTAL_EVALUATION:
+            return
+        self._ids.add(campaign_id)
+        self._event.set()
+
+    def drain(self, limit: int) -> List[UUID]:
+        """Забирает до limit кампаний из множества"""
+        batch = []
+        while self._ids and len(batch) < limit:
+            batch.append(self._ids.pop())
+        if not self._ids:
+            self._event.clear()
+        return batch
+
+    async def wait(self) -> None:
+        await self._event.wait()
+
+
+dirty_campaigns = DirtyCampaigns()
+
+
+async def evaluate_dirty(
+    db: AsyncSession,
+    engine: RuleEngine,
+    campaign_ids: List[UUID],
+    current_time: Optional[datetime] = None
+) -> List[EvaluationRow]:
+    """Пересчитывает и сохраняет указанные управляемые кампании (снимки - через snapshot_cache)"""
+    current_time = current_time or datetime.now()
+
+    campaigns, schedules_by_campaign = await load_snapshots(db, campaign_ids)
+    if not campaigns:
+        return []
+
+    rows = await evaluate_campaigns(engine, db, campaigns, schedules_by_campaign, current_time)
+    await db.commit()
+    return rows
+
+
+class DirtyCampaignConsumer(BackgroundTask):
+    """
+    Фоновая задача: ждет пометок, выжидает окно delay (чтобы схлопнуть
+    серию записей) и пересчитывает грязные кампании микропакетами.
+
+    После сбоя пауза удваивается (до max_backoff) и сбрасывается первым
+    успешным пересчетом; трассировка пишется на 1-м, 2-м, 4-м... сбое подряд.
+    """
+
+    def __init__(
+        self,
+        dirty: DirtyCampaigns = dirty_campaigns,
+        engine: Optional[RuleEngine] = None,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        delay: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        max_backoff: Optional[float] = None
+    ):
+        self.dirty = dirty
+        self.engine = engine or get_rule_engine()
+        self.session_factory = session_factory
+        self.delay = settings.INCREMENTAL_EVALUATION_DELAY if delay is None else delay
+        self.batch_size = batch_size or settings.INCREMENTAL_EVALUATION_BATCH_SIZE
+        self.max_backoff = settings.INCREMENTAL_EVALUATION_MAX_BACKOFF if max_backoff is None else max_backoff
+        self.failures = 0
+
+    def backoff(self) -> float:
+        """Пауза перед следующей попыткой: delay, после сбоев - удвоенная за каждый"""
+        if not self.failures:
+            return self.delay
+        return min(max(self.delay, 0.1) * 2 ** self.failures, self.max_backoff)
+
+    async def run(self) -> None:
+        while True:
+            await self.dirty.wait()
+            await asyncio.sleep(self.backoff())
+            await self.process_pending()
+
+    async def process_pending(self) -> int:
+        """Обрабатывает все накопленные пометки; возвращает число пересчитанных кампаний"""
+        evaluated = 0
+        while True:
+            campaign_ids = self.dirty.drain(self.batch_size)
+            if not campaign_ids:
+                return evaluated
+            try:
+                async with self.session_factory() as db:
+                    evaluated += len(await evaluate_dirty(db, self.engine, campaign_ids))
+            except Exception:
+                self.failures += 1
+                # Степени двойки: при долгом сбое БД лог не растет с каждой попыткой
+                if self.failures & (self.failures - 1) == 0:
+                    logger.exception(
+                        "Не удалось пересчитать %d кампаний (сбой подряд: %d)",
+                        len(campaign_ids), self.failures
+                    )
+                # Вернуть в очередь: будут пересчитаны на следующей итерации
+                for campaign_id in campaign_ids:
+                    self.dirty.mark(campaign_id)
+                return evaluated
+            if self.failures:
+                logger.info("Пересчет кампаний восстановлен после %d сбоев", self.failures)
+                self.failures = 0
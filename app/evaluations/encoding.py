@@ -0,0 +1,65 @@
+import json
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import Response
+
+from app.core.enums import CampaignStatus, TriggeredRule
+from .schemas import BulkEvaluationItem
+
+# Быстрая сериализация массовых результатов (evaluate-all, evaluate-due, stream).
+#
+# У строки результата всего |CampaignStatus| * (|TriggeredRule| + 1) вариантов
+# текста без campaign_id, поэтому JSON каждого варианта собирается один раз
+# из BulkEvaluationItem, а на кампанию остается только подставить id.
+# Формат совпадает с тем, что отдал бы FastAPI через response_model
+
+_ID = "@campaign_id@"
+# Как у starlette.responses.JSONResponse
+COMPACT = (",", ":")
+
+Row = Tuple[UUID, CampaignStatus, Optional[TriggeredRule]]
+
+
+class RowEncoder:
+    """JSON строк результата по заранее сериализованным шаблонам"""
+
+    def __init__(self, separators: Optional[Tuple[str, str]] = None):
+        self._templates: Dict[Tuple[CampaignStatus, Optional[TriggeredRule]], Tuple[str, str]] = {}
+        for status in CampaignStatus:
+            for rule in (None, *TriggeredRule):
+                item = BulkEvaluationItem(campaign_id=UUID(int=0), target_status=status, triggered_rule=rule)
+                text = json.dumps({**item.model_dump(mode="json"), "campaign_id": _ID}, separators=separators)
+                prefix, suffix = text.split(json.dumps(_ID))
+                self._templates[status, rule] = (prefix + '"', '"' + suffix)
+
+    def encode(self, rows: Iterable[Row], separator: str) -> str:
+        templates = self._templates
+        parts = []
+        for campaign_id, status, rule in rows:
+            prefix, suffix = templates[status, rule]
+            parts.append(prefix + str(campaign_id) + suffix)
+        return separator.join(parts)
+
+
+_compact = RowEncoder(COMPACT)
+_ndjson = RowEncoder()
+
+
+def bulk_evaluation_json(rows: Sequence[Row]) -> str:
+    """Тело BulkEvaluationResponse"""
+    return f'{{"evaluated":{len(rows)},"results":[{_compact.encode(rows, ",")}]}}'
+
+
+def bulk_evaluation_response(rows: Sequence[Row]) -> Response:
+    """
+    Готовый ответ для эндпоинтов с response_model=BulkEvaluationResponse:
+    FastAPI не валидирует и не сериализует Response повторно, схема в OpenAPI не меняется
+    """
+    return Response(bulk_evaluation_json(rows), media_type="application/json")
+
+
+def ndjson_lines(rows: Iterable[Row]) -> str:
+    """Порция NDJSON для evaluate-all/stream (строка на кампанию)"""
+    lines = _ndjson.encode(rows, "\n")
+    return lines + "\n" if lines else ""
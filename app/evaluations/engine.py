@@ -1,20 +1,103 @@
+import time
 from datetime import datetime
-from typing import List, Tuple, Optional
+from typing import Awaitable, Callable, Dict, List, Mapping, Sequence, Tuple, Optional
+from uuid import UUID
 
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.enums import CampaignStatus, TriggeredRule
+from app.core.config import settings
+from app.core.enums import CampaignStatus, TriggeredRule, LogPolicy
 from app.campaigns.models import Campaign
 from app.schedules.models import CampaignSchedule
+from app.schedules.index import CompiledSchedule
 from app.rules import get_all_rules
 from app.rules.base import Rule
-from .models import RuleEvaluationLog
+from .batch import CampaignBatch, STATUS_CODES, STATUS_INDEX
+from .fingerprint import campaign_fingerprint
+from .hooks import (
+    EngineHook,
+    instrument_check,
+    instrument_async_check,
+    instrument_decide,
+    instrument_decide_async,
+)
+
+
+# Версия движка в логах вычислений как задел на будущее
+ENGINE_VERSION = "1.0"
+SCHEDULE_EXCERPT_SIZE = 5
+
+Decision = Tuple[CampaignStatus, Optional[TriggeredRule], Optional[str]]
+DecisionFn = Callable[[Campaign, List[CampaignSchedule], datetime], Decision]
+AsyncDecisionFn = Callable[[Campaign, List[CampaignSchedule], datetime], Awaitable[Decision]]
+
+
+def compile_rules(
+    rules: List[Rule],
+    hooks: Sequence[EngineHook] = ()
+) -> Tuple[Optional[DecisionFn], AsyncDecisionFn]:
+    """
+    Компилирует цепочку правил в одну функцию решения.
+    Свойства правил (rule_name, target_status) читаются один раз при сборке.
+    Хуки вшиваются обертками только если они есть: без хуков цепочка та же.
+
+    Returns:
+        (decide, decide_async)
+        decide = None, если в цепочке есть асинхронные правила (Rule.is_async)
+    """
+    steps = tuple(
+        (
+            instrument_async_check(rule.evaluate, rule.rule_name, hooks)
+            if rule.is_async else instrument_check(rule.check, rule.rule_name, hooks),
+            rule.is_async,
+            rule.rule_name,
+            rule.target_status
+        )
+        for rule in rules
+    )
+    active = CampaignStatus.ACTIVE
+    
+    if not any(is_async for _, is_async, _, _ in steps):
+        sync_steps = tuple((check, name, target) for check, _, name, target in steps)
+        
+        def decide(campaign, schedules, current_time):
+            for check, name, target in sync_steps:
+                triggered, details = check(campaign, schedules, current_time)
+                if triggered:
+                    if target is None:
+                        return campaign.target_status or active, name, details
+                    return target, name, details
+            return active, None, None
+        
+        decide = instrument_decide(decide, hooks)
+        
+        async def decide_async(campaign, schedules, current_time):
+            return decide(campaign, schedules, current_time)
+        
+        return decide, decide_async
+    
+    async def decide_async(campaign, schedules, current_time):
+        for check, is_async, name, target in steps:
+            if is_async:
+                triggered, details = await check(campaign, schedules, current_time)
+            else:
+                triggered, details = check(campaign, schedules, current_time)
+            if triggered:
+                if target is None:
+                    return campaign.target_status or active, name, details
+                return target, name, details
+        return active, None, None
+    
+    return None, instrument_decide_async(decide_async, hooks)
 
 
 class RuleEngine:
     """Движок правил. Применяет правила строго по приоритету."""
     
     _rules: Optional[List[Rule]] = None
+    _compiled: Optional[Tuple[Optional[DecisionFn], AsyncDecisionFn]] = None
+    _hooks: Tuple[EngineHook, ...] = ()
     
     @classmethod
     def _get_rules(cls) -> List[Rule]:
@@ -23,12 +106,47 @@ class RuleEngine:
             cls._rules = get_all_rules()
         return cls._rules
     
+    @classmethod
+    def _get_compiled(cls) -> Tuple[Optional[DecisionFn], AsyncDecisionFn]:
+        """Цепочка правил компилируется один раз на процесс"""
+        if cls._compiled is None:
+            cls._compiled = compile_rules(cls._get_rules(), cls._hooks)
+        return cls._compiled
+    
+    @classmethod
+    def add_hook(cls, hook: EngineHook) -> None:
+        """Регистрирует хук для всех экземпляров движка (цепочка перекомпилируется)"""
+        cls._hooks = cls._hooks + (hook,)
+        cls._compiled = None
+    
+    @classmethod
+    def remove_hook(cls, hook: EngineHook) -> None:
+        cls._hooks = tuple(h for h in cls._hooks if h is not hook)
+        cls._compiled = None
+    
+    @property
+    def is_sync(self) -> bool:
+        """True если все правила чистые и доступен evaluate_sync()"""
+        return self._get_compiled()[0] is not None
+    
+    def evaluate_sync(
+        self,
+        campaign: Campaign,
+        schedules: Optional[List[CampaignSchedule]] = None,
+        current_time: Optional[datetime] = None
+    ) -> Decision:
+        """Синхронный вариант evaluate() для цепочки без правил с I/O"""
+        decide = self._get_compiled()[0]
+        if decide is None:
+            raise RuntimeError("В цепочке есть правила с I/O, используйте await evaluate()")
+        return decide(campaign, schedules or [], current_time or datetime.now())
+    
     async def evaluate(
         self,
         campaign: Campaign,
         schedules: Optional[List[CampaignSchedule]] = None,
         current_time: Optional[datetime] = None
-    ) -> Tuple[CampaignStatus, Optional[TriggeredRule], Optional[str]]:
+    ) -> Decision:
         """
         Применяет правила к кампании.
         
@@ -36,23 +154,106 @@ class RuleEngine:
             (target_status, triggered_rule, details)
             triggered_rule = None если правила не сработали (статус ACTIVE)
         """
+        decide, decide_async = self._get_compiled()
         current_time = current_time or datetime.now()
         schedules = schedules or []
         
-        for rule in self._get_rules():
-            triggered, details = await rule.evaluate(
-                campaign=campaign,
-                schedules=schedules,
-                current_time=current_time
+        if decide is not None:
+            return decide(campaign, schedules, current_time)
+        return await decide_async(campaign, schedules, current_time)
+    
+    @property
+    def supports_batch(self) -> bool:
+        """True если у всех правил есть evaluate_batch() и нет асинхронных правил"""
+        return all(
+            not rule.is_async and type(rule).evaluate_batch is not Rule.evaluate_batch
+            for rule in self._get_rules()
+        )
+    
+    async def evaluate_many(
+        self,
+        campaigns: Sequence[Campaign],
+        schedules_by_campaign: Dict[UUID, List[CampaignSchedule]],
+        current_time: datetime,
+        compiled: Optional[Mapping[UUID, CompiledSchedule]] = None
+    ) -> Tuple[List[CampaignStatus], List[Optional[TriggeredRule]]]:
+        """
+        Вычисляет набор кампаний: пакетным режимом, если его поддерживает
+        вся цепочка (supports_batch), иначе - скомпилированной цепочкой по одной.
+        compiled - расписания этого прогона для CampaignBatch
+        
+        Returns:
+            (target_statuses, triggered_rules) в порядке campaigns
+        """
+        if self.supports_batch:
+            return self.evaluate_batch(
+                CampaignBatch.from_campaigns(campaigns, schedules_by_campaign, current_time, compiled)
             )
-            
-            if triggered:
-                if rule.target_status is None:
-                    return campaign.target_status or CampaignStatus.ACTIVE, rule.rule_name, details
-                
-                return rule.target_status, rule.rule_name, details
         
-        return CampaignStatus.ACTIVE, None, None
+        decide, decide_async = self._get_compiled()
+        statuses = []
+        triggered = []
+        for campaign in campaigns:
+            schedules = schedules_by_campaign.get(campaign.id, [])
+            if decide is not None:
+                status, rule, _ = decide(campaign, schedules, current_time)
+            else:
+                status, rule, _ = await decide_async(campaign, schedules, current_time)
+            statuses.append(status)
+            triggered.append(rule)
+        return statuses, triggered
+    
+    def evaluate_batch(
+        self,
+        batch: CampaignBatch
+    ) -> Tuple[List[CampaignStatus], List[Optional[TriggeredRule]]]:
+        """
+        Пакетный режим: каждое правило считается булевой маской по колонкам,
+        приоритет разрешается одним проходом "первое сработавшее".
+        Результат совпадает с evaluate() для каждой кампании (без details).
+
+        Returns:
+            (target_statuses, triggered_rules) в порядке batch.ids
+        """
+        rules = self._get_rules()
+        size = len(batch)
+        if size == 0 or not rules:
+            return [CampaignStatus.ACTIVE] * size, [None] * size
+        
+        hooks = self._hooks
+        if hooks:
+            started = time.perf_counter()
+            rule_timings: Dict[TriggeredRule, float] = {}
+            masks = np.vstack([self._timed_mask(rule, batch, rule_timings) for rule in rules])
+        else:
+            masks = np.vstack([rule.evaluate_batch(batch) for rule in rules])
+        first = masks.argmax(axis=0)
+        hit = masks[first, np.arange(size)]
+        
+        # Статус по индексу правила; None у правила - сохранить текущий target_status
+        rule_status = np.array(
+            [-1 if r.target_status is None else STATUS_INDEX[r.target_status] for r in rules],
+            dtype=np.int8
+        )
+        status_codes = np.where(hit, rule_status[first], STATUS_INDEX[CampaignStatus.ACTIVE])
+        status_codes = np.where(status_codes < 0, batch.target_status, status_codes)
+        
+        rule_names = [r.rule_name for r in rules]
+        statuses = [STATUS_CODES[code] for code in status_codes.tolist()]
+        triggered = [rule_names[i] if h else None for i, h in zip(first.tolist(), hit.tolist())]
+        
+        if hooks:
+            elapsed = time.perf_counter() - started
+            for hook in hooks:
+                hook.after_batch(batch, statuses, triggered, rule_timings, elapsed)
+        return statuses, triggered
+    
+    @staticmethod
+    def _timed_mask(rule: Rule, batch: CampaignBatch, rule_timings: Dict[TriggeredRule, float]) -> np.ndarray:
+        started = time.perf_counter()
+        mask = rule.evaluate_batch(batch)
+        rule_timings[rule.rule_name] = time.perf_counter() - started
+        return mask
     
     async def evaluate_and_log(
         self,
@@ -61,8 +262,16 @@ class RuleEngine:
         schedules: Optional[List[CampaignSchedule]] = None,
         current_time: Optional[datetime] = None,
         dry_run: bool = False
-    ) -> Tuple[CampaignStatus, Optional[TriggeredRule], Optional[str]]:
-        previous_target = campaign.target_status
+    ) -> Decision:
+        """
+        Вычисляет кампанию и (если не dry_run) сохраняет результат тем же
+        путем, что и массовые вычисления (service.persist_results). Коммит делает вызывающий
+        """
+        # service импортирует engine: импорт здесь, чтобы не было цикла
+        from .service import persist_results
+        
+        current_time = current_time or datetime.now()
+        schedules = schedules or []
         
         status, rule, details = await self.evaluate(
             campaign=campaign,
@@ -70,23 +279,56 @@ class RuleEngine:
             current_time=current_time
         )
         
-        context = self._build_context(campaign, schedules, current_time)
+        if not dry_run:
+            await persist_results(self, db, [campaign], [status], [rule], {campaign.id: schedules}, current_time)
         
-        log = RuleEvaluationLog(
-            campaign_id=campaign.id,
-            triggered_rule=rule,
-            previous_target=previous_target,
-            new_target=status,
-            context=context,
-            created_at=current_time
-        )
+        return status, rule, details
+    
+    def should_log(
+        self,
+        campaign: Campaign,
+        status: CampaignStatus,
+        schedules: List[CampaignSchedule],
+        policy: Optional[LogPolicy] = None
+    ) -> Tuple[bool, Optional[int]]:
+        """
+        Решает, нужен ли лог для результата вычисления.
         
-        db.add(log)
+        Returns:
+            (write_log, fingerprint)
+            fingerprint - новый отпечаток входов, который надо сохранить,
+            или None если он не изменился (или политика его не использует)
+        """
+        policy = policy or settings.EVALUATION_LOG_POLICY
+        if policy == LogPolicy.ALWAYS:
+            return True, None
         
-        if not dry_run:
-            campaign.target_status = status
+        transition = status != campaign.target_status
+        if policy == LogPolicy.ON_TRANSITION:
+            return transition, None
         
-        return status, rule, details
+        fingerprint = campaign_fingerprint(campaign, schedules)
+        if fingerprint == campaign.evaluation_fingerprint:
+            return transition, None
+        return True, fingerprint
+    
+    def build_log_row(
+        self,
+        campaign: Campaign,
+        status: CampaignStatus,
+        rule: Optional[TriggeredRule],
+        schedules: List[CampaignSchedule],
+        current_time: datetime
+    ) -> dict:
+        """Значения колонок RuleEvaluationLog для одного вычисления"""
+        return {
+            "campaign_id": campaign.id,
+            "triggered_rule": rule,
+            "previous_target": campaign.target_status,
+            "new_target": status,
+            "created_at": current_time,
+            **self._build_context(campaign, schedules, current_time),
+        }
     
     def _build_context(
         self,
@@ -94,31 +336,32 @@ class RuleEngine:
         schedules: List[CampaignSchedule],
         current_time: datetime
     ) -> dict:
-        """Создает снапшот данных для логирования"""
+        """Создает снапшот данных для логирования (типизированные колонки лога)"""
         
-        schedule_slots = []
-        for slot in schedules:
-            schedule_slots.append({
-                "day": slot.day_of_week,
-                "start": slot.start_time.isoformat(),
-                "end": slot.end_time.isoformat()
-            })
+        # В JSONB - только переменная часть: до SCHEDULE_EXCERPT_SIZE слотов,
+        # по дню и времени (как в SQL-бэкенде), а не в порядке загрузки
+        excerpt_slots = sorted(
+            schedules, key=lambda slot: (slot.day_of_week, slot.start_time, slot.end_time)
+        )[:SCHEDULE_EXCERPT_SIZE]
+        schedule_excerpt = [
+            [slot.day_of_week, slot.start_time.isoformat(), slot.end_time.isoformat()]
+            for slot in excerpt_slots
+        ]
         
         return {
-            "current_status": campaign.current_status.value,
+            "current_status": campaign.current_status,
             "is_managed": campaign.is_managed,
-            "budget_limit": str(campaign.budget_limit) if campaign.budget_limit else None,
-            "spend_today": str(campaign.spend_today),
+            "budget_limit": campaign.budget_limit,
+            "spend_today": campaign.spend_today,
             "stock_days_left": campaign.stock_days_left,
             "stock_days_min": campaign.stock_days_min,
             "schedule_enabled": campaign.schedule_enabled,
             
-            "current_time": current_time.isoformat(),
             "current_weekday": current_time.weekday(),
             "schedules_count": len(schedules),
-            "schedules": schedule_slots[:5],
+            "schedule_excerpt": schedule_excerpt or None,
             
-            "engine_version": "1.0"  # версия движка как задел на будущее
+            "engine_version": ENGINE_VERSION
         }
 
 
@@ -0,0 +1,28 @@
+import hashlib
+from typing import List
+
+from app.campaigns.models import Campaign
+from app.schedules.models import CampaignSchedule
+
+
+def campaign_fingerprint(campaign: Campaign, schedules: List[CampaignSchedule]) -> int:
+    """
+    Стабильный отпечаток входных данных _build_context (без текущего времени).
+    Не зависит от процесса (в отличие от hash()), помещается в BIGINT
+    """
+    slots = sorted(
+        (slot.day_of_week, slot.start_time.isoformat(), slot.end_time.isoformat())
+        for slot in schedules
+    )
+    payload = repr((
+        campaign.current_status.value,
+        campaign.is_managed,
+        str(campaign.budget_limit) if campaign.budget_limit is not None else None,
+        str(campaign.spend_today),
+        campaign.stock_days_left,
+        campaign.stock_days_min,
+        campaign.schedule_enabled,
+        slots,
+    ))
+    digest = hashlib.blake2b(payload.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
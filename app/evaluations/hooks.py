@@ -0,0 +1,133 @@
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.enums import CampaignStatus, TriggeredRule
+
+# Сигнатура проверки правила: (campaign, schedules, current_time) -> (triggered, details)
+Check = Callable[..., Tuple[bool, Optional[str]]]
+AsyncCheck = Callable[..., Awaitable[Tuple[bool, Optional[str]]]]
+
+
+class EngineHook:
+    """
+    Наблюдатель за RuleEngine (трассировка, профилирование, свои счетчики).
+    Переопределяются только нужные методы; регистрация - RuleEngine.add_hook().
+
+    Хуки вызываются синхронно в горячем пути, поэтому должны быть быстрыми
+    и не бросать исключений. Время - в секундах (time.perf_counter)
+    """
+
+    def before_rule(self, rule: TriggeredRule, campaign) -> None:
+        """Перед проверкой правила в evaluate()"""
+
+    def after_rule(
+        self,
+        rule: TriggeredRule,
+        campaign,
+        triggered: bool,
+        details: Optional[str],
+        elapsed: float
+    ) -> None:
+        """После проверки правила в evaluate()"""
+
+    def after_evaluate(
+        self,
+        campaign,
+        status: CampaignStatus,
+        rule: Optional[TriggeredRule],
+        elapsed: float
+    ) -> None:
+        """После evaluate() одной кампании"""
+
+    def after_batch(
+        self,
+        batch,
+        statuses: List[CampaignStatus],
+        rules: List[Optional[TriggeredRule]],
+        rule_timings: Dict[TriggeredRule, float],
+        elapsed: float
+    ) -> None:
+        """После evaluate_batch(); rule_timings - время маски каждого правила"""
+
+
+def _overriding(hooks: Sequence[EngineHook], method: str) -> Tuple[EngineHook, ...]:
+    # Вызываем только переопределенные методы: пустые заглушки ничего не стоят
+    return tuple(hook for hook in hooks if getattr(type(hook), method) is not getattr(EngineHook, method))
+
+
+def instrument_check(check: Check, name: TriggeredRule, hooks: Sequence[EngineHook]) -> Check:
+    """Оборачивает проверку правила вызовами before_rule/after_rule"""
+    before = _overriding(hooks, "before_rule")
+    after = _overriding(hooks, "after_rule")
+    if not before and not after:
+        return check
+    perf_counter = time.perf_counter
+
+    def timed(campaign, schedules, current_time):
+        for hook in before:
+            hook.before_rule(name, campaign)
+        started = perf_counter()
+        triggered, details = check(campaign, schedules, current_time)
+        elapsed = perf_counter() - started
+        for hook in after:
+            hook.after_rule(name, campaign, triggered, details, elapsed)
+        return triggered, details
+
+    return timed
+
+
+def instrument_async_check(check: AsyncCheck, name: TriggeredRule, hooks: Sequence[EngineHook]) -> AsyncCheck:
+    """То же для правил с I/O"""
+    before = _overriding(hooks, "before_rule")
+    after = _overriding(hooks, "after_rule")
+    if not before and not after:
+        return check
+    perf_counter = time.perf_counter
+
+    async def timed(campaign, schedules, current_time):
+        for hook in before:
+            hook.before_rule(name, campaign)
+        started = perf_counter()
+        triggered, details = await check(campaign, schedules, current_time)
+        elapsed = perf_counter() - started
+        for hook in after:
+            hook.after_rule(name, campaign, triggered, details, elapsed)
+        return triggered, details
+
+    return timed
+
+
+def instrument_decide(decide, hooks: Sequence[EngineHook]):
+    """Оборачивает функцию решения вызовом after_evaluate"""
+    after = _overriding(hooks, "after_evaluate")
+    if not after:
+        return decide
+    perf_counter = time.perf_counter
+
+    def timed(campaign, schedules, current_time: datetime):
+        started = perf_counter()
+        status, rule, details = decision = decide(campaign, schedules, current_time)
+        elapsed = perf_counter() - started
+        for hook in after:
+            hook.after_evaluate(campaign, status, rule, elapsed)
+        return decision
+
+    return timed
+
+
+def instrument_decide_async(decide_async, hooks: Sequence[EngineHook]):
+    after = _overriding(hooks, "after_evaluate")
+    if not after:
+        return decide_async
+    perf_counter = time.perf_counter
+
+    async def timed(campaign, schedules, current_time: datetime):
+        started = perf_counter()
+        status, rule, details = decision = await decide_async(campaign, schedules, current_time)
+        elapsed = perf_counter() - started
+        for hook in after:
+            hook.after_evaluate(campaign, status, rule, elapsed)
+        return decision
+
+    return timed
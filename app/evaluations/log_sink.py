@@ -0,0 +1,114 @@
+import json
+import uuid
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from .models import RuleEvaluationLog
+from .metrics import log_rows_written
+
+
+# Порядок колонок для COPY
+_COPY_COLUMNS = (
+    "id",
+    "campaign_id",
+    "triggered_rule",
+    "previous_target",
+    "new_target",
+    "created_at",
+    "current_status",
+    "is_managed",
+    "budget_limit",
+    "spend_today",
+    "stock_days_left",
+    "stock_days_min",
+    "schedule_enabled",
+    "current_weekday",
+    "schedules_count",
+    "schedule_excerpt",
+    "engine_version",
+)
+
+
+class EvaluationLogSink:
+    """
+    Буфер строк RuleEvaluationLog для пакетной записи.
+
+    Вместо session.add() на каждую кампанию строки копятся в памяти и пишутся
+    многострочными INSERT (или COPY через asyncpg), как только набралось
+    batch_size штук: в памяти не больше одной пачки. Остаток пишет flush().
+    Содержимое таблицы такое же, как при записи через ORM.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        batch_size: Optional[int] = None,
+        use_copy: Optional[bool] = None
+    ):
+        self.db = db
+        self.batch_size = batch_size or settings.EVALUATION_LOG_BATCH_SIZE
+        self.use_copy = settings.EVALUATION_LOG_USE_COPY if use_copy is None else use_copy
+        self._rows: List[dict] = []
+        self.written = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    async def add(self, row: dict) -> None:
+        """Добавляет строку лога (ключи - колонки RuleEvaluationLog); полная пачка пишется сразу"""
+        if row.get("id") is None:
+            row["id"] = uuid.uuid4()
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Записывает накопленные строки пачками по batch_size"""
+        rows, self._rows = self._rows, []
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            if self.use_copy:
+                await self._copy(chunk)
+            else:
+                await self.db.execute(insert(RuleEvaluationLog), chunk)
+        self.written += len(rows)
+        log_rows_written.inc(len(rows))
+        return len(rows)
+
+    async def _copy(self, rows: List[dict]) -> None:
+        # Незафиксированные изменения ORM должны попасть в БД раньше COPY
+        await self.db.flush()
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            RuleEvaluationLog.__tablename__,
+            records=[self._copy_record(row) for row in rows],
+            columns=_COPY_COLUMNS,
+        )
+
+    @staticmethod
+    def _copy_record(row: dict) -> tuple:
+        # SQLAlchemy Enum хранит имена членов, JSONB передается строкой
+        excerpt = row.get("schedule_excerpt")
+        return (
+            row["id"],
+            row["campaign_id"],
+            row["triggered_rule"].name if row.get("triggered_rule") else None,
+            row["previous_target"].name if row.get("previous_target") else None,
+            row["new_target"].name,
+            row.get("created_at"),
+            row["current_status"].name,
+            row["is_managed"],
+            row.get("budget_limit"),
+            row["spend_today"],
+            row.get("stock_days_left"),
+            row.get("stock_days_min"),
+            row["schedule_enabled"],
+            row["current_weekday"],
+            row.get("schedules_count", 0),
+            json.dumps(excerpt) if excerpt is not None else None,
+            row["engine_version"],
+        )
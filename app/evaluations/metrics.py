@@ -0,0 +1,43 @@
+from collections import Counter as Tally
+from typing import Iterable, Optional
+
+from app.core.enums import TriggeredRule
+from app.core.metrics import registry, Counter, Gauge, Histogram
+
+rule_triggers = registry.register(Counter(
+    "rule_triggers_total",
+    "Срабатывания правил при вычислении кампаний (none - ни одно не сработало)",
+    ("rule",)
+))
+evaluated_campaigns = registry.register(Counter(
+    "evaluated_campaigns_total",
+    "Вычислено кампаний"
+))
+evaluate_all_duration = registry.register(Histogram(
+    "evaluate_all_duration_seconds",
+    "Длительность evaluate-all (HTTP и периодический)",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+))
+evaluate_all_rate = registry.register(Gauge(
+    "evaluate_all_campaigns_per_second",
+    "Кампаний в секунду в последнем evaluate-all"
+))
+log_rows_written = registry.register(Counter(
+    "evaluation_log_rows_written_total",
+    "Записано строк rule_evaluation_logs"
+))
+
+
+def record_triggers(rules: Iterable[Optional[TriggeredRule]]) -> None:
+    """Учитывает результаты вычисления: один проход Counter на пакет, а не инкремент на кампанию"""
+    total = 0
+    for rule, count in Tally(rules).items():
+        rule_triggers.inc(count, (rule.value if rule else "none",))
+        total += count
+    evaluated_campaigns.inc(total)
+
+
+def record_evaluate_all(campaigns: int, duration: float) -> None:
+    evaluate_all_duration.observe(duration)
+    if duration > 0:
+        evaluate_all_rate.set(campaigns / duration)
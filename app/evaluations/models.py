@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Enum, JSON, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Enum, Boolean, Numeric, DateTime, ForeignKey, Index, Integer, SmallInteger, String
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 import uuid
 
@@ -10,10 +10,66 @@ from app.core.enums import CampaignStatus, TriggeredRule
 class RuleEvaluationLog(Base):
     __tablename__ = "rule_evaluation_logs"
 
+    # Таблица партиционирована по created_at (дневные партиции), поэтому он входит в PK
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     campaign_id = Column(UUID(as_uuid=True), ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=False)
     triggered_rule = Column(Enum(TriggeredRule), nullable=True)
     previous_target = Column(Enum(CampaignStatus), nullable=True)
     new_target = Column(Enum(CampaignStatus), nullable=False)
-    context = Column(JSON, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+
+    # Снимок входов правил на момент вычисления (время вычисления - created_at)
+    current_status = Column(Enum(CampaignStatus), nullable=False)
+    is_managed = Column(Boolean, nullable=False)
+    budget_limit = Column(Numeric(10, 2), nullable=True)
+    spend_today = Column(Numeric(10, 2), nullable=False)
+    stock_days_left = Column(Integer, nullable=True)
+    stock_days_min = Column(Integer, nullable=True)
+    schedule_enabled = Column(Boolean, nullable=False)
+    current_weekday = Column(SmallInteger, nullable=False)
+    schedules_count = Column(SmallInteger, nullable=False, default=0)
+    schedule_excerpt = Column(JSONB, nullable=True)  # до 5 слотов: [[day, "start", "end"], ...]
+    engine_version = Column(String(16), nullable=False)
+
+    __table_args__ = (
+        # Под keyset-пагинацию истории: ORDER BY created_at DESC, id DESC
+        Index(
+            "ix_rule_evaluation_logs_campaign_created_id",
+            "campaign_id", created_at.desc(), id.desc()
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    @property
+    def context(self) -> dict:
+        """Снимок в прежнем виде словаря (формат ответа evaluation-history)"""
+        return {
+            "current_status": self.current_status.value,
+            "is_managed": self.is_managed,
+            "budget_limit": str(self.budget_limit) if self.budget_limit else None,
+            "spend_today": str(self.spend_today),
+            "stock_days_left": self.stock_days_left,
+            "stock_days_min": self.stock_days_min,
+            "schedule_enabled": self.schedule_enabled,
+
+            "current_time": self.created_at.isoformat() if self.created_at else None,
+            "current_weekday": self.current_weekday,
+            "schedules_count": self.schedules_count,
+            "schedules": [
+                {"day": day, "start": start, "end": end}
+                for day, start, end in self.schedule_excerpt or ()
+            ],
+
+            "engine_version": self.engine_version
+        }
+
+
+class EvaluationShardLease(Base):
+    """Аренда шарда evaluate-all одним воркером (см. app/evaluations/shards.py)"""
+    __tablename__ = "evaluation_shard_leases"
+
+    shard = Column(Integer, primary_key=True)
+    owner = Column(String, nullable=True)
+    leased_until = Column(DateTime(timezone=True), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)  # начало последнего прогона
+    evaluated_at = Column(DateTime(timezone=True), nullable=True)  # конец последнего успешного прогона
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.tasks import BackgroundTask
+from .models import RuleEvaluationLog
+
+logger = logging.getLogger(__name__)
+
+LOG_TABLE = RuleEvaluationLog.__tablename__
+_PARTITION_PREFIX = f"{LOG_TABLE}_p"
+
+
+def partition_name(day: date) -> str:
+    """Имя дневной партиции: rule_evaluation_logs_pYYYYMMDD"""
+    return f"{_PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> Optional[date]:
+    """Дата дневной партиции по имени; None для default и чужих таблиц"""
+    if not name.startswith(_PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(_PARTITION_PREFIX):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+async def list_partitions(db: AsyncSession) -> List[str]:
+    result = await db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": LOG_TABLE}
+    )
+    return [row[0] for row in result.all()]
+
+
+DEFAULT_PARTITION = f"{LOG_TABLE}_default"
+
+
+async def current_date(db: AsyncSession) -> date:
+    """CURRENT_DATE базы: границы партиций приводятся к дате в TimeZone сессии БД"""
+    result = await db.execute(text("SELECT CURRENT_DATE"))
+    return result.scalar_one()
+
+
+async def default_partition_days(db: AsyncSession) -> List[date]:
+    """Дни, чьи строки попали в default-партицию (обслуживание опоздало или было выключено)"""
+    result = await db.execute(text(
+        f'SELECT DISTINCT CAST(created_at AS date) FROM "{DEFAULT_PARTITION}"'
+    ))
+    return list(result.scalars().all())
+
+
+async def create_partition(db: AsyncSession, day: date, has_default: bool = True) -> None:
+    """
+    Создает партицию дня. Если default-партиция уже держит строки этого дня,
+    CREATE ... PARTITION OF на ней упадет: default отсоединяется, строки
+    переносятся в новую партицию, default присоединяется обратно
+    """
+    name = partition_name(day)
+    bounds = {"start": day.isoformat(), "end": (day + timedelta(days=1)).isoformat()}
+    create = text(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {LOG_TABLE} '
+        f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    )
+    in_range = "created_at >= CAST(:start AS date) AND created_at < CAST(:end AS date)"
+
+    stranded = None
+    if has_default:
+        result = await db.execute(
+            text(f'SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE {in_range} LIMIT 1'), bounds
+        )
+        stranded = result.scalar()
+    if stranded is None:
+        await db.execute(create)
+        return
+
+    await db.execute(text(f'ALTER TABLE {LOG_TABLE} DETACH PARTITION "{DEFAULT_PARTITION}"'))
+    await db.execute(create)
+    await db.execute(
+        text(f'INSERT INTO "{name}" SELECT * FROM "{DEFAULT_PARTITION}" WHERE {in_range}'), bounds
+    )
+    await db.execute(text(f'DELETE FROM "{DEFAULT_PARTITION}" WHERE {in_range}'), bounds)
+    await db.execute(text(f'ALTER TABLE {LOG_TABLE} ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT'))
+
+
+async def ensure_partitions(db: AsyncSession, start: date, days: int) -> List[str]:
+    """
+    Создает дневные партиции [start, start + days), которых еще нет, и партиции
+    дней, застрявших в default-партиции. Каждая партиция - в своей транзакции:
+    сбой на одном дне не откатывает остальные
+    """
+    existing = set(await list_partitions(db))
+    wanted = {start + timedelta(days=offset) for offset in range(days)}
+    has_default = DEFAULT_PARTITION in existing
+    if has_default:
+        wanted.update(await default_partition_days(db))
+    await db.commit()
+
+    created = []
+    for day in sorted(wanted):
+        name = partition_name(day)
+        if name in existing:
+            continue
+        try:
+            await create_partition(db, day, has_default)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            logger.exception("Не удалось создать партицию %s", name)
+            continue
+        created.append(name)
+    return created
+
+
+async def drop_partitions_before(db: AsyncSession, cutoff: date) -> List[str]:
+    """Удаляет дневные партиции старше cutoff целиком, без DELETE"""
+    dropped = []
+    for name in await list_partitions(db):
+        day = partition_day(name)
+        if day is not None and day < cutoff:
+            await db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+            dropped.append(name)
+    return dropped
+
+
+async def maintain_partitions(
+    db: AsyncSession,
+    today: Optional[date] = None,
+    retention_days: Optional[int] = None,
+    days_ahead: Optional[int] = None
+) -> dict:
+    """
+    Обслуживание партиций логов: создает партиции на days_ahead дней вперед
+    и удаляет старше retention_days (0 - хранить все). today по умолчанию -
+    CURRENT_DATE базы, а не процесса
+    """
+    today = today or await current_date(db)
+    retention_days = settings.LOG_RETENTION_DAYS if retention_days is None else retention_days
+    days_ahead = settings.LOG_PARTITIONS_AHEAD if days_ahead is None else days_ahead
+
+    created = await ensure_partitions(db, today, days_ahead + 1)
+    dropped = []
+    if retention_days > 0:
+        dropped = await drop_partitions_before(db, today - timedelta(days=retention_days))
+    await db.commit()
+    return {"created": created, "dropped": dropped}
+
+
+class PartitionMaintenanceJob(BackgroundTask):
+    """Фоновая задача: раз в interval секунд вызывает maintain_partitions()"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        interval: Optional[float] = None
+    ):
+        self.session_factory = session_factory
+        self.interval = settings.LOG_MAINTENANCE_INTERVAL if interval is None else interval
+
+    async def run(self) -> None:
+        while True:
+            try:
+                async with self.session_factory() as db:
+                    result = await maintain_partitions(db)
+                if result["created"] or result["dropped"]:
+                    logger.info("Партиции логов: %s", result)
+            except Exception:
+                logger.exception("Не удалось обслужить партиции логов")
+            await asyncio.sleep(self.interval)
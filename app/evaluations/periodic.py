@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import random
+from typing import Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.tasks import BackgroundTask
+from app.core.enums import OverrunPolicy
+from .engine import RuleEngine, get_rule_engine
+from .shards import evaluate_all, evaluate_due_owned
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicEvaluator(BackgroundTask):
+    """
+    Фоновая задача: раз в interval секунд (+ случайный jitter) выполняет
+    evaluate-all через сервисный слой, без HTTP.
+
+    Если прогон длился дольше интервала, дальше решает overrun:
+    SKIP - пропущенные запуски отбрасываются, ждем следующей границы интервала;
+    QUEUE - следующий прогон стартует сразу (пропуски не копятся, максимум один)
+
+    Между полными прогонами раз в due_interval секунд вызывается evaluate_due_owned:
+    кампании, у которых сменился вердикт расписания, пересчитываются без
+    ожидания следующего evaluate-all (0 - только полные прогоны)
+    """
+
+    def __init__(
+        self,
+        engine: Optional[RuleEngine] = None,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        interval: Optional[float] = None,
+        jitter: Optional[float] = None,
+        overrun: Optional[OverrunPolicy] = None,
+        due_interval: Optional[float] = None
+    ):
+        self.engine = engine or get_rule_engine()
+        self.session_factory = session_factory
+        self.interval = settings.PERIODIC_EVALUATION_INTERVAL if interval is None else interval
+        self.jitter = settings.PERIODIC_EVALUATION_JITTER if jitter is None else jitter
+        self.overrun = overrun or settings.PERIODIC_EVALUATION_OVERRUN
+        self.due_interval = (
+            settings.PERIODIC_EVALUATION_DUE_INTERVAL if due_interval is None else due_interval
+        )
+        if self.interval <= 0:
+            raise ValueError("interval must be positive")
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.due_runs = 0
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Реплики, стартовавшие одновременно, расходятся уже на первом запуске
+        await asyncio.sleep(self._jitter())
+        while True:
+            started = loop.time()
+            await self.run_once()
+            await self.wait(self.next_delay(loop.time() - started))
+
+    async def wait(self, delay: float) -> None:
+        """Ждет delay секунд, тем временем вычисляя наступившие сроки расписаний"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + delay
+        while True:
+            remaining = deadline - loop.time()
+            if self.due_interval <= 0 or remaining <= self.due_interval:
+                await asyncio.sleep(max(remaining, 0.0))
+                return
+            await asyncio.sleep(self.due_interval)
+            await self.run_due()
+
+    async def run_once(self) -> int:
+        """Один прогон evaluate-all; возвращает число вычисленных кампаний"""
+        try:
+            async with self.session_factory() as db:
+                rows = await evaluate_all(db, self.engine)
+        except Exception:
+            logger.exception("Периодическое вычисление кампаний не удалось")
+            return 0
+        self.runs += 1
+        return len(rows)
+
+    async def run_due(self) -> int:
+        """Один прогон evaluate_due_owned; возвращает число вычисленных кампаний"""
+        try:
+            async with self.session_factory() as db:
+                rows = await evaluate_due_owned(db, self.engine)
+        except Exception:
+            logger.exception("Вычисление кампаний по срокам расписания не удалось")
+            return 0
+        self.due_runs += 1
+        return len(rows)
+
+    def next_delay(self, elapsed: float) -> float:
+        """Пауза до следующего прогона, если текущий длился elapsed секунд"""
+        if elapsed <= self.interval:
+            return self.interval - elapsed + self._jitter()
+
+        self.overruns += 1
+        missed = int(elapsed // self.interval)
+        logger.warning(
+            "Вычисление кампаний заняло %.1f с при интервале %.1f с", elapsed, self.interval
+        )
+        if self.overrun == OverrunPolicy.QUEUE:
+            return 0.0
+        self.skipped += missed
+        return (missed + 1) * self.interval - elapsed + self._jitter()
+
+    def _jitter(self) -> float:
+        return random.uniform(0, self.jitter) if self.jitter > 0 else 0.0
@@ -0,0 +1,247 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Select, SmallInteger, Text, case, cast, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.enums import CampaignStatus, EvaluationBackend, LogPolicy, TriggeredRule
+from app.campaigns.models import Campaign
+from app.schedules.models import CampaignSchedule
+from app.rules.base import Rule
+from .engine import ENGINE_VERSION, SCHEDULE_EXCERPT_SIZE, RuleEngine
+from .models import RuleEvaluationLog
+from .snapshots import invalidate_after_commit
+from .metrics import log_rows_written, record_triggers
+
+# Вычисление правил в БД: цепочка правил - один CASE по строке campaigns,
+# обновление target_status и запись логов - data-modifying CTE того же запроса.
+# Строки кампаний в процесс не читаются, назад приходят только (id, статус, правило)
+
+EvaluationRow = Tuple[UUID, CampaignStatus, Optional[TriggeredRule]]
+
+_campaigns = Campaign.__table__
+_schedules = CampaignSchedule.__table__
+_logs = RuleEvaluationLog.__table__
+
+# Колонки снимка входов в логе (см. RuleEngine._build_context)
+_SNAPSHOT_COLUMNS = (
+    "current_status",
+    "is_managed",
+    "budget_limit",
+    "spend_today",
+    "stock_days_left",
+    "stock_days_min",
+    "schedule_enabled",
+)
+
+
+def pushdown_supported(engine: RuleEngine, policy: Optional[LogPolicy] = None) -> bool:
+    """
+    Можно ли вычислить цепочку правил движка в SQL: у всех правил есть
+    sql_condition() и нет I/O, нет хуков (они вызываются из Python),
+    политика логирования не требует отпечатков входов
+    """
+    policy = policy or settings.EVALUATION_LOG_POLICY
+    if policy == LogPolicy.ON_INPUT_CHANGE or engine._hooks:
+        return False
+    return all(
+        not rule.is_async and type(rule).sql_condition is not Rule.sql_condition
+        for rule in engine._get_rules()
+    )
+
+
+def use_pushdown(engine: RuleEngine) -> bool:
+    """EVALUATION_BACKEND=sql и цепочка правил вычислима в SQL"""
+    return settings.EVALUATION_BACKEND == EvaluationBackend.SQL and pushdown_supported(engine)
+
+
+def evaluation_query(engine: RuleEngine, current_time: datetime, where=None, columns=()) -> Select:
+    """
+    SELECT управляемых кампаний с результатом вычисления:
+    id, previous_target, new_target, triggered_rule и columns (выражения по campaigns).
+    where - дополнительный фильтр по campaigns (например, номер шарда)
+    """
+    c = _campaigns
+    status_type = c.c.target_status.type
+    rule_type = _logs.c.triggered_rule.type
+    active = literal(CampaignStatus.ACTIVE, status_type)
+    rules = engine._get_rules()
+
+    # Первое сработавшее правило по приоритету, как в compile_rules().
+    # Условия считаются один раз: статус выводится из правила уровнем выше
+    triggered_rule = case(
+        *[
+            (rule.sql_condition(c, _schedules, current_time), literal(rule.rule_name, rule_type))
+            for rule in rules
+        ],
+        else_=literal(None, rule_type)
+    )
+    decided = (
+        select(c.c.id, c.c.target_status, triggered_rule.label("triggered_rule"), *columns)
+        .where(c.c.is_managed == True)
+    )
+    if where is not None:
+        decided = decided.where(where)
+    decided = decided.subquery("decided")
+
+    new_target = case(
+        *[
+            (
+                decided.c.triggered_rule == literal(rule.rule_name, rule_type),
+                func.coalesce(decided.c.target_status, active) if rule.target_status is None
+                else literal(rule.target_status, status_type)
+            )
+            for rule in rules
+        ],
+        else_=active
+    )
+    return select(
+        decided.c.id,
+        decided.c.target_status.label("previous_target"),
+        new_target.label("new_target"),
+        decided.c.triggered_rule,
+        *[decided.c[column.name] for column in columns]
+    )
+
+
+def snapshot_columns() -> list:
+    """Колонки снимка входов для лога: те же значения, что RuleEngine._build_context()"""
+    c = _campaigns
+    s = _schedules
+    own_slots = s.c.campaign_id == c.c.id
+
+    # Слоты в логе - только у кампаний с расписанием, как при загрузке в Python
+    schedules_count = (
+        select(func.count())
+        .select_from(s)
+        .where(own_slots)
+        .correlate(c)
+        .scalar_subquery()
+    )
+    excerpt_slots = (
+        select(s.c.day_of_week, cast(s.c.start_time, Text).label("start"), cast(s.c.end_time, Text).label("end"))
+        .where(own_slots)
+        .order_by(s.c.day_of_week, s.c.start_time, s.c.end_time)
+        .limit(SCHEDULE_EXCERPT_SIZE)
+        .correlate(c)
+        .subquery("excerpt_slots")
+    )
+    excerpt = (
+        select(func.jsonb_agg(func.jsonb_build_array(
+            excerpt_slots.c.day_of_week, excerpt_slots.c.start, excerpt_slots.c.end
+        )))
+        .scalar_subquery()
+    )
+
+    return [
+        *[c.c[name] for name in _SNAPSHOT_COLUMNS],
+        case(
+            (c.c.schedule_enabled, cast(schedules_count, SmallInteger)),
+            else_=literal(0, SmallInteger)
+        ).label("schedules_count"),
+        case((c.c.schedule_enabled, excerpt)).label("schedule_excerpt"),
+    ]
+
+
+def evaluation_statement(
+    engine: RuleEngine,
+    current_time: datetime,
+    where=None,
+    policy: Optional[LogPolicy] = None
+) -> Select:
+    """
+    Вычисление с сохранением одним запросом:
+
+        WITH evaluated AS (SELECT ... CASE ...),
+             updated AS (UPDATE campaigns ... FROM evaluated WHERE статус изменился),
+             logged AS (INSERT INTO rule_evaluation_logs SELECT ... FROM evaluated)
+        SELECT id, new_target, triggered_rule, previous_target FROM evaluated
+    """
+    policy = policy or settings.EVALUATION_LOG_POLICY
+    c = _campaigns
+    evaluated = evaluation_query(engine, current_time, where, snapshot_columns()).cte("evaluated")
+    changed = evaluated.c.new_target.is_distinct_from(evaluated.c.previous_target)
+
+    updated = (
+        update(c)
+        .where(c.c.id == evaluated.c.id, c.c.target_status.is_distinct_from(evaluated.c.new_target))
+        .values(target_status=evaluated.c.new_target)
+        .cte("updated")
+    )
+
+    log_rows = select(
+        func.gen_random_uuid(),
+        evaluated.c.id,
+        evaluated.c.triggered_rule,
+        evaluated.c.previous_target,
+        evaluated.c.new_target,
+        literal(current_time, _logs.c.created_at.type),
+        *[evaluated.c[name] for name in _SNAPSHOT_COLUMNS],
+        literal(current_time.weekday(), _logs.c.current_weekday.type),
+        evaluated.c.schedules_count,
+        evaluated.c.schedule_excerpt,
+        literal(ENGINE_VERSION, _logs.c.engine_version.type),
+    )
+    if policy == LogPolicy.ON_TRANSITION:
+        log_rows = log_rows.where(changed)
+    logged = (
+        insert(_logs)
+        .from_select(
+            [
+                "id", "campaign_id", "triggered_rule", "previous_target", "new_target", "created_at",
+                *_SNAPSHOT_COLUMNS,
+                "current_weekday", "schedules_count", "schedule_excerpt", "engine_version",
+            ],
+            log_rows
+        )
+        .cte("logged")
+    )
+
+    return select(
+        evaluated.c.id,
+        evaluated.c.new_target,
+        evaluated.c.triggered_rule,
+        evaluated.c.previous_target,
+    ).add_cte(updated, logged)
+
+
+async def evaluate_pushdown(
+    db: AsyncSession,
+    engine: RuleEngine,
+    current_time: Optional[datetime] = None,
+    dry_run: bool = False,
+    where=None
+) -> List[EvaluationRow]:
+    """
+    Вычисляет управляемые кампании в БД одним запросом и (если не dry_run)
+    обновляет target_status и пишет логи по политике логирования. Без коммита.
+
+    Результат совпадает с RuleEngine.evaluate_batch(). В transition_queue
+    ничего не ставится: слоты расписания в процесс не загружаются
+    """
+    current_time = current_time or datetime.now()
+    policy = settings.EVALUATION_LOG_POLICY
+    if not pushdown_supported(engine, policy):
+        raise RuntimeError("Цепочка правил не поддерживает вычисление в SQL")
+
+    if dry_run:
+        result = await db.execute(evaluation_query(engine, current_time, where))
+        rows = [(row.id, row.new_target, row.triggered_rule) for row in result]
+        record_triggers(rule for _, _, rule in rows)
+        return rows
+
+    result = await db.execute(evaluation_statement(engine, current_time, where, policy))
+    rows: List[EvaluationRow] = []
+    changed: List[UUID] = []
+    for campaign_id, status, rule, previous in result:
+        rows.append((campaign_id, status, rule))
+        if status != previous:
+            changed.append(campaign_id)
+    invalidate_after_commit(db, changed)
+
+    record_triggers(rule for _, _, rule in rows)
+    log_rows_written.inc(len(rows) if policy == LogPolicy.ALWAYS else len(changed))
+    return rows
@@ -1,16 +1,27 @@
 from uuid import UUID
 from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, tuple_
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 from app.campaigns.models import Campaign
-from app.schedules.models import CampaignSchedule
 from .models import RuleEvaluationLog
-from .schemas import EvaluationResult, BulkEvaluationResponse, BulkEvaluationItem, EvaluationLogResponse
+from .schemas import EvaluationResult, BulkEvaluationResponse, EvaluationLogResponse
 from .engine import RuleEngine, get_rule_engine
+from .service import (
+    load_snapshot,
+    persist_results,
+    stream_evaluations,
+)
+from .shards import evaluate_all, evaluate_due_owned
+from .metrics import record_triggers
+from .snapshots import snapshot_cache
+from .encoding import bulk_evaluation_response, ndjson_lines
 
 router = APIRouter()
 
@@ -23,35 +34,25 @@ async def evaluate_campaign(
     engine: RuleEngine = Depends(get_rule_engine)
 ):
     """Вычисляет target_status для кампании по правилам"""
-    campaign = await db.get(Campaign, id)
-    if not campaign:
+    snapshot = await load_snapshot(db, id)
+    if not snapshot:
         raise HTTPException(404, "Campaign not found")
     
     current_time = datetime.now()
+    schedules = list(snapshot.schedules)
     
-    schedules = []
-    if campaign.schedule_enabled:
-        result = await db.execute(
-            select(CampaignSchedule).where(CampaignSchedule.campaign_id == id)
-        )
-        schedules = result.scalars().all()
+    status, rule, details = await engine.evaluate(
+        campaign=snapshot,
+        schedules=schedules,
+        current_time=current_time
+    )
+    record_triggers([rule])
     
-    if dry_run:
-        status, rule, details = await engine.evaluate(
-            campaign=campaign,
-            schedules=schedules,
-            current_time=current_time
-        )
-    else:
-        status, rule, details = await engine.evaluate_and_log(
-            campaign=campaign,
-            schedules=schedules,
-            db=db,
-            current_time=current_time,
-            dry_run=False
+    if not dry_run:
+        await persist_results(
+            engine, db, [snapshot], [status], [rule], {id: schedules}, current_time
         )
         await db.commit()
-        await db.refresh(campaign)
     
     return EvaluationResult(
         target_status=status,
@@ -61,90 +62,107 @@ async def evaluate_campaign(
 
 
 @router.post("/campaigns/evaluate-all", response_model=BulkEvaluationResponse)
-async def evaluate_all(
+async def evaluate_all_campaigns(
     dry_run: bool = Query(False, description="Не сохранять target_status в БД"),
     db: AsyncSession = Depends(get_db),
     engine: RuleEngine = Depends(get_rule_engine)
 ):
-    """Вычисляет target_status для всех управляемых кампаний"""
-    campaigns_result = await db.execute(
-        select(Campaign).where(Campaign.is_managed == True)
-    )
-    campaigns = campaigns_result.scalars().all()
-    
-    if not campaigns:
-        return BulkEvaluationResponse(evaluated=0, results=[])
+    """
+    Вычисляет target_status для всех управляемых кампаний.
+    При EVALUATION_SHARDS > 0 реплика вычисляет только арендованные шарды
+    и возвращает только их кампании.
+    JSON собирается напрямую из строк результата (без модели на кампанию)
+    """
+    rows = await evaluate_all(db, engine, dry_run)
     
-    campaign_ids = [c.id for c in campaigns]
-    
-    campaigns_with_schedule = [c for c in campaigns if c.schedule_enabled]
-    schedule_ids = [c.id for c in campaigns_with_schedule]
-    
-    schedules_by_campaign = {}
-    if schedule_ids:
-        schedules_result = await db.execute(
-            select(CampaignSchedule)
-            .where(CampaignSchedule.campaign_id.in_(schedule_ids))
-        )
-        for schedule in schedules_result.scalars().all():
-            if schedule.campaign_id not in schedules_by_campaign:
-                schedules_by_campaign[schedule.campaign_id] = []
-            schedules_by_campaign[schedule.campaign_id].append(schedule)
-    
-    current_time = datetime.now()
-    
-    results = []
-    for campaign in campaigns:
-        schedules = schedules_by_campaign.get(campaign.id, []) if campaign.schedule_enabled else []
-        
-        if dry_run:
-            status, rule, _ = await engine.evaluate(
-                campaign=campaign,
-                schedules=schedules,
-                current_time=current_time
-            )
-        else:
-            status, rule, _ = await engine.evaluate_and_log(
-                campaign=campaign,
-                schedules=schedules,
-                db=db,
-                current_time=current_time,
-                dry_run=False
-            )
-        
-        results.append(BulkEvaluationItem(
-            campaign_id=campaign.id,
-            target_status=status,
-            triggered_rule=rule
-        ))
+    return bulk_evaluation_response(rows)
+
+
+@router.post("/campaigns/evaluate-due", response_model=BulkEvaluationResponse)
+async def evaluate_due_campaigns(
+    db: AsyncSession = Depends(get_db),
+    engine: RuleEngine = Depends(get_rule_engine)
+):
+    """
+    Вычисляет только кампании, у которых с прошлого вычисления сменился
+    вердикт расписания. Очередь сроков заполняет evaluate-all; при
+    EVALUATION_SHARDS > 0 - только кампании шардов этой реплики
+    """
+    rows = await evaluate_due_owned(db, engine)
     
-    if not dry_run:
-        await db.commit()
+    return bulk_evaluation_response(rows)
+
+
+@router.post("/campaigns/evaluate-all/stream")
+async def evaluate_all_stream(
+    dry_run: bool = Query(False, description="Не сохранять target_status в БД"),
+    chunk_size: int = Query(1000, ge=1, le=10000, description="Размер порции чтения"),
+    engine: RuleEngine = Depends(get_rule_engine)
+):
+    """
+    Потоковый вариант evaluate-all: результаты отдаются в NDJSON по мере
+    вычисления порций, память не растет с числом кампаний
+    """
+    async def generate():
+        # Своя сессия: она должна жить, пока отдается тело ответа
+        async with AsyncSessionLocal() as db:
+            async for rows in stream_evaluations(db, engine, chunk_size, dry_run):
+                yield ndjson_lines(rows)
     
-    return BulkEvaluationResponse(
-        evaluated=len(results),
-        results=results
-    )
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 @router.get("/campaigns/{id}/evaluation-history", response_model=list[EvaluationLogResponse])
 async def get_history(
     id: UUID,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    since: Optional[datetime] = Query(None, description="Начало окна (включительно)"),
+    until: Optional[datetime] = Query(None, description="Конец окна (не включительно)"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
     db: AsyncSession = Depends(get_db)
 ):
-    """История вычислений для кампании"""
+    """
+    История вычислений для кампании.
+    Окно since/until отсекает лишние партиции логов.
+    С cursor - keyset-пагинация по (created_at, id) (skip игнорируется)
+    """
     campaign = await db.get(Campaign, id)
     if not campaign:
         raise HTTPException(404, "Campaign not found")
     
+    query = select(RuleEvaluationLog).where(RuleEvaluationLog.campaign_id == id)
+    if since is not None:
+        query = query.where(RuleEvaluationLog.created_at >= since)
+    if until is not None:
+        query = query.where(RuleEvaluationLog.created_at < until)
+    
+    if cursor is not None:
+        created_at, log_id = decode_cursor(cursor, 2)
+        try:
+            key = (datetime.fromisoformat(created_at), UUID(log_id))
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+        query = query.where(
+            tuple_(RuleEvaluationLog.created_at, RuleEvaluationLog.id) < tuple_(*key)
+        )
+    else:
+        query = query.offset(skip)
+    
     result = await db.execute(
-        select(RuleEvaluationLog)
-        .where(RuleEvaluationLog.campaign_id == id)
-        .order_by(desc(RuleEvaluationLog.created_at))
-        .offset(skip)
+        query
+        .order_by(desc(RuleEvaluationLog.created_at), desc(RuleEvaluationLog.id))
         .limit(limit)
     )
+    logs = result.scalars().all()
     
-    return result.scalars().all()
\ No newline at end of file
+    if len(logs) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(logs[-1].created_at.isoformat(), logs[-1].id)
+    return logs
+
+
+@router.get("/evaluations/snapshot-cache")
+async def get_snapshot_cache_stats():
+    """Счетчики кэша снимков кампаний (попадания, промахи, вытеснения)"""
+    return snapshot_cache.stats()
@@ -0,0 +1,373 @@
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, update, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.enums import CampaignStatus, TriggeredRule
+from app.campaigns.models import Campaign
+from app.schedules.models import CampaignSchedule
+from app.schedules.index import CompiledSchedule, schedule_index
+from .engine import RuleEngine
+from .log_sink import EvaluationLogSink
+from .transitions import transition_queue
+from .snapshots import (
+    CampaignSnapshot, ScheduleSlot, SNAPSHOT_COLUMNS, SLOT_COLUMNS, snapshot_cache, invalidate_after_commit
+)
+from .metrics import record_triggers
+from .pushdown import evaluate_pushdown, use_pushdown
+
+
+EvaluationRow = Tuple[UUID, CampaignStatus, Optional[TriggeredRule]]
+
+
+async def load_campaigns(db: AsyncSession, *criteria) -> List[CampaignSnapshot]:
+    """
+    Снимки кампаний по условию: Core-запрос только нужных колонок,
+    без ORM-объектов, identity map и отслеживания изменений
+    """
+    result = await db.execute(select(*SNAPSHOT_COLUMNS).where(*criteria))
+    return [CampaignSnapshot(*row) for row in result.all()]
+
+
+def _group_slots(rows) -> Dict[UUID, List[ScheduleSlot]]:
+    schedules_by_campaign: Dict[UUID, List[ScheduleSlot]] = {}
+    for row in rows:
+        slot = ScheduleSlot._make(row)
+        schedules_by_campaign.setdefault(slot.campaign_id, []).append(slot)
+    return schedules_by_campaign
+
+
+async def load_schedules(
+    db: AsyncSession,
+    campaigns: Sequence[Campaign]
+) -> Dict[UUID, List[ScheduleSlot]]:
+    """Загружает слоты расписания для кампаний с schedule_enabled"""
+    schedule_ids = [c.id for c in campaigns if c.schedule_enabled]
+    if not schedule_ids:
+        return {}
+
+    result = await db.execute(
+        select(*SLOT_COLUMNS)
+        .where(CampaignSchedule.campaign_id.in_(schedule_ids))
+    )
+    return _group_slots(result.all())
+
+
+async def load_snapshots(
+    db: AsyncSession,
+    campaign_ids: Sequence[UUID]
+) -> Tuple[List[CampaignSnapshot], Dict[UUID, List[ScheduleSlot]]]:
+    """
+    Снимки управляемых кампаний из списка id с их расписанием: попадания -
+    из snapshot_cache, промахи - из БД (и кладутся в кэш с проверкой поколения)
+    """
+    snapshots: List[CampaignSnapshot] = []
+    missing: List[UUID] = []
+    for campaign_id in campaign_ids:
+        snapshot = snapshot_cache.get(campaign_id) if snapshot_cache.enabled else None
+        if snapshot is not None:
+            snapshots.append(snapshot)
+        else:
+            missing.append(campaign_id)
+
+    if missing:
+        generation = snapshot_cache.generation()
+        loaded = await load_campaigns(db, Campaign.id.in_(missing), Campaign.is_managed == True)
+        loaded_schedules = await load_schedules(db, loaded)
+        for snapshot in loaded:
+            snapshot.schedules = tuple(loaded_schedules.get(snapshot.id, ()))
+            snapshot_cache.put(snapshot, generation)
+        snapshots.extend(loaded)
+
+    schedules_by_campaign = {s.id: list(s.schedules) for s in snapshots if s.schedules}
+    return snapshots, schedules_by_campaign
+
+
+async def load_managed_schedules(db: AsyncSession) -> Dict[UUID, List[ScheduleSlot]]:
+    """
+    Слоты всех управляемых кампаний с расписанием одним JOIN
+    (вместо IN-списка из всех id; использует ix_campaigns_managed_schedule)
+    """
+    result = await db.execute(
+        select(*SLOT_COLUMNS)
+        .join(Campaign, Campaign.id == CampaignSchedule.campaign_id)
+        .where(Campaign.is_managed == True, Campaign.schedule_enabled == True)
+    )
+    return _group_slots(result.all())
+
+
+async def evaluate_campaigns(
+    engine: RuleEngine,
+    db: AsyncSession,
+    campaigns: Sequence[Campaign],
+    schedules_by_campaign: Dict[UUID, List[CampaignSchedule]],
+    current_time: datetime,
+    dry_run: bool = False,
+    log_sink: Optional[EvaluationLogSink] = None
+) -> List[EvaluationRow]:
+    """
+    Вычисляет кампании (RuleEngine.evaluate_many) и (если не dry_run) сохраняет результат.
+    Логи пишутся многострочными INSERT через log_sink (по умолчанию - новый),
+    target_status - set-based UPDATE только для изменившихся кампаний
+    """
+    # Каждое расписание компилируется один раз: для вердикта и для transition_queue.
+    # Снимки из snapshot_cache приходят с уже скомпилированным расписанием
+    cached = {
+        c.id: c.compiled_schedule for c in campaigns
+        if getattr(c, "compiled_schedule", None) is not None
+    }
+    to_compile = schedules_by_campaign
+    if cached:
+        to_compile = {k: v for k, v in schedules_by_campaign.items() if k not in cached}
+    compiled = schedule_index.get_many(to_compile)
+    compiled.update(cached)
+    statuses, rules = await engine.evaluate_many(campaigns, schedules_by_campaign, current_time, compiled)
+    record_triggers(rules)
+
+    if not dry_run:
+        await persist_results(
+            engine, db, campaigns, statuses, rules, schedules_by_campaign, current_time, log_sink, compiled
+        )
+
+    return [(campaign.id, status, rule) for campaign, status, rule in zip(campaigns, statuses, rules)]
+
+
+async def evaluate_managed(
+    db: AsyncSession,
+    engine: RuleEngine,
+    current_time: Optional[datetime] = None,
+    dry_run: bool = False
+) -> List[EvaluationRow]:
+    """
+    Вычисляет все управляемые кампании и (если не dry_run) коммитит результат.
+    При EVALUATION_BACKEND=sql - одним запросом в БД (см. pushdown.py)
+    """
+    current_time = current_time or datetime.now()
+    if use_pushdown(engine):
+        rows = await evaluate_pushdown(db, engine, current_time, dry_run)
+        if not dry_run:
+            await db.commit()
+        return rows
+
+    campaigns = await load_campaigns(db, Campaign.is_managed == True)
+    if not campaigns:
+        return []
+
+    schedules_by_campaign = await load_managed_schedules(db)
+    rows = await evaluate_campaigns(engine, db, campaigns, schedules_by_campaign, current_time, dry_run)
+    if not dry_run:
+        await db.commit()
+    return rows
+
+
+async def persist_results(
+    engine: RuleEngine,
+    db: AsyncSession,
+    campaigns: Sequence[Campaign],
+    statuses: Sequence[CampaignStatus],
+    rules: Sequence[Optional[TriggeredRule]],
+    schedules_by_campaign: Dict[UUID, List[CampaignSchedule]],
+    current_time: datetime,
+    log_sink: Optional[EvaluationLogSink] = None,
+    compiled: Optional[Mapping[UUID, CompiledSchedule]] = None
+) -> None:
+    """
+    Сохраняет результаты вычисления: логи по политике логирования,
+    target_status и отпечатки входов - set-based UPDATE.
+    campaigns - ORM-объекты или CampaignSnapshot
+    """
+    log_sink = log_sink or EvaluationLogSink(db)
+    changed: Dict[CampaignStatus, List[UUID]] = {}
+    fingerprints: List[dict] = []
+    for campaign, status, rule in zip(campaigns, statuses, rules):
+        schedules = schedules_by_campaign.get(campaign.id, [])
+        write_log, fingerprint = engine.should_log(campaign, status, schedules)
+        if write_log:
+            await log_sink.add(engine.build_log_row(
+                campaign=campaign,
+                status=status,
+                rule=rule,
+                schedules=schedules,
+                current_time=current_time
+            ))
+        if fingerprint is not None:
+            fingerprints.append({"campaign_id": campaign.id, "fingerprint": fingerprint})
+            _set_committed(campaign, "evaluation_fingerprint", fingerprint)
+        if campaign.target_status != status:
+            changed.setdefault(status, []).append(campaign.id)
+            _set_committed(campaign, "target_status", status)
+    await log_sink.flush()
+    await write_target_statuses(db, changed)
+    await write_fingerprints(db, fingerprints)
+    schedule_transitions(campaigns, schedules_by_campaign, current_time, compiled)
+
+
+def _set_committed(campaign, key: str, value) -> None:
+    # ORM-объект не помечается "грязным": UPDATE делают write_* функции
+    if isinstance(campaign, Campaign):
+        set_committed_value(campaign, key, value)
+    else:
+        setattr(campaign, key, value)
+
+
+def schedule_transitions(
+    campaigns: Sequence[Campaign],
+    schedules_by_campaign: Dict[UUID, List[CampaignSchedule]],
+    current_time: datetime,
+    compiled: Optional[Mapping[UUID, CompiledSchedule]] = None
+) -> None:
+    """
+    Ставит в transition_queue ближайшую смену вердикта расписания.
+    compiled - расписания, уже скомпилированные в этом прогоне
+    """
+    for campaign in campaigns:
+        schedules = schedules_by_campaign.get(campaign.id)
+        if campaign.is_managed and campaign.schedule_enabled and schedules:
+            schedule = compiled[campaign.id] if compiled is not None else schedule_index.get(campaign.id, schedules)
+            due = schedule.next_transition(current_time)
+            transition_queue.schedule(campaign.id, due)
+        else:
+            transition_queue.discard(campaign.id)
+
+
+async def load_snapshot(db: AsyncSession, campaign_id: UUID) -> Optional[CampaignSnapshot]:
+    """
+    Снимок кампании с расписанием: из snapshot_cache, при промахе - из БД.
+    None - кампании нет
+    """
+    if snapshot_cache.enabled:
+        snapshot = snapshot_cache.get(campaign_id)
+        if snapshot is not None:
+            return snapshot
+    generation = snapshot_cache.generation()
+
+    campaign = await db.get(Campaign, campaign_id)
+    if campaign is None:
+        return None
+
+    schedules = []
+    if campaign.schedule_enabled:
+        result = await db.execute(
+            select(CampaignSchedule).where(CampaignSchedule.campaign_id == campaign_id)
+        )
+        schedules = result.scalars().all()
+
+    snapshot = CampaignSnapshot.from_model(campaign, schedules)
+    snapshot_cache.put(snapshot, generation)
+    return snapshot
+
+
+async def evaluate_due(
+    db: AsyncSession,
+    engine: RuleEngine,
+    current_time: Optional[datetime] = None,
+    keep: Optional[Callable[[Hashable], bool]] = None
+) -> List[EvaluationRow]:
+    """
+    Вычисляет только кампании, у которых к current_time сменился вердикт
+    расписания (срок из transition_queue), и сохраняет результат.
+    keep - фильтр id (шарды этой реплики): остальные сроки отбрасываются.
+    При ошибке забранные кампании возвращаются в очередь со сроком current_time
+    """
+    current_time = current_time or datetime.now()
+    due_ids = transition_queue.pop_due(current_time)
+    if keep is not None:
+        due_ids = [campaign_id for campaign_id in due_ids if keep(campaign_id)]
+    if not due_ids:
+        return []
+
+    try:
+        campaigns, schedules_by_campaign = await load_snapshots(db, due_ids)
+        rows = await evaluate_campaigns(engine, db, campaigns, schedules_by_campaign, current_time)
+        await db.commit()
+    except Exception:
+        for campaign_id in due_ids:
+            transition_queue.schedule(campaign_id, current_time)
+        raise
+    return rows
+
+
+async def write_target_statuses(
+    db: AsyncSession,
+    changed: Dict[CampaignStatus, List[UUID]]
+) -> int:
+    """
+    Обновляет target_status одним UPDATE ... WHERE id = ANY(:ids) на каждый статус.
+    changed содержит только кампании, у которых статус действительно изменился
+    """
+    updated = 0
+    for status, ids in changed.items():
+        if not ids:
+            continue
+        await db.execute(
+            update(Campaign)
+            .where(Campaign.id == any_(bindparam("ids", ids, type_=ARRAY(Campaign.id.type))))
+            .values(target_status=status)
+            .execution_options(synchronize_session=False)
+        )
+        invalidate_after_commit(db, ids)
+        updated += len(ids)
+    return updated
+
+
+async def write_fingerprints(db: AsyncSession, fingerprints: List[dict]) -> int:
+    """
+    Сохраняет отпечатки входов одним executemany UPDATE.
+    updated_at не трогаем: это служебное поле, а не изменение кампании
+    """
+    if not fingerprints:
+        return 0
+    invalidate_after_commit(db, (row["campaign_id"] for row in fingerprints))
+    campaigns = Campaign.__table__
+    await db.execute(
+        update(campaigns)
+        .where(campaigns.c.id == bindparam("campaign_id"))
+        .values(
+            evaluation_fingerprint=bindparam("fingerprint"),
+            updated_at=campaigns.c.updated_at
+        ),
+        fingerprints
+    )
+    return len(fingerprints)
+
+
+async def stream_evaluations(
+    db: AsyncSession,
+    engine: RuleEngine,
+    chunk_size: int = 1000,
+    dry_run: bool = False,
+    current_time: Optional[datetime] = None
+) -> AsyncIterator[List[EvaluationRow]]:
+    """
+    Вычисляет все управляемые кампании порциями по chunk_size.
+
+    Снимки кампаний читаются серверным курсором, результаты каждой порции
+    пишутся сразу, а в identity map ничего не попадает, так что в памяти
+    держится не больше одной порции. Коммит - один раз в конце, если не dry_run
+    (серверный курсор живет внутри транзакции); отложенные сбросы snapshot_cache
+    ограничены его размером (invalidate_after_commit).
+    """
+    current_time = current_time or datetime.now()
+    log_sink = None if dry_run else EvaluationLogSink(db)
+
+    campaigns_stream = await db.stream(
+        select(*SNAPSHOT_COLUMNS)
+        .where(Campaign.is_managed == True)
+        .execution_options(yield_per=chunk_size)
+    )
+
+    async for chunk in campaigns_stream.partitions(chunk_size):
+        campaigns = [CampaignSnapshot(*row) for row in chunk]
+        schedules_by_campaign = await load_schedules(db, campaigns)
+        rows = await evaluate_campaigns(
+            engine, db, campaigns, schedules_by_campaign, current_time, dry_run, log_sink
+        )
+
+        yield rows
+
+    if not dry_run:
+        await db.commit()
@@ -0,0 +1,218 @@
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.campaigns.models import Campaign
+from .engine import RuleEngine
+from .models import EvaluationShardLease
+from .metrics import record_evaluate_all
+from .service import (
+    EvaluationRow, load_campaigns, load_schedules, evaluate_campaigns, evaluate_due, evaluate_managed
+)
+from .transitions import transition_queue
+from .pushdown import evaluate_pushdown, use_pushdown
+
+# Шард считается по двум последним байтам UUID: для uuid4 они случайные
+MAX_SHARDS = 1 << 16
+
+
+def worker_id() -> str:
+    """Идентификатор воркера-владельца аренды"""
+    return settings.EVALUATION_WORKER_ID or f"{socket.gethostname()}:{os.getpid()}"
+
+
+def shard_of(campaign_id: UUID, shards: int) -> int:
+    """Номер шарда кампании (тот же, что shard_expression() в SQL)"""
+    return int.from_bytes(campaign_id.bytes[-2:], "big") % shards
+
+
+def shard_expression(column, shards: int):
+    """SQL-выражение номера шарда для колонки UUID"""
+    raw = func.uuid_send(column)
+    return (func.get_byte(raw, 14) * 256 + func.get_byte(raw, 15)) % shards
+
+
+async def claim_shard(
+    db: AsyncSession,
+    shard: int,
+    owner: str,
+    requested_at: datetime,
+    lease_ttl: float
+) -> bool:
+    """
+    Берет шард в аренду на lease_ttl секунд. Не выйдет, если шард арендован
+    другим воркером или его прогон начался уже после requested_at
+    (результат не старее того, что получили бы мы)
+    """
+    now = func.clock_timestamp()
+    leases = EvaluationShardLease.__table__
+    stmt = insert(leases).values(
+        shard=shard,
+        owner=owner,
+        leased_until=now + timedelta(seconds=lease_ttl),
+        started_at=now
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[leases.c.shard],
+        set_={
+            "owner": stmt.excluded.owner,
+            "leased_until": stmt.excluded.leased_until,
+            "started_at": stmt.excluded.started_at,
+        },
+        where=or_(leases.c.leased_until.is_(None), leases.c.leased_until < now)
+        & or_(leases.c.started_at.is_(None), leases.c.started_at < requested_at)
+    ).returning(leases.c.shard)
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none() is not None
+
+
+async def release_shard(db: AsyncSession, shard: int, owner: str, completed: bool) -> None:
+    """
+    Снимает аренду. После успешного прогона owner остается: до следующего
+    захвата шарда его сроки расписания (evaluate_due_owned) ведет этот воркер.
+    Неудачный прогон (completed=False) сбрасывает owner и started_at,
+    чтобы шард мог взять другой воркер
+    """
+    leases = EvaluationShardLease.__table__
+    values = {"leased_until": None}
+    if completed:
+        values["evaluated_at"] = func.clock_timestamp()
+    else:
+        values["owner"] = None
+        values["started_at"] = None
+    await db.execute(
+        update(leases)
+        .where(leases.c.shard == shard, leases.c.owner == owner)
+        .values(**values)
+    )
+
+
+async def owned_shards(db: AsyncSession, owner: str) -> Set[int]:
+    """Шарды, последний успешный (или текущий) прогон которых - у owner"""
+    leases = EvaluationShardLease.__table__
+    result = await db.execute(select(leases.c.shard).where(leases.c.owner == owner))
+    return set(result.scalars().all())
+
+
+async def evaluate_shard(
+    db: AsyncSession,
+    engine: RuleEngine,
+    shard: int,
+    shards: int,
+    current_time: datetime
+) -> List[EvaluationRow]:
+    """Вычисляет и сохраняет управляемые кампании одного шарда (без коммита)"""
+    in_shard = shard_expression(Campaign.id, shards) == shard
+    if use_pushdown(engine):
+        return await evaluate_pushdown(db, engine, current_time, where=in_shard)
+
+    campaigns = await load_campaigns(db, Campaign.is_managed == True, in_shard)
+    if not campaigns:
+        return []
+
+    schedules_by_campaign = await load_schedules(db, campaigns)
+    return await evaluate_campaigns(engine, db, campaigns, schedules_by_campaign, current_time)
+
+
+async def evaluate_sharded(
+    db: AsyncSession,
+    engine: RuleEngine,
+    shards: Optional[int] = None,
+    owner: Optional[str] = None,
+    current_time: Optional[datetime] = None,
+    lease_ttl: Optional[float] = None
+) -> Tuple[List[EvaluationRow], List[int]]:
+    """
+    evaluate-all для нескольких реплик: кампании разбиты на shards шардов,
+    воркер вычисляет только те, что сумел арендовать. Каждый шард -
+    отдельная транзакция: аренда коммитится сразу, результаты вычисления
+    и снятие аренды - вместе.
+    Возвращает строки результата и номера вычисленных шардов
+    """
+    shards = shards or settings.EVALUATION_SHARDS
+    owner = owner or worker_id()
+    current_time = current_time or datetime.now()
+    lease_ttl = settings.EVALUATION_SHARD_LEASE_TTL if lease_ttl is None else lease_ttl
+    if not 0 < shards <= MAX_SHARDS:
+        raise ValueError(f"shards must be in 1..{MAX_SHARDS}")
+
+    requested_at = (await db.execute(select(func.clock_timestamp()))).scalar_one()
+    await db.commit()
+
+    # Разные воркеры начинают с разных шардов, чтобы реже сталкиваться
+    start = hash(owner) % shards
+    rows: List[EvaluationRow] = []
+    evaluated: List[int] = []
+    for offset in range(shards):
+        shard = (start + offset) % shards
+        claimed = await claim_shard(db, shard, owner, requested_at, lease_ttl)
+        await db.commit()
+        if not claimed:
+            continue
+        try:
+            rows.extend(await evaluate_shard(db, engine, shard, shards, current_time))
+            await release_shard(db, shard, owner, completed=True)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            await release_shard(db, shard, owner, completed=False)
+            await db.commit()
+            raise
+        db.expunge_all()
+        evaluated.append(shard)
+
+    # Сроки расписания чужих шардов ведут их владельцы
+    claimed = set(evaluated)
+    transition_queue.retain(lambda campaign_id: shard_of(campaign_id, shards) in claimed)
+    return rows, evaluated
+
+
+async def evaluate_due_owned(
+    db: AsyncSession,
+    engine: RuleEngine,
+    current_time: Optional[datetime] = None,
+    owner: Optional[str] = None
+) -> List[EvaluationRow]:
+    """
+    evaluate_due с учетом шардов: при EVALUATION_SHARDS > 0 - только кампании шардов,
+    которыми владеет этот воркер (owner в evaluation_shard_leases), чтобы
+    реплики не вычисляли одну смену расписания дважды
+    """
+    shards = settings.EVALUATION_SHARDS
+    if shards <= 0:
+        return await evaluate_due(db, engine, current_time)
+
+    current_time = current_time or datetime.now()
+    next_due = transition_queue.next_due()
+    if next_due is None or next_due > current_time:
+        return []
+    owned = await owned_shards(db, owner or worker_id())
+    return await evaluate_due(
+        db, engine, current_time, keep=lambda campaign_id: shard_of(campaign_id, shards) in owned
+    )
+
+
+async def evaluate_all(
+    db: AsyncSession,
+    engine: RuleEngine,
+    dry_run: bool = False
+) -> List[EvaluationRow]:
+    """
+    evaluate-all без HTTP: при EVALUATION_SHARDS > 0 - только арендованные
+    шарды, иначе (и в dry_run) - все управляемые кампании
+    """
+    started = time.perf_counter()
+    if settings.EVALUATION_SHARDS > 0 and not dry_run:
+        rows, _ = await evaluate_sharded(db, engine)
+    else:
+        rows = await evaluate_managed(db, engine, dry_run=dry_run)
+    record_evaluate_all(len(rows), time.perf_counter() - started)
+    return rows
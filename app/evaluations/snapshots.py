@@ -0,0 +1,233 @@
+from collections import OrderedDict
+from datetime import time
+from decimal import Decimal
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.enums import CampaignStatus
+from app.campaigns.models import Campaign
+from app.schedules.models import CampaignSchedule
+from app.schedules.index import CompiledSchedule
+
+
+class ScheduleSlot(NamedTuple):
+    """Слот расписания без ORM-обвязки"""
+    id: UUID
+    campaign_id: UUID
+    day_of_week: int
+    start_time: time
+    end_time: time
+
+    @classmethod
+    def from_model(cls, slot: CampaignSchedule) -> "ScheduleSlot":
+        return cls(slot.id, slot.campaign_id, slot.day_of_week, slot.start_time, slot.end_time)
+
+
+class CampaignSnapshot:
+    """
+    Снимок полей кампании, которые читают правила и логирование.
+    Подходит везде, где движок ожидает Campaign. compiled_schedule
+    заполняет SnapshotCache.put(): закэшированный снимок хранит уже
+    скомпилированное расписание
+    """
+
+    __slots__ = (
+        "id",
+        "current_status",
+        "target_status",
+        "is_managed",
+        "budget_limit",
+        "spend_today",
+        "stock_days_left",
+        "stock_days_min",
+        "schedule_enabled",
+        "evaluation_fingerprint",
+        "schedules",
+        "compiled_schedule",
+    )
+
+    def __init__(
+        self,
+        id: UUID,
+        current_status: CampaignStatus,
+        target_status: CampaignStatus,
+        is_managed: bool,
+        budget_limit: Optional[Decimal],
+        spend_today: Decimal,
+        stock_days_left: Optional[int],
+        stock_days_min: Optional[int],
+        schedule_enabled: bool,
+        evaluation_fingerprint: Optional[int] = None,
+        schedules: Tuple[ScheduleSlot, ...] = ()
+    ):
+        self.id = id
+        self.current_status = current_status
+        self.target_status = target_status
+        self.is_managed = is_managed
+        self.budget_limit = budget_limit
+        self.spend_today = spend_today
+        self.stock_days_left = stock_days_left
+        self.stock_days_min = stock_days_min
+        self.schedule_enabled = schedule_enabled
+        self.evaluation_fingerprint = evaluation_fingerprint
+        self.schedules = schedules
+        self.compiled_schedule: Optional[CompiledSchedule] = None
+
+    @classmethod
+    def from_model(
+        cls,
+        campaign: Campaign,
+        schedules: Sequence[CampaignSchedule] = ()
+    ) -> "CampaignSnapshot":
+        return cls(
+            id=campaign.id,
+            current_status=campaign.current_status,
+            target_status=campaign.target_status,
+            is_managed=campaign.is_managed,
+            budget_limit=campaign.budget_limit,
+            spend_today=campaign.spend_today,
+            stock_days_left=campaign.stock_days_left,
+            stock_days_min=campaign.stock_days_min,
+            schedule_enabled=campaign.schedule_enabled,
+            evaluation_fingerprint=campaign.evaluation_fingerprint,
+            schedules=tuple(ScheduleSlot.from_model(s) for s in schedules),
+        )
+
+
+# Колонки для загрузки снимков Core-запросом, в порядке аргументов конструкторов:
+# CampaignSnapshot(*row) / ScheduleSlot(*row) без ORM-объектов и identity map
+SNAPSHOT_COLUMNS = tuple(Campaign.__table__.c[name] for name in CampaignSnapshot.__slots__[:-2])
+SLOT_COLUMNS = tuple(CampaignSchedule.__table__.c[name] for name in ScheduleSlot._fields)
+
+
+class SnapshotCache:
+    """
+    LRU-кэш снимков управляемых кампаний (вместе с их расписанием).
+
+    Сбрасывается роутерами кампаний и расписаний при записи и движком при
+    смене target_status. Записи, сделанные другими процессами, кэш не видит,
+    поэтому он выключен по умолчанию (SNAPSHOT_CACHE_SIZE = 0).
+
+    Каждый сброс ключа получает номер поколения. Загрузка из БД берет
+    generation() до чтения и передает его в put(): если ключ сбросили, пока
+    шла загрузка, снимок устарел и не кэшируется
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self.maxsize = settings.SNAPSHOT_CACHE_SIZE if maxsize is None else maxsize
+        self._snapshots: "OrderedDict[UUID, CampaignSnapshot]" = OrderedDict()
+        # Поколение последнего сброса по ключу; забытые (сверх maxsize) сбросы
+        # учитываются через _floor - поколение последнего забытого
+        self._generation = 0
+        self._invalidated: "OrderedDict[UUID, int]" = OrderedDict()
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, campaign_id: UUID) -> Optional[CampaignSnapshot]:
+        snapshot = self._snapshots.get(campaign_id)
+        if snapshot is None:
+            self.misses += 1
+            return None
+        self._snapshots.move_to_end(campaign_id)
+        self.hits += 1
+        return snapshot
+
+    def generation(self) -> int:
+        """Текущее поколение: берется перед загрузкой снимка из БД"""
+        return self._generation
+
+    def put(self, snapshot: CampaignSnapshot, generation: Optional[int] = None) -> None:
+        """generation - из generation() перед загрузкой; None - без проверки"""
+        if not self.enabled or not snapshot.is_managed:
+            return
+        if generation is not None and (
+            generation < self._floor or self._invalidated.get(snapshot.id, 0) > generation
+        ):
+            return
+        if snapshot.schedules and snapshot.compiled_schedule is None:
+            snapshot.compiled_schedule = CompiledSchedule(snapshot.schedules)
+        self._snapshots[snapshot.id] = snapshot
+        self._snapshots.move_to_end(snapshot.id)
+        while len(self._snapshots) > self.maxsize:
+            self._snapshots.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, campaign_id: UUID) -> None:
+        self._snapshots.pop(campaign_id, None)
+        if not self.enabled:
+            return
+        self._generation += 1
+        self._invalidated[campaign_id] = self._generation
+        self._invalidated.move_to_end(campaign_id)
+        while len(self._invalidated) > self.maxsize:
+            _, self._floor = self._invalidated.popitem(last=False)
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+        self._invalidated.clear()
+        self._generation += 1
+        self._floor = self._generation
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._snapshots),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+snapshot_cache = SnapshotCache()
+
+
+_PENDING_INVALIDATIONS = "snapshot_cache_invalidations"
+# Вместо набора id: сбросить кэш целиком (отложенных сбросов больше, чем записей в кэше)
+_CLEAR_ALL = "clear"
+
+
+def invalidate_after_commit(db: AsyncSession, campaign_ids: Iterable[UUID]) -> None:
+    """
+    Сбрасывает снимки кампаний после окончания транзакции db, а не сразу:
+    иначе конкурентная загрузка до коммита прочла бы старые данные и
+    снова положила их в кэш.
+
+    Отложенных id держится не больше SNAPSHOT_CACHE_SIZE: длинная транзакция
+    (stream_evaluations) сверх этого сбросит кэш целиком
+    """
+    if not snapshot_cache.enabled:
+        return
+    info = db.sync_session.info
+    pending = info.setdefault(_PENDING_INVALIDATIONS, set())
+    if pending == _CLEAR_ALL:
+        return
+    pending.update(campaign_ids)
+    if len(pending) > snapshot_cache.maxsize:
+        info[_PENDING_INVALIDATIONS] = _CLEAR_ALL
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _invalidate_pending(session: Session, transaction) -> None:
+    # Конец корневой транзакции (коммит или откат; savepoint пропускаются).
+    # После отката тоже: persist_results меняет закэшированные снимки в памяти
+    if transaction.parent is None:
+        pending = session.info.pop(_PENDING_INVALIDATIONS, ())
+        if pending == _CLEAR_ALL:
+            snapshot_cache.clear()
+            return
+        for campaign_id in pending:
+            snapshot_cache.invalidate(campaign_id)
@@ -0,0 +1,75 @@
+import heapq
+import itertools
+from datetime import datetime
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class TransitionQueue:
+    """
+    Очередь моментов, когда у кампании меняется вердикт расписания.
+
+    Мин-куча (due, seq, campaign_id) с ленивым удалением: актуальный срок
+    каждой кампании хранится в _due, устаревшие записи кучи пропускаются.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, Hashable]] = []
+        self._due: Dict[Hashable, datetime] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, campaign_id: Hashable, due: Optional[datetime]) -> None:
+        """Ставит (или переносит) срок кампании; due = None - убрать из очереди"""
+        if due is None:
+            self.discard(campaign_id)
+            return
+        if self._due.get(campaign_id) == due:
+            return
+        self._due[campaign_id] = due
+        heapq.heappush(self._heap, (due, next(self._seq), campaign_id))
+        if len(self._heap) > 2 * len(self._due) + 1024:
+            self._compact()
+
+    def discard(self, campaign_id: Hashable) -> None:
+        self._due.pop(campaign_id, None)
+
+    def pop_due(self, now: datetime) -> List[Hashable]:
+        """Забирает все кампании со сроком <= now"""
+        due_ids = []
+        while self._heap and self._heap[0][0] <= now:
+            due, _, campaign_id = heapq.heappop(self._heap)
+            if self._due.get(campaign_id) == due:
+                del self._due[campaign_id]
+                due_ids.append(campaign_id)
+        return due_ids
+
+    def retain(self, keep: Callable[[Hashable], bool]) -> int:
+        """Оставляет только кампании, для которых keep(id) истинно; возвращает число удаленных"""
+        dropped = [campaign_id for campaign_id in self._due if not keep(campaign_id)]
+        for campaign_id in dropped:
+            del self._due[campaign_id]
+        if dropped:
+            self._compact()
+        return len(dropped)
+
+    def next_due(self) -> Optional[datetime]:
+        """Ближайший срок в очереди"""
+        while self._heap:
+            due, _, campaign_id = self._heap[0]
+            if self._due.get(campaign_id) == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._due.clear()
+
+    def _compact(self) -> None:
+        self._heap = [(due, next(self._seq), campaign_id) for campaign_id, due in self._due.items()]
+        heapq.heapify(self._heap)
+
+
+transition_queue = TransitionQueue()
@@ -1,16 +1,43 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 import time
 
 from app.core.config import settings
+from app.core.database import engine
+from app.core.pool import pool_stats
+from app.core.metrics import registry, MetricsMiddleware, CONTENT_TYPE
 from app.campaigns.router import router as campaigns_router
 from app.schedules.router import router as schedules_router
 from app.evaluations.router import router as evaluations_router
+from app.evaluations.dirty import DirtyCampaignConsumer
+from app.evaluations.partitions import PartitionMaintenanceJob
+from app.evaluations.periodic import PeriodicEvaluator
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if settings.INCREMENTAL_EVALUATION:
+        tasks.append(DirtyCampaignConsumer())
+    if settings.LOG_PARTITION_MAINTENANCE:
+        tasks.append(PartitionMaintenanceJob())
+    if settings.PERIODIC_EVALUATION:
+        tasks.append(PeriodicEvaluator())
+    
+    for task in tasks:
+        task.start()
+    yield
+    for task in tasks:
+        await task.stop()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -21,6 +48,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(campaigns_router, prefix=settings.API_V1_STR)
 app.include_router(schedules_router, prefix=settings.API_V1_STR)
 app.include_router(evaluations_router, prefix=settings.API_V1_STR)
@@ -37,3 +66,15 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/health/pool")
+async def pool_health():
+    """Состояние пула соединений и задержка выдачи соединений (для подбора DB_POOL_SIZE)"""
+    return {**engine.pool.status_dict(), **pool_stats.stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Метрики в формате Prometheus (значения этого воркера)"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
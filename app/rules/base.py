@@ -2,9 +2,13 @@ from abc import ABC, abstractmethod
 from typing import Optional, Tuple
 from datetime import datetime
 
+import numpy as np
+from sqlalchemy import ColumnElement, Table
+
 from app.core.enums import TriggeredRule, CampaignStatus
 from app.campaigns.models import Campaign
 from app.schedules.models import CampaignSchedule
+from app.evaluations.batch import CampaignBatch
 
 
 class Rule(ABC):
@@ -31,7 +35,29 @@ class Rule(ABC):
         """
         pass
     
-    @abstractmethod
+    # True - правило делает I/O и вызывается движком через await evaluate()
+    requires_io: bool = False
+    
+    @property
+    def is_async(self) -> bool:
+        """
+        Вызывается ли правило движком через await evaluate(): с requires_io
+        или если переопределен evaluate() (правила, написанные до check())
+        """
+        return self.requires_io or type(self).evaluate is not Rule.evaluate
+    
+    def check(
+        self,
+        campaign: Campaign,
+        schedules: Optional[list[CampaignSchedule]] = None,
+        current_time: Optional[datetime] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Оценивает правило синхронно (для правил без I/O).
+        Возвращает (сработало ли, детали для лога)
+        """
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает синхронное вычисление")
+    
     async def evaluate(
         self,
         campaign: Campaign,
@@ -40,6 +66,27 @@ class Rule(ABC):
     ) -> Tuple[bool, Optional[str]]:
         """
         Оценивает правило.
-        Возвращает (сработало ли, детали для лога)
+        Возвращает (сработало ли, детали для лога).
+        Правила с I/O переопределяют этот метод
+        """
+        return self.check(campaign, schedules, current_time)
+    
+    def evaluate_batch(self, batch: CampaignBatch) -> np.ndarray:
+        """
+        Оценивает правило сразу для набора кампаний.
+        Возвращает булеву маску сработавших кампаний
+        """
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает пакетное вычисление")
+    
+    def sql_condition(
+        self,
+        campaigns: Table,
+        schedules: Table,
+        current_time: datetime
+    ) -> ColumnElement[bool]:
+        """
+        То же правило как SQL-условие над строкой campaigns (слоты - через
+        коррелированный подзапрос к schedules) для вычисления в БД.
+        NULL в условии считается несработавшим правилом
         """
-        pass
\ No newline at end of file
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает вычисление в SQL")
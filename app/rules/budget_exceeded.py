@@ -1,9 +1,13 @@
 from typing import Optional, Tuple
 from datetime import datetime
 
+import numpy as np
+from sqlalchemy import ColumnElement, Table
+
 from app.core.enums import TriggeredRule, CampaignStatus
 from app.campaigns.models import Campaign
 from app.schedules.models import CampaignSchedule
+from app.evaluations.batch import CampaignBatch
 from app.rules.base import Rule
 
 
@@ -20,7 +24,7 @@ class BudgetExceededRule(Rule):
     def target_status(self) -> Optional[CampaignStatus]:
         return CampaignStatus.PAUSED
     
-    async def evaluate(
+    def check(
         self,
         campaign: Campaign,
         schedules: Optional[list[CampaignSchedule]] = None,
@@ -29,4 +33,17 @@ class BudgetExceededRule(Rule):
         if (campaign.budget_limit is not None and 
             campaign.spend_today >= campaign.budget_limit):
             return True, f"Расход {campaign.spend_today} >= лимита {campaign.budget_limit}"
-        return False, None
\ No newline at end of file
+        return False, None
+    
+    def evaluate_batch(self, batch: CampaignBatch) -> np.ndarray:
+        # NaN в budget_limit (NULL) даёт False
+        return batch.spend_today >= batch.budget_limit
+    
+    def sql_condition(
+        self,
+        campaigns: Table,
+        schedules: Table,
+        current_time: datetime
+    ) -> ColumnElement[bool]:
+        # NULL в budget_limit даёт NULL - правило не сработало
+        return campaigns.c.spend_today >= campaigns.c.budget_limit
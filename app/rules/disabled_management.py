@@ -1,9 +1,13 @@
 from typing import Optional, Tuple
 from datetime import datetime
 
+import numpy as np
+from sqlalchemy import ColumnElement, Table, not_
+
 from app.core.enums import TriggeredRule, CampaignStatus
 from app.campaigns.models import Campaign
 from app.schedules.models import CampaignSchedule
+from app.evaluations.batch import CampaignBatch
 from app.rules.base import Rule
 
 
@@ -20,7 +24,7 @@ class DisabledManagementRule(Rule):
     def target_status(self) -> Optional[CampaignStatus]:
         return None
     
-    async def evaluate(
+    def check(
         self,
         campaign: Campaign,
         schedules: Optional[list[CampaignSchedule]] = None,
@@ -28,4 +32,15 @@ class DisabledManagementRule(Rule):
     ) -> Tuple[bool, Optional[str]]:
         if not campaign.is_managed:
             return True, "Управление кампанией отключено"
-        return False, None
\ No newline at end of file
+        return False, None
+    
+    def evaluate_batch(self, batch: CampaignBatch) -> np.ndarray:
+        return ~batch.is_managed
+    
+    def sql_condition(
+        self,
+        campaigns: Table,
+        schedules: Table,
+        current_time: datetime
+    ) -> ColumnElement[bool]:
+        return not_(campaigns.c.is_managed)
@@ -1,9 +1,13 @@
 from typing import Optional, Tuple
 from datetime import datetime
 
+import numpy as np
+from sqlalchemy import ColumnElement, Table
+
 from app.core.enums import TriggeredRule, CampaignStatus
 from app.campaigns.models import Campaign
 from app.schedules.models import CampaignSchedule
+from app.evaluations.batch import CampaignBatch
 from app.rules.base import Rule
 
 
@@ -20,7 +24,7 @@ class LowStockRule(Rule):
     def target_status(self) -> Optional[CampaignStatus]:
         return CampaignStatus.PAUSED
     
-    async def evaluate(
+    def check(
         self,
         campaign: Campaign,
         schedules: Optional[list[CampaignSchedule]] = None,
@@ -30,4 +34,16 @@ class LowStockRule(Rule):
             campaign.stock_days_left is not None and
             campaign.stock_days_left < campaign.stock_days_min):
             return True, f"Остаток {campaign.stock_days_left} дней, минимум {campaign.stock_days_min}"
-        return False, None
\ No newline at end of file
+        return False, None
+    
+    def evaluate_batch(self, batch: CampaignBatch) -> np.ndarray:
+        # NaN в любой из колонок (NULL) даёт False
+        return batch.stock_days_left < batch.stock_days_min
+    
+    def sql_condition(
+        self,
+        campaigns: Table,
+        schedules: Table,
+        current_time: datetime
+    ) -> ColumnElement[bool]:
+        return campaigns.c.stock_days_left < campaigns.c.stock_days_min
@@ -1,9 +1,14 @@
 from typing import Optional, Tuple
 from datetime import datetime
 
+import numpy as np
+from sqlalchemy import ColumnElement, Table, and_, exists, not_
+
 from app.core.enums import TriggeredRule, CampaignStatus
 from app.campaigns.models import Campaign
 from app.schedules.models import CampaignSchedule
+from app.schedules.index import schedule_index
+from app.evaluations.batch import CampaignBatch
 from app.rules.base import Rule
 
 
@@ -20,7 +25,7 @@ class ScheduleRule(Rule):
     def target_status(self) -> Optional[CampaignStatus]:
         return CampaignStatus.PAUSED
     
-    async def evaluate(
+    def check(
         self,
         campaign: Campaign,
         schedules: Optional[list[CampaignSchedule]] = None,
@@ -30,18 +35,35 @@ class ScheduleRule(Rule):
             return False, None
         
         now = current_time or datetime.now()
+        if schedule_index.contains(campaign.id, schedules, now):
+            return False, None
+        
         weekday = now.weekday()
         current_time_only = now.time()
-        
-        for slot in schedules:
-            if slot.day_of_week == weekday:
-                if slot.start_time <= current_time_only <= slot.end_time:
-                    return False, None
-        
         active_slots = [
             f"{s.day_of_week} {s.start_time}-{s.end_time}" 
             for s in schedules if s.day_of_week == weekday
         ]
         slots_info = ", ".join(active_slots) if active_slots else "нет слотов на сегодня"
         
-        return True, f"Текущее время {current_time_only} вне активных слотов ({slots_info})"
\ No newline at end of file
+        return True, f"Текущее время {current_time_only} вне активных слотов ({slots_info})"
+    
+    def evaluate_batch(self, batch: CampaignBatch) -> np.ndarray:
+        return batch.schedule_enabled & batch.has_schedules & ~batch.in_schedule
+    
+    def sql_condition(
+        self,
+        campaigns: Table,
+        schedules: Table,
+        current_time: datetime
+    ) -> ColumnElement[bool]:
+        # Границы слота включительно, как в CompiledSchedule.contains()
+        now = current_time.time()
+        own_slots = schedules.c.campaign_id == campaigns.c.id
+        in_slot = exists().where(
+            own_slots,
+            schedules.c.day_of_week == current_time.weekday(),
+            schedules.c.start_time <= now,
+            schedules.c.end_time >= now
+        )
+        return and_(campaigns.c.schedule_enabled, exists().where(own_slots), not_(in_slot))
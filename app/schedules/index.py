@@ -0,0 +1,178 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence
+
+from app.core.config import settings
+from .models import CampaignSchedule
+
+
+_US_PER_DAY = 24 * 60 * 60 * 1_000_000
+_US_PER_WEEK = 7 * _US_PER_DAY
+# До стольких слотов проход по ним быстрее поиска в индексе (хэш UUID, LRU)
+SCAN_MAX_SLOTS = 8
+
+
+def _week_offset(day_of_week: int, moment: time) -> int:
+    """Микросекунды от начала недели (пн 00:00)"""
+    return (
+        day_of_week * _US_PER_DAY
+        + ((moment.hour * 60 + moment.minute) * 60 + moment.second) * 1_000_000
+        + moment.microsecond
+    )
+
+
+# Смещение последнего момента: в прогоне evaluate-all current_time у всех кампаний один,
+# и пересчет datetime -> смещение стоит дороже самого поиска по интервалам
+_last_offset: tuple = (None, 0)
+
+
+def _moment_offset(moment: datetime) -> int:
+    global _last_offset
+    last, offset = _last_offset
+    if moment is not last:
+        offset = _week_offset(moment.weekday(), moment.time())
+        _last_offset = (moment, offset)
+    return offset
+
+
+class CompiledSchedule:
+    """
+    Расписание кампании в виде отсортированных непересекающихся интервалов
+    недели (границы включительно, как в ScheduleRule). Проверка - O(log n).
+    """
+
+    __slots__ = ("starts", "ends", "slot_ids")
+
+    def __init__(self, schedules: Sequence[CampaignSchedule]):
+        intervals = sorted(
+            (_week_offset(s.day_of_week, s.start_time), _week_offset(s.day_of_week, s.end_time))
+            for s in schedules
+        )
+        starts: List[int] = []
+        ends: List[int] = []
+        for start, end in intervals:
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+
+        self.starts = tuple(starts)
+        self.ends = tuple(ends)
+        self.slot_ids = frozenset(s.id for s in schedules)
+
+    def __bool__(self) -> bool:
+        return bool(self.starts)
+
+    def matches(self, schedules: Sequence[CampaignSchedule]) -> bool:
+        """
+        Скомпилировано ли из этих слотов - O(1): set_schedule заменяет все слоты
+        кампании новыми id, так что достаточно числа слотов и id одного из них
+        """
+        if len(schedules) != len(self.slot_ids):
+            return False
+        return not schedules or schedules[0].id in self.slot_ids
+
+    def contains(self, moment: datetime) -> bool:
+        """Попадает ли момент в один из слотов"""
+        offset = _moment_offset(moment)
+        i = bisect_right(self.starts, offset) - 1
+        return i >= 0 and offset <= self.ends[i]
+
+    def next_transition(self, moment: datetime) -> Optional[datetime]:
+        """
+        Ближайший момент после moment, когда contains() меняет значение.
+        None - расписание пустое и вердикт не меняется никогда
+        """
+        if not self.starts:
+            return None
+
+        offset = _moment_offset(moment)
+        i = bisect_right(self.starts, offset) - 1
+        if i >= 0 and offset <= self.ends[i]:
+            # Граница слота включительно: вне слота - со следующей микросекунды
+            target = self.ends[i] + 1
+        elif i + 1 < len(self.starts):
+            target = self.starts[i + 1]
+        else:
+            target = self.starts[0] + _US_PER_WEEK
+        return moment + timedelta(microseconds=target - offset)
+
+
+class ScheduleIndex:
+    """
+    LRU-кэш скомпилированных расписаний по campaign_id, не больше maxsize
+    записей (SCHEDULE_INDEX_SIZE; 0 - компилировать при каждом вызове).
+
+    Сбрасывается роутером расписаний при записи. Дополнительно запись
+    сверяется с переданными слотами за O(1) (CompiledSchedule.matches):
+    set_schedule пересоздает слоты, так что изменения, сделанные другим
+    процессом, тоже приводят к перекомпиляции.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self.maxsize = settings.SCHEDULE_INDEX_SIZE if maxsize is None else maxsize
+        self._compiled: "OrderedDict[Hashable, CompiledSchedule]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+    def get(self, campaign_id: Hashable, schedules: Sequence[CampaignSchedule]) -> CompiledSchedule:
+        compiled = self._compiled.get(campaign_id)
+        if compiled is not None and compiled.matches(schedules):
+            self._compiled.move_to_end(campaign_id)
+            return compiled
+
+        compiled = CompiledSchedule(schedules)
+        self._store(campaign_id, compiled)
+        return compiled
+
+    def contains(self, campaign_id: Hashable, schedules: Sequence[CampaignSchedule], moment: datetime) -> bool:
+        """Попадает ли момент в расписание кампании; короткие расписания - без индекса"""
+        if len(schedules) <= SCAN_MAX_SLOTS:
+            weekday = moment.weekday()
+            now = moment.time()
+            for slot in schedules:
+                if slot.day_of_week == weekday and slot.start_time <= now <= slot.end_time:
+                    return True
+            return False
+        return self.get(campaign_id, schedules).contains(moment)
+
+    def get_many(
+        self,
+        schedules_by_campaign: Mapping[Hashable, Sequence[CampaignSchedule]]
+    ) -> Dict[Hashable, CompiledSchedule]:
+        """
+        Расписания для прогона по многим кампаниям: каждое компилируется один раз
+        за прогон, результат передается дальше (CampaignBatch, schedule_transitions).
+        Прогон больше maxsize в LRU не пишется - иначе он вытеснил бы все записи
+        без единого попадания
+        """
+        store = len(schedules_by_campaign) <= self.maxsize
+        compiled_by_campaign = {}
+        for campaign_id, schedules in schedules_by_campaign.items():
+            compiled = self._compiled.get(campaign_id)
+            if compiled is None or not compiled.matches(schedules):
+                compiled = CompiledSchedule(schedules)
+                if store:
+                    self._store(campaign_id, compiled)
+            compiled_by_campaign[campaign_id] = compiled
+        return compiled_by_campaign
+
+    def _store(self, campaign_id: Hashable, compiled: CompiledSchedule) -> None:
+        if self.maxsize <= 0:
+            return
+        self._compiled[campaign_id] = compiled
+        self._compiled.move_to_end(campaign_id)
+        while len(self._compiled) > self.maxsize:
+            self._compiled.popitem(last=False)
+
+    def invalidate(self, campaign_id: Hashable) -> None:
+        self._compiled.pop(campaign_id, None)
+
+    def clear(self) -> None:
+        self._compiled.clear()
+
+
+schedule_index = ScheduleIndex()
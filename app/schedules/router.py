@@ -5,7 +5,10 @@ from sqlalchemy import select, delete
 
 from app.core.database import get_db
 from app.campaigns.models import Campaign
+from app.evaluations.dirty import dirty_campaigns
+from app.evaluations.snapshots import snapshot_cache
 from .models import CampaignSchedule
+from .index import schedule_index
 from .schemas import ScheduleSlotResponse, ScheduleUpdateRequest
 
 router = APIRouter()
@@ -34,6 +37,9 @@ async def set_schedule(
         db.add(slot)
     
     await db.commit()
+    schedule_index.invalidate(id)
+    snapshot_cache.invalidate(id)
+    dirty_campaigns.mark(id)
     
     result = await db.execute(
         select(CampaignSchedule).where(CampaignSchedule.campaign_id == id)
@@ -70,4 +76,7 @@ async def delete_schedule(
     await db.execute(
         delete(CampaignSchedule).where(CampaignSchedule.campaign_id == id)
     )
-    await db.commit()
\ No newline at end of file
+    await db.commit()
+    schedule_index.invalidate(id)
+    snapshot_cache.invalidate(id)
+    dirty_campaigns.mark(id)
\ No newline at end of file
@@ -0,0 +1,82 @@
+import random
+import uuid
+from datetime import time
+from decimal import Decimal
+from typing import Dict, List, Tuple
+from uuid import UUID
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.enums import CampaignStatus
+from app.campaigns.models import Campaign
+from app.schedules.models import CampaignSchedule
+from app.evaluations.snapshots import CampaignSnapshot, ScheduleSlot
+
+Dataset = Tuple[List[CampaignSnapshot], Dict[UUID, List[ScheduleSlot]]]
+
+
+def generate_campaigns(count: int, seed: int = 0) -> Dataset:
+    """
+    Синтетические кампании с расписанием. Распределение примерно как в проде:
+    90% управляемых, у 70% есть бюджет (треть перерасходована), у половины -
+    остатки, у 30% - расписание из 1-7 слотов. При одном seed данные одинаковые
+    """
+    rng = random.Random(seed)
+    campaigns: List[CampaignSnapshot] = []
+    schedules: Dict[UUID, List[ScheduleSlot]] = {}
+
+    for _ in range(count):
+        campaign_id = UUID(int=rng.getrandbits(128), version=4)
+        budget_limit = Decimal(rng.randint(100, 10000)) if rng.random() < 0.7 else None
+        spend_limit = budget_limit * Decimal("1.5") if budget_limit else Decimal(1000)
+        has_stock = rng.random() < 0.5
+        schedule_enabled = rng.random() < 0.3
+        status = rng.choice((CampaignStatus.ACTIVE, CampaignStatus.PAUSED))
+
+        campaigns.append(CampaignSnapshot(
+            id=campaign_id,
+            current_status=status,
+            target_status=status,
+            is_managed=rng.random() < 0.9,
+            budget_limit=budget_limit,
+            spend_today=Decimal(rng.randint(0, int(spend_limit))),
+            stock_days_left=rng.randint(0, 30) if has_stock else None,
+            stock_days_min=rng.randint(1, 7) if has_stock else None,
+            schedule_enabled=schedule_enabled,
+        ))
+
+        if schedule_enabled:
+            slots = []
+            for day in rng.sample(range(7), rng.randint(1, 7)):
+                start = rng.randint(0, 20)
+                end = rng.randint(start + 1, 23)
+                slots.append(ScheduleSlot(uuid.uuid4(), campaign_id, day, time(start), time(end, 59)))
+            schedules[campaign_id] = slots
+
+    return campaigns, schedules
+
+
+async def seed_database(conn: AsyncConnection, dataset: Dataset, chunk_size: int = 10000) -> None:
+    """Записывает кампании и слоты в БД пачками executemany"""
+    campaigns, schedules = dataset
+    for start in range(0, len(campaigns), chunk_size):
+        await conn.execute(insert(Campaign.__table__), [
+            {
+                "id": c.id,
+                "name": f"bench-{c.id.hex[:8]}",
+                "current_status": c.current_status,
+                "target_status": c.target_status,
+                "is_managed": c.is_managed,
+                "budget_limit": c.budget_limit,
+                "spend_today": c.spend_today,
+                "stock_days_left": c.stock_days_left,
+                "stock_days_min": c.stock_days_min,
+                "schedule_enabled": c.schedule_enabled,
+            }
+            for c in campaigns[start:start + chunk_size]
+        ])
+
+    slots = [slot._asdict() for campaign_slots in schedules.values() for slot in campaign_slots]
+    for start in range(0, len(slots), chunk_size):
+        await conn.execute(insert(CampaignSchedule.__table__), slots[start:start + chunk_size])
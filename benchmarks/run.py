@@ -0,0 +1,271 @@
+"""
+Бенчмарки движка правил и evaluate-all.
+
+    python -m benchmarks.run                      # 1k и 100k, сравнение с baseline
+    python -m benchmarks.run --sizes 1m           # 1M кампаний
+    python -m benchmarks.run --save               # записать baseline
+    python -m benchmarks.run --database-url postgresql+asyncpg://...   # + evaluate-all по БД
+
+Для каждого замера: p50/p99 на одну кампанию (мкс), пропускная способность
+и память на кампанию (tracemalloc, отдельным прогоном): сколько байт удерживают
+результаты - снимки, контексты, CampaignBatch; для evaluate-all по БД - пик
+прогона. Baseline - benchmarks/baselines/<size>.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.rules import get_all_rules
+from app.schedules.index import schedule_index
+from app.evaluations.batch import CampaignBatch
+from app.evaluations.engine import RuleEngine
+from .generator import Dataset, generate_campaigns, seed_database
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+BASELINES_DIR = Path(__file__).parent / "baselines"
+# Замер поштучных вызовов блоками: perf_counter на каждый вызов дороже самих правил
+BLOCK = 100
+# Фиксированное время: результаты правил расписания не зависят от дня запуска
+CURRENT_TIME = datetime(2024, 1, 10, 12, 30)
+
+Result = Dict[str, float]
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(per_item: List[float], count: int, total: float, memory: int, items: int) -> Result:
+    """
+    per_item - время одной кампании (сек) по блокам или прогонам,
+    memory - байт на items кампаний
+    """
+    return {
+        "p50_us": round(percentile(per_item, 0.5) * 1e6, 3),
+        "p99_us": round(percentile(per_item, 0.99) * 1e6, 3),
+        "ops_per_sec": round(count / total) if total else 0,
+        "bytes_per_campaign": round(memory / items, 1) if items else 0.0,
+    }
+
+
+def held_memory(fn: Callable[[], object]) -> int:
+    """Сколько байт удерживает результат fn() (временные аллокации не считаются)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        held = tracemalloc.get_traced_memory()[0]
+        del result
+        return held
+    finally:
+        tracemalloc.stop()
+
+
+def bench_calls(fn: Callable, items: List[tuple]) -> Result:
+    """Поштучные вызовы fn(*item): задержка по блокам из BLOCK вызовов"""
+    per_item = []
+    started = time.perf_counter()
+    for start in range(0, len(items), BLOCK):
+        block = items[start:start + BLOCK]
+        block_started = time.perf_counter()
+        for args in block:
+            fn(*args)
+        per_item.append((time.perf_counter() - block_started) / len(block))
+    total = time.perf_counter() - started
+
+    held = held_memory(lambda: [fn(*args) for args in items])
+    return summarize(per_item, len(items), total, held, len(items))
+
+
+async def bench_async_calls(fn: Callable, items: List[tuple]) -> Result:
+    per_item = []
+    started = time.perf_counter()
+    for start in range(0, len(items), BLOCK):
+        block = items[start:start + BLOCK]
+        block_started = time.perf_counter()
+        for args in block:
+            await fn(*args)
+        per_item.append((time.perf_counter() - block_started) / len(block))
+    total = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        results = [await fn(*args) for args in items]
+        held = tracemalloc.get_traced_memory()[0]
+        del results
+    finally:
+        tracemalloc.stop()
+    return summarize(per_item, len(items), total, held, len(items))
+
+
+def bench_dataset(count: int) -> Tuple[Dataset, Result]:
+    """Генерация снимков кампаний и слотов: память, которую они занимают в процессе"""
+    started = time.perf_counter()
+    generate_campaigns(count)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        dataset = generate_campaigns(count)
+        held = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return dataset, summarize([elapsed / count], count, elapsed, held, count)
+
+
+def bench_batch(engine: RuleEngine, dataset: Dataset, repeat: int) -> Result:
+    """
+    Пакетный путь evaluate-all без БД: сборка CampaignBatch + evaluate_batch.
+    Память - CampaignBatch вместе с результатом
+    """
+    campaigns, schedules = dataset
+
+    def run():
+        batch = CampaignBatch.from_campaigns(campaigns, schedules, CURRENT_TIME)
+        return batch, engine.evaluate_batch(batch)
+
+    per_item = []
+    total = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        total += elapsed
+        per_item.append(elapsed / len(campaigns))
+    held = held_memory(run)
+    return summarize(per_item, len(campaigns) * repeat, total, held, len(campaigns))
+
+
+async def bench_database(database_url: str, engine: RuleEngine, dataset: Dataset, repeat: int) -> Result:
+    """
+    Полный evaluate-all (service.evaluate_managed) по локальной БД.
+    Работает только с пустой БД и очищает ее после себя
+    """
+    from sqlalchemy import func, select, text
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.core.database import Base
+    from app.campaigns.models import Campaign
+    from app.evaluations.service import evaluate_managed
+
+    db_engine = create_async_engine(database_url)
+    # Очищаем только то, что засеял этот прогон: чужие данные не трогаем ни при какой ошибке
+    seeded = False
+    try:
+        async with db_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS rule_evaluation_logs_default "
+                "PARTITION OF rule_evaluation_logs DEFAULT"
+            ))
+            if (await conn.execute(select(func.count()).select_from(Campaign))).scalar_one():
+                raise SystemExit("В БД уже есть кампании: для бенчмарка нужна пустая БД")
+            await seed_database(conn, dataset)
+        seeded = True
+
+        managed = sum(1 for c in dataset[0] if c.is_managed)
+        sessions = async_sessionmaker(db_engine, expire_on_commit=False)
+        per_item = []
+        total = 0.0
+        tracemalloc.start()
+        try:
+            for _ in range(repeat):
+                schedule_index.clear()
+                async with sessions() as db:
+                    started = time.perf_counter()
+                    await evaluate_managed(db, engine, CURRENT_TIME)
+                    elapsed = time.perf_counter() - started
+                total += elapsed
+                per_item.append(elapsed / managed)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return summarize(per_item, managed * repeat, total, peak, managed)
+    finally:
+        if seeded:
+            async with db_engine.begin() as conn:
+                await conn.execute(text("TRUNCATE campaigns CASCADE"))
+        await db_engine.dispose()
+
+
+async def run_size(count: int, repeat: int, database_url: Optional[str]) -> Dict[str, Result]:
+    dataset, generated = bench_dataset(count)
+    campaigns, schedules = dataset
+    engine = RuleEngine()
+    schedule_index.clear()
+    calls = [(c, schedules.get(c.id, []), CURRENT_TIME) for c in campaigns]
+
+    results = {"dataset": generated}
+    results["engine.evaluate"] = await bench_async_calls(engine.evaluate, calls)
+    for rule in get_all_rules():
+        results[f"rule.{type(rule).__name__}"] = bench_calls(rule.check, calls)
+    results["engine._build_context"] = bench_calls(engine._build_context, calls)
+    results["engine.evaluate_batch"] = bench_batch(engine, dataset, repeat)
+    if database_url:
+        results["evaluate_all[db]"] = await bench_database(database_url, engine, dataset, repeat)
+    return results
+
+
+def compare(results: Dict[str, Result], baseline: Dict[str, Result], tolerance: float) -> List[str]:
+    """Названия замеров, у которых p50 вырос больше чем на tolerance"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base and base["p50_us"] and result["p50_us"] > base["p50_us"] * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def report(size: str, results: Dict[str, Result], baseline: Dict[str, Result], regressions: List[str]) -> None:
+    print(f"\n== {size} ==")
+    print(f"{'benchmark':32} {'p50, us':>10} {'p99, us':>10} {'ops/s':>12} {'B/camp':>9} {'vs base':>8}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        delta = f"{r['p50_us'] / base['p50_us'] - 1:+.0%}" if base and base["p50_us"] else "-"
+        mark = "  REGRESSION" if name in regressions else ""
+        print(
+            f"{name:32} {r['p50_us']:>10} {r['p99_us']:>10} {r['ops_per_sec']:>12} "
+            f"{r['bytes_per_campaign']:>9} {delta:>8}{mark}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки движка правил")
+    parser.add_argument("--sizes", default="1k,100k", help="через запятую: 1k, 100k, 1m")
+    parser.add_argument("--repeat", type=int, default=3, help="прогонов пакетных замеров")
+    parser.add_argument("--database-url", help="пустая БД для evaluate-all (postgresql+asyncpg://...)")
+    parser.add_argument("--save", action="store_true", help="сохранить результаты как baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост p50")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for size in args.sizes.split(","):
+        size = size.strip().lower()
+        if size not in SIZES:
+            parser.error(f"неизвестный размер {size}")
+        results = asyncio.run(run_size(SIZES[size], args.repeat, args.database_url))
+
+        baseline_path = BASELINES_DIR / f"{size}.json"
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        regressions = compare(results, baseline, args.tolerance)
+        report(size, results, baseline, regressions)
+
+        if args.save:
+            BASELINES_DIR.mkdir(exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        elif regressions:
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
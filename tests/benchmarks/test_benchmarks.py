@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks.generator import generate_campaigns
+from benchmarks.run import run_size, compare
+
+
+class TestGenerator:
+    
+    def test_deterministic(self):
+        first, _ = generate_campaigns(100, seed=1)
+        second, _ = generate_campaigns(100, seed=1)
+        
+        assert [c.id for c in first] == [c.id for c in second]
+    
+    def test_schedules_only_for_enabled(self):
+        campaigns, schedules = generate_campaigns(500)
+        enabled = {c.id for c in campaigns if c.schedule_enabled}
+        
+        assert set(schedules) == enabled
+        assert all(1 <= len(slots) <= 7 for slots in schedules.values())
+
+
+class TestRun:
+    
+    @pytest.mark.asyncio
+    async def test_small_run(self):
+        results = await run_size(200, repeat=1, database_url=None)
+        
+        assert "engine.evaluate" in results
+        assert "rule.ScheduleRule" in results
+        assert results["engine.evaluate_batch"]["ops_per_sec"] > 0
+        # Память на кампанию - удерживаемая, а не пик временных аллокаций
+        assert results["dataset"]["bytes_per_campaign"] > 0
+        assert results["engine.evaluate_batch"]["bytes_per_campaign"] > 0
+    
+    def test_compare_flags_regressions(self):
+        baseline = {"a": {"p50_us": 1.0}, "b": {"p50_us": 1.0}}
+        results = {"a": {"p50_us": 1.1}, "b": {"p50_us": 1.5}, "c": {"p50_us": 9.0}}
+        
+        assert compare(results, baseline, tolerance=0.2) == ["b"]
@@ -0,0 +1,146 @@
+import json
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+
+from fastapi import HTTPException
+from sqlalchemy.exc import DBAPIError
+
+from app.campaigns.bulk import CampaignBulkIngest, TooManyRows, ndjson_rows
+from app.campaigns.router import create_campaigns_bulk
+
+
+def bulk_db(db, bad_names=()):
+    """Сессия с savepoint; INSERT с кампанией из bad_names падает в БД"""
+    savepoint = MagicMock()
+    savepoint.__aenter__ = AsyncMock()
+    savepoint.__aexit__ = AsyncMock(return_value=False)
+    db.begin_nested = MagicMock(return_value=savepoint)
+    inserted = []
+
+    async def execute(stmt, rows):
+        if any(row["name"] in bad_names for row in rows):
+            raise DBAPIError("INSERT", {}, Exception("numeric field overflow"))
+        inserted.extend(row["name"] for row in rows)
+
+    db.execute = AsyncMock(side_effect=execute)
+    return inserted
+
+
+def make_request(body: bytes, content_type="application/json"):
+    async def stream():
+        # Границы порций не совпадают с границами строк
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    request = MagicMock()
+    request.headers = {"content-type": content_type}
+    request.body = AsyncMock(return_value=body)
+    request.stream = stream
+    return request
+
+
+async def collect(chunks):
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+    return [row async for row in ndjson_rows(stream())]
+
+
+@pytest.mark.asyncio
+class TestCampaignBulkIngest:
+
+    async def test_invalid_rows_do_not_abort_batch(self, db):
+        inserted = bulk_db(db)
+        ingest = CampaignBulkIngest(db, chunk_size=2)
+
+        for raw in [{"name": "a"}, {"budget_limit": "5"}, {"name": "b", "budget_limit": -1}, {"name": "c"}]:
+            await ingest.add(raw)
+        await ingest.flush()
+        result = ingest.result()
+
+        assert inserted == ["a", "c"]
+        assert (result.created, result.failed) == (2, 2)
+        assert [error.index for error in result.errors] == [1, 2]
+        assert result.errors[0].errors[0]["loc"] == ("name",)
+        assert result.ids[0] is not None and result.ids[1] is None
+
+    async def test_inserts_by_chunks(self, db):
+        bulk_db(db)
+        ingest = CampaignBulkIngest(db, chunk_size=100)
+
+        for n in range(250):
+            await ingest.add({"name": f"c{n}"})
+        await ingest.flush()
+
+        assert [len(call.args[1]) for call in db.execute.await_args_list] == [100, 100, 50]
+        assert len(set(ingest.ids)) == 250
+
+    async def test_db_error_retries_rows_one_by_one(self, db):
+        inserted = bulk_db(db, bad_names={"bad"})
+        ingest = CampaignBulkIngest(db, chunk_size=10)
+
+        for name in ["a", "bad", "b"]:
+            await ingest.add({"name": name})
+        await ingest.flush()
+        result = ingest.result()
+
+        assert inserted == ["a", "b"]
+        assert result.errors[0].index == 1
+        assert result.errors[0].errors[0]["type"] == "db_error"
+        assert result.ids[1] is None
+
+    async def test_max_rows(self, db):
+        bulk_db(db)
+        ingest = CampaignBulkIngest(db, max_rows=1)
+        await ingest.add({"name": "a"})
+
+        with pytest.raises(TooManyRows, match="At most 1 rows per request"):
+            await ingest.add({"name": "b"})
+
+
+@pytest.mark.asyncio
+class TestNdjsonRows:
+
+    async def test_lines_split_across_chunks(self):
+        rows = await collect([b'{"name": "a"}\n{"na', b'me": "b"}\n\n', b'{"name": "c"}'])
+
+        assert rows == [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+
+    async def test_invalid_json_line(self):
+        rows = await collect([b'{"name": "a"}\nnot json\n'])
+
+        assert rows[0] == {"name": "a"}
+        assert isinstance(rows[1], ValueError)
+
+
+@pytest.mark.asyncio
+class TestBulkEndpoint:
+
+    async def test_json_array(self, db):
+        inserted = bulk_db(db)
+        body = json.dumps([{"name": "a"}, {"name": 1}]).encode()
+
+        result = await create_campaigns_bulk(make_request(body), db)
+
+        assert inserted == ["a"]
+        assert (result.created, result.failed) == (1, 1)
+        db.commit.assert_awaited_once()
+
+    async def test_ndjson_stream(self, db):
+        inserted = bulk_db(db)
+        body = b"\n".join(json.dumps({"name": f"c{n}"}).encode() for n in range(5)) + b"\n{broken\n"
+
+        result = await create_campaigns_bulk(make_request(body, "application/x-ndjson"), db)
+
+        assert inserted == [f"c{n}" for n in range(5)]
+        assert result.errors[0].index == 5
+        assert result.errors[0].errors[0]["type"] == "json_invalid"
+
+    async def test_not_an_array(self, db):
+        bulk_db(db)
+
+        with pytest.raises(HTTPException) as exc:
+            await create_campaigns_bulk(make_request(b'{"name": "a"}'), db)
+
+        assert exc.value.status_code == 422
+        assert not db.commit.called
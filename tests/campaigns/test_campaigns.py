@@ -4,7 +4,10 @@ from unittest.mock import MagicMock, AsyncMock
 from uuid import uuid4
 from decimal import Decimal
 
+from fastapi import HTTPException
+
 from app.campaigns.router import create_campaign, list_campaigns, get_campaign, update_campaign
+from app.core.pagination import encode_cursor
 from app.core.enums import CampaignStatus
 
 
@@ -40,7 +43,7 @@ class TestCampaignsAPI:
         result_mock.scalars.return_value.all.return_value = []
         db.execute = AsyncMock(return_value=result_mock)
         
-        campaigns = await list_campaigns(0, 100, None, db)
+        campaigns = await list_campaigns(MagicMock(), 0, 100, None, None, db)
         
         assert db.execute.called
         assert isinstance(campaigns, list)
@@ -50,7 +53,7 @@ class TestCampaignsAPI:
         result_mock.scalars.return_value.all.return_value = []
         db.execute = AsyncMock(return_value=result_mock)
         
-        campaigns = await list_campaigns(0, 100, True, db)
+        campaigns = await list_campaigns(MagicMock(), 0, 100, True, None, db)
         
         assert db.execute.called
         call_args = db.execute.call_args[0][0]
@@ -61,12 +64,35 @@ class TestCampaignsAPI:
         result_mock.scalars.return_value.all.return_value = []
         db.execute = AsyncMock(return_value=result_mock)
         
-        campaigns = await list_campaigns(0, 100, False, db)
+        campaigns = await list_campaigns(MagicMock(), 0, 100, False, None, db)
         
         assert db.execute.called
         call_args = db.execute.call_args[0][0]
         assert "current_status = campaigns.target_status" in str(call_args)
     
+    async def test_list_campaigns_cursor(self, db):
+        last_id = uuid4()
+        campaigns = [MagicMock(id=uuid4()), MagicMock(id=uuid4())]
+        result_mock = MagicMock()
+        result_mock.scalars.return_value.all.return_value = campaigns
+        db.execute = AsyncMock(return_value=result_mock)
+        response = MagicMock()
+        response.headers = {}
+        
+        await list_campaigns(response, 0, 2, None, encode_cursor(last_id), db)
+        
+        query = db.execute.call_args[0][0]
+        assert "campaigns.id > " in str(query)
+        assert "OFFSET" not in str(query)
+        assert response.headers["X-Next-Cursor"] == encode_cursor(campaigns[-1].id)
+    
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", "WzFd"])  # WzFd - base64 от [1]
+    async def test_list_campaigns_invalid_cursor(self, db, cursor):
+        with pytest.raises(HTTPException) as exc:
+            await list_campaigns(MagicMock(), 0, 100, None, cursor, db)
+        
+        assert exc.value.status_code == 400
+    
     async def test_get_campaign_found(self, db):
         campaign_id = uuid4()
         db.get = AsyncMock(return_value=MagicMock())
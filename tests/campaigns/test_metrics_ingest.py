@@ -0,0 +1,109 @@
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock, AsyncMock
+from uuid import uuid4
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.campaigns import router
+from app.campaigns.bulk import update_metrics
+from app.campaigns.router import update_campaign_metrics
+from app.campaigns.schemas import CampaignMetricsUpdate
+from app.core.enums import CampaignStatus, TriggeredRule
+from app.evaluations.engine import RuleEngine
+
+
+def result(rows=(), ids=()):
+    result = MagicMock()
+    result.all.return_value = list(rows)
+    result.scalars.return_value = iter(ids)
+    return result
+
+
+class TestCampaignMetricsUpdate:
+
+    def test_unset_fields_are_not_updated(self):
+        item = CampaignMetricsUpdate(id=uuid4(), stock_days_left=None)
+
+        assert item.model_fields_set == {"id", "stock_days_left"}
+
+    def test_spend_today_cannot_be_null(self):
+        with pytest.raises(ValidationError):
+            CampaignMetricsUpdate(id=uuid4(), spend_today=None)
+
+    @pytest.mark.parametrize("spend_today", ["-0.01", "100000000.00", "1.005"])
+    def test_spend_today_fits_column(self, spend_today):
+        with pytest.raises(ValidationError):
+            CampaignMetricsUpdate(id=uuid4(), spend_today=Decimal(spend_today))
+
+    def test_spend_today_bounds(self):
+        assert CampaignMetricsUpdate(id=uuid4(), spend_today=Decimal("0")).spend_today == 0
+        assert CampaignMetricsUpdate(id=uuid4(), spend_today=Decimal("99999999.99")).spend_today \
+            == Decimal("99999999.99")
+
+
+@pytest.mark.asyncio
+class TestUpdateMetrics:
+
+    async def test_single_statement(self, db):
+        a, b = uuid4(), uuid4()
+        db.execute.return_value = result([(a, True), (b, False)])
+        updates = [
+            CampaignMetricsUpdate(id=a, spend_today=Decimal("1")),
+            CampaignMetricsUpdate(id=b, stock_days_left=3),
+            CampaignMetricsUpdate(id=a, spend_today=Decimal("2")),
+        ]
+
+        updated, affected = await update_metrics(db, updates)
+
+        assert (updated, affected) == ([a, b], [a])
+        db.execute.assert_awaited_once()
+        params = db.execute.await_args.args[0].compile().params
+        # Повтор id: одна строка, последнее значение
+        assert params["ids"] == [a, b]
+        assert params["spend"] == [Decimal("2"), None]
+        assert (params["set_spend"], params["set_stock"]) == ([True, False], [False, True])
+
+    async def test_empty(self, db):
+        assert await update_metrics(db, []) == ([], [])
+        assert not db.execute.called
+
+
+@pytest.mark.asyncio
+class TestMetricsEndpoint:
+
+    async def test_marks_only_affected(self, db, monkeypatch):
+        a, b, missing = uuid4(), uuid4(), uuid4()
+        db.execute.side_effect = [result([(a, True), (b, False)]), result(ids=[])]
+        dirty = MagicMock()
+        monkeypatch.setattr(router, "dirty_campaigns", dirty)
+        updates = [CampaignMetricsUpdate(id=campaign_id, spend_today=Decimal("5")) for campaign_id in (a, b, missing)]
+
+        response = await update_campaign_metrics(updates, False, db, RuleEngine())
+
+        assert (response.updated, response.not_found, response.affected) == (2, [missing], [a])
+        dirty.mark.assert_called_once_with(a)
+        db.commit.assert_awaited_once()
+
+    async def test_evaluate_affected(self, db, monkeypatch):
+        a = uuid4()
+        db.execute.return_value = result([(a, True)])
+        evaluate = AsyncMock(return_value=[(a, CampaignStatus.PAUSED, TriggeredRule.BUDGET_EXCEEDED)])
+        monkeypatch.setattr(router, "evaluate_dirty", evaluate)
+
+        response = await update_campaign_metrics([CampaignMetricsUpdate(id=a, spend_today=Decimal("5"))], True, db, RuleEngine())
+
+        assert evaluate.await_args.args[2] == [a]
+        assert response.results[0].triggered_rule == TriggeredRule.BUDGET_EXCEEDED
+
+    async def test_too_many_rows(self, db, monkeypatch):
+        monkeypatch.setattr(router.settings, "CAMPAIGN_BULK_MAX_ROWS", 1)
+        updates = [CampaignMetricsUpdate(id=uuid4(), stock_days_left=1) for _ in range(2)]
+
+        with pytest.raises(HTTPException) as exc:
+            await update_campaign_metrics(updates, False, db, RuleEngine())
+
+        assert exc.value.status_code == 413
+        assert exc.value.detail == "At most 1 rows per request"
+        assert not db.execute.called
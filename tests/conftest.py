@@ -1,6 +1,49 @@
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
+from decimal import Decimal
+from uuid import uuid4
+
+from app.core.enums import CampaignStatus
+from app.campaigns.models import Campaign
 
 @pytest.fixture
 def db():
-    return AsyncMock()
\ No newline at end of file
+    return AsyncMock()
+
+
+@pytest.fixture
+def make_campaign():
+    """
+    Фабрика кампаний: управляемая кампания с превышенным бюджетом,
+    любые поля переопределяются аргументами
+    """
+    def factory(**fields):
+        values = dict(
+            id=uuid4(),
+            name="test",
+            current_status=CampaignStatus.ACTIVE,
+            target_status=CampaignStatus.ACTIVE,
+            is_managed=True,
+            budget_limit=Decimal('100'),
+            spend_today=Decimal('150'),
+            stock_days_left=None,
+            stock_days_min=None,
+            schedule_enabled=False,
+            evaluation_fingerprint=None,
+        )
+        values.update(fields)
+        return Campaign(**values)
+    return factory
+
+
+@pytest.fixture
+def make_slot():
+    """Фабрика слотов расписания"""
+    def factory(day, start, end):
+        slot = MagicMock()
+        slot.id = uuid4()
+        slot.day_of_week = day
+        slot.start_time = start
+        slot.end_time = end
+        return slot
+    return factory
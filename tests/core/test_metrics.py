@@ -0,0 +1,104 @@
+import pytest
+
+from app.core.metrics import Counter, Gauge, Histogram, Registry
+from app.core.enums import TriggeredRule
+from app.evaluations.metrics import record_triggers, rule_triggers, evaluated_campaigns
+from app.main import app
+
+
+class TestMetricTypes:
+    
+    def test_counter_render(self):
+        counter = Counter("jobs_total", "Задачи", ("kind",))
+        counter.inc(labels=("a",))
+        counter.inc(2, labels=("a",))
+        
+        assert counter.render() == [
+            "# HELP jobs_total Задачи",
+            "# TYPE jobs_total counter",
+            'jobs_total{kind="a"} 3',
+        ]
+    
+    def test_histogram_is_cumulative(self):
+        histogram = Histogram("latency_seconds", "Задержка", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value)
+        
+        lines = histogram.render()
+        assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{le="1.0"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert "latency_seconds_count 4" in lines
+    
+    def test_gauge_collect(self):
+        gauge = Gauge("pool", "Пул", ("state",), collect=lambda: {("idle",): 2})
+        
+        assert 'pool{state="idle"} 2' in gauge.render()
+    
+    def test_label_escaping(self):
+        counter = Counter("x_total", "x", ("path",))
+        counter.inc(labels=('a"b',))
+        
+        assert 'x_total{path="a\\"b"} 1' in counter.render()
+    
+    def test_duplicate_name_rejected(self):
+        registry = Registry()
+        registry.register(Counter("x_total", "x"))
+        
+        try:
+            registry.register(Counter("x_total", "x"))
+        except ValueError:
+            return
+        assert False
+
+
+class TestEvaluationMetrics:
+    
+    def test_record_triggers(self):
+        budget_before = rule_triggers.value((TriggeredRule.BUDGET_EXCEEDED.value,))
+        none_before = rule_triggers.value(("none",))
+        total_before = evaluated_campaigns.value()
+        
+        record_triggers([TriggeredRule.BUDGET_EXCEEDED, None, TriggeredRule.BUDGET_EXCEEDED])
+        
+        assert rule_triggers.value((TriggeredRule.BUDGET_EXCEEDED.value,)) == budget_before + 2
+        assert rule_triggers.value(("none",)) == none_before + 1
+        assert evaluated_campaigns.value() == total_before + 3
+
+
+async def asgi_get(path):
+    """GET-запрос прямо в ASGI-приложение: (status, headers, body)"""
+    messages = []
+    
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    async def send(message):
+        messages.append(message)
+    
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    await app(scope, receive, send)
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], dict(start["headers"]), body.decode()
+
+
+@pytest.mark.asyncio
+class TestMetricsEndpoint:
+    
+    async def test_route_template_in_labels(self):
+        await asgi_get("/health")
+        
+        status, headers, body = await asgi_get("/metrics")
+        
+        assert status == 200
+        assert headers[b"content-type"].startswith(b"text/plain")
+        assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+        assert "# TYPE rule_triggers_total counter" in body
+        assert 'db_pool_connections{state="checked_out"} 0' in body
+        assert "db_pool_checkouts_total" in body
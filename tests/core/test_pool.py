@@ -0,0 +1,72 @@
+import pytest
+from unittest.mock import MagicMock
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.util import greenlet_spawn
+
+from app.core.pool import PoolStats, InstrumentedPool
+
+
+def make_pool(stats, **kwargs):
+    pool = InstrumentedPool(creator=MagicMock, pool_size=1, max_overflow=0, timeout=0.01, **kwargs)
+    pool.stats = stats
+    return pool
+
+
+class TestPoolStats:
+    
+    def test_percentiles(self):
+        stats = PoolStats()
+        for ms in range(1, 101):
+            stats.record(ms / 1000, waited=False)
+        
+        result = stats.stats()
+        assert result["checkouts"] == 100
+        assert result["latency_p50_ms"] == 51
+        assert result["latency_p99_ms"] == 100
+        assert result["waits"] == 0
+    
+    def test_waits_accumulate_latency(self):
+        stats = PoolStats()
+        stats.record(0.5, waited=True)
+        stats.record(0.1, waited=False)
+        
+        assert stats.waits == 1
+        assert stats.wait_seconds == 0.5
+    
+    def test_window_is_bounded(self):
+        stats = PoolStats(window=10)
+        for _ in range(100):
+            stats.record(0.001, waited=False)
+        
+        assert len(stats._latencies) == 10
+        assert stats.checkouts == 100
+
+
+@pytest.mark.asyncio
+class TestInstrumentedPool:
+    
+    async def test_records_checkout(self):
+        stats = PoolStats()
+        pool = make_pool(stats)
+        
+        connection = await greenlet_spawn(pool.connect)
+        
+        assert stats.checkouts == 1
+        assert stats.waits == 0
+        assert pool.status_dict()["checked_out"] == 1
+        await greenlet_spawn(connection.close)
+    
+    async def test_exhausted_pool_counts_wait_and_timeout(self):
+        stats = PoolStats()
+        pool = make_pool(stats)
+        connection = await greenlet_spawn(pool.connect)
+        
+        with pytest.raises(PoolTimeoutError):
+            await greenlet_spawn(pool.connect)
+        
+        assert stats.timeouts == 1
+        await greenlet_spawn(connection.close)
+        connection = await greenlet_spawn(pool.connect)
+        assert stats.checkouts == 2
+        await greenlet_spawn(connection.close)
@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+
+from app.core.tasks import BackgroundTask
+
+
+class Ticker(BackgroundTask):
+    
+    def __init__(self):
+        self.ticks = 0
+    
+    async def run(self) -> None:
+        while True:
+            self.ticks += 1
+            await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+class TestBackgroundTask:
+    
+    async def test_start_and_stop(self):
+        ticker = Ticker()
+        ticker.start()
+        await asyncio.sleep(0.01)
+        await ticker.stop()
+        ticks = ticker.ticks
+        await asyncio.sleep(0.01)
+        
+        assert ticks > 0
+        assert ticker.ticks == ticks
+        assert ticker._task is None
+    
+    async def test_start_twice_keeps_one_task(self):
+        ticker = Ticker()
+        ticker.start()
+        task = ticker._task
+        ticker.start()
+        
+        assert ticker._task is task
+        await ticker.stop()
+    
+    async def test_stop_without_start(self):
+        await Ticker().stop()
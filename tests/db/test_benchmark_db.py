@@ -0,0 +1,52 @@
+import os
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import Base
+from app.campaigns.models import Campaign
+from app.evaluations.engine import RuleEngine
+from benchmarks.generator import generate_campaigns
+from benchmarks.run import bench_database
+
+
+# Бенчмарк по БД на настоящем PostgreSQL: TEST_DATABASE_URL=postgresql+asyncpg://...
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL не задан")
+
+
+@pytest.mark.asyncio
+class TestBenchDatabase:
+
+    async def test_non_empty_database_untouched(self):
+        # Бенчмарк работает своим соединением, поэтому данные здесь коммитятся
+        engine = create_async_engine(TEST_DATABASE_URL)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(Campaign.__table__.insert().values(name="existing"))
+
+            with pytest.raises(SystemExit):
+                await bench_database(TEST_DATABASE_URL, RuleEngine(), generate_campaigns(10), repeat=1)
+
+            async with engine.connect() as conn:
+                count = (await conn.execute(select(func.count()).select_from(Campaign))).scalar_one()
+            assert count == 1
+        finally:
+            async with engine.begin() as conn:
+                await conn.execute(text("TRUNCATE campaigns CASCADE"))
+            await engine.dispose()
+
+    async def test_seeded_data_removed(self):
+        engine = create_async_engine(TEST_DATABASE_URL)
+        try:
+            result = await bench_database(TEST_DATABASE_URL, RuleEngine(), generate_campaigns(50), repeat=1)
+
+            async with engine.connect() as conn:
+                count = (await conn.execute(select(func.count()).select_from(Campaign))).scalar_one()
+            assert result["ops_per_sec"] > 0
+            assert count == 0
+        finally:
+            await engine.dispose()
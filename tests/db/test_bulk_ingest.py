@@ -0,0 +1,49 @@
+import os
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.database import Base
+from app.core.enums import CampaignStatus
+from app.campaigns.bulk import CampaignBulkIngest
+from app.campaigns.models import Campaign
+
+
+# Массовое создание кампаний на настоящем PostgreSQL: TEST_DATABASE_URL=postgresql+asyncpg://...
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL не задан")
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine(TEST_DATABASE_URL)
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        await conn.run_sync(Base.metadata.create_all)
+        yield AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+        await transaction.rollback()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+class TestBulkIngestDatabase:
+
+    async def test_db_error_rolls_back_only_bad_row(self, db):
+        ingest = CampaignBulkIngest(db, chunk_size=50)
+        for n in range(120):
+            # Numeric(10, 2) не вмещает 10^9: ошибку дает только БД
+            await ingest.add({"name": f"c{n}", "budget_limit": 10 ** 9 if n == 60 else 100})
+        await ingest.flush()
+        result = ingest.result()
+
+        assert (result.created, result.failed) == (119, 1)
+        assert result.errors[0].index == 60
+        count = (await db.execute(select(func.count()).select_from(Campaign))).scalar_one()
+        assert count == 119
+
+        campaign = await db.get(Campaign, result.ids[0])
+        assert campaign.target_status == CampaignStatus.ACTIVE
+        assert campaign.created_at is not None
@@ -0,0 +1,127 @@
+import os
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, desc, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import Base
+from app.campaigns.models import Campaign
+from app.schedules.models import CampaignSchedule
+from app.evaluations.models import RuleEvaluationLog
+
+
+# EXPLAIN-тесты гоняются на настоящем PostgreSQL: TEST_DATABASE_URL=postgresql+asyncpg://...
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL не задан")
+
+
+@pytest_asyncio.fixture
+async def conn():
+    engine = create_async_engine(TEST_DATABASE_URL)
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS rule_evaluation_logs_default "
+            "PARTITION OF rule_evaluation_logs DEFAULT"
+        ))
+        # 20000 кампаний: 10% управляемых, половина из них с расписанием, 1% рассинхронизированы.
+        # Планы - выбор самого планировщика (без enable_seqscan = off): частичные индексы
+        # окупаются только на малой доле строк, поэтому данные такие же разреженные
+        await conn.execute(text("""
+            INSERT INTO campaigns (id, name, current_status, target_status, is_managed,
+                                   spend_today, schedule_enabled)
+            SELECT gen_random_uuid(), 'c' || n,
+                   'ACTIVE',
+                   CASE WHEN n % 100 = 0 THEN 'PAUSED' ELSE 'ACTIVE' END::campaignstatus,
+                   n % 10 = 0, 0, n % 20 = 0
+            FROM generate_series(1, 20000) AS n
+        """))
+        await conn.execute(text("""
+            INSERT INTO campaign_schedules (id, campaign_id, day_of_week, start_time, end_time)
+            SELECT gen_random_uuid(), id, d, '09:00', '21:00'
+            FROM campaigns, generate_series(0, 6) AS d
+            WHERE schedule_enabled
+        """))
+        # История: длинная (1000 записей) у 20 кампаний - страница из 50 берет индекс без сортировки
+        await conn.execute(text("""
+            INSERT INTO rule_evaluation_logs (id, campaign_id, new_target, created_at, current_status,
+                                              is_managed, spend_today, schedule_enabled,
+                                              current_weekday, schedules_count, engine_version)
+            SELECT gen_random_uuid(), c.id, 'ACTIVE', now() - make_interval(mins => k),
+                   'ACTIVE', true, 0, false, 0, 0, '1.0'
+            FROM (SELECT id FROM campaigns ORDER BY id LIMIT 20) AS c, generate_series(1, 1000) AS k
+        """))
+        await conn.execute(text("ANALYZE campaigns"))
+        await conn.execute(text("ANALYZE campaign_schedules"))
+        await conn.execute(text("ANALYZE rule_evaluation_logs_default"))
+        yield conn
+        await transaction.rollback()
+    await engine.dispose()
+
+
+async def explain(conn, query) -> str:
+    sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    result = await conn.execute(text(f"EXPLAIN {sql}"))
+    return "\n".join(row[0] for row in result.all())
+
+
+@pytest.mark.asyncio
+class TestIndexes:
+    
+    async def test_needs_sync_uses_partial_index(self, conn):
+        # Селективность current_status <> target_status планировщик не знает (оценка ~всё),
+        # индекс выигрывает тем, что сразу дает порядок по id для LIMIT
+        plan = await explain(
+            conn,
+            select(Campaign)
+            .where(Campaign.current_status != Campaign.target_status)
+            .order_by(Campaign.id)
+            .limit(100)
+        )
+        
+        assert "ix_campaigns_needs_sync" in plan
+    
+    async def test_managed_campaigns_use_partial_index(self, conn):
+        # Индекс выигрывает только при низкой доле управляемых: на этих данных
+        # до ~20%, с ~30% и выше планировщик предпочитает Seq Scan
+        plan = await explain(conn, select(Campaign).where(Campaign.is_managed == True))
+        
+        assert "ix_campaigns_managed" in plan
+    
+    async def test_managed_schedules_use_partial_index(self, conn):
+        plan = await explain(
+            conn,
+            select(CampaignSchedule)
+            .join(Campaign, Campaign.id == CampaignSchedule.campaign_id)
+            .where(Campaign.is_managed == True, Campaign.schedule_enabled == True)
+        )
+        
+        assert "ix_campaigns_managed_schedule" in plan
+    
+    async def test_schedule_by_campaign_uses_unique_slot_index(self, conn):
+        plan = await explain(
+            conn,
+            select(CampaignSchedule).where(CampaignSchedule.campaign_id == uuid4())
+        )
+        
+        assert "uq_campaign_schedule_unique_slot" in plan
+    
+    async def test_history_uses_keyset_index(self, conn):
+        campaign_id = (await conn.execute(text("SELECT campaign_id FROM rule_evaluation_logs LIMIT 1"))).scalar_one()
+        plan = await explain(
+            conn,
+            select(RuleEvaluationLog)
+            .where(RuleEvaluationLog.campaign_id == campaign_id)
+            .order_by(desc(RuleEvaluationLog.created_at), desc(RuleEvaluationLog.id))
+            .limit(50)
+        )
+        
+        assert "rule_evaluation_logs_default_campaign_id_created_at_id_idx" in plan or \
+            "ix_rule_evaluation_logs_campaign_created_id" in plan
+        # Порядок дает индекс, без сортировки
+        assert "Sort" not in plan
@@ -0,0 +1,70 @@
+import os
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.database import Base
+from app.campaigns.bulk import update_metrics
+from app.campaigns.models import Campaign
+from app.campaigns.schemas import CampaignMetricsUpdate
+
+
+# Массовое обновление метрик на настоящем PostgreSQL: TEST_DATABASE_URL=postgresql+asyncpg://...
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL не задан")
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine(TEST_DATABASE_URL)
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        await conn.run_sync(Base.metadata.create_all)
+        yield AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+        await transaction.rollback()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+class TestUpdateMetricsDatabase:
+
+    async def test_updates_and_reports_affected(self, db):
+        budget = Campaign(name="budget", budget_limit=Decimal(100), spend_today=Decimal(50))
+        stock = Campaign(name="stock", stock_days_left=10, stock_days_min=3)
+        same = Campaign(name="same", spend_today=Decimal(7), stock_days_left=4)
+        unmanaged = Campaign(name="unmanaged", is_managed=False, budget_limit=Decimal(10))
+        db.add_all([budget, stock, same, unmanaged])
+        await db.flush()
+
+        updated, affected = await update_metrics(db, [
+            CampaignMetricsUpdate(id=budget.id, spend_today=Decimal(150)),
+            # Остатки меняются, но исход правила тот же
+            CampaignMetricsUpdate(id=stock.id, stock_days_left=5),
+            CampaignMetricsUpdate(id=same.id, spend_today=Decimal(7), stock_days_left=4),
+            CampaignMetricsUpdate(id=unmanaged.id, spend_today=Decimal(20)),
+        ])
+
+        assert set(updated) == {budget.id, stock.id, unmanaged.id}
+        assert affected == [budget.id]
+
+        await db.refresh(budget)
+        await db.refresh(stock)
+        assert budget.spend_today == Decimal(150)
+        assert (stock.stock_days_left, stock.spend_today) == (5, Decimal(0))
+
+        updated, affected = await update_metrics(db, [CampaignMetricsUpdate(id=stock.id, stock_days_left=1)])
+        assert affected == [stock.id]
+
+    async def test_null_stock_clears_low_stock(self, db):
+        campaign = Campaign(name="c", stock_days_left=1, stock_days_min=3)
+        db.add(campaign)
+        await db.flush()
+
+        updated, affected = await update_metrics(db, [CampaignMetricsUpdate(id=campaign.id, stock_days_left=None)])
+
+        assert affected == [campaign.id]
+        await db.refresh(campaign)
+        assert campaign.stock_days_left is None
@@ -0,0 +1,130 @@
+import os
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.database import Base
+from app.core.enums import LogPolicy
+from app.campaigns.models import Campaign
+from app.evaluations.batch import CampaignBatch
+from app.evaluations.engine import RuleEngine
+from app.evaluations.models import RuleEvaluationLog
+from app.evaluations.pushdown import evaluate_pushdown
+from benchmarks.generator import generate_campaigns, seed_database
+
+
+# Сверка SQL-бэкенда с RuleEngine на настоящем PostgreSQL: TEST_DATABASE_URL=postgresql+asyncpg://...
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL не задан")
+
+# Слоты генератора: начало в hh:00, конец в hh:59 - проверяем и границы слотов
+TIMES = [
+    datetime(2024, 1, 10, 12, 30),
+    datetime(2024, 1, 8, 0, 0),
+    datetime(2024, 1, 14, 23, 59),
+    datetime(2024, 1, 12, 7, 59, 30),
+]
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    return generate_campaigns(3000, seed=21)
+
+
+@pytest_asyncio.fixture
+async def db(dataset):
+    engine = create_async_engine(TEST_DATABASE_URL)
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS rule_evaluation_logs_default "
+            "PARTITION OF rule_evaluation_logs DEFAULT"
+        ))
+        await seed_database(conn, dataset)
+        yield AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+        await transaction.rollback()
+    await engine.dispose()
+
+
+def python_results(dataset, current_time):
+    campaigns, schedules = dataset
+    managed = [c for c in campaigns if c.is_managed]
+    batch = CampaignBatch.from_campaigns(managed, schedules, current_time)
+    statuses, rules = RuleEngine().evaluate_batch(batch)
+    return {c.id: (status, rule) for c, status, rule in zip(managed, statuses, rules)}
+
+
+@pytest.mark.asyncio
+class TestPushdownParity:
+
+    @pytest.mark.parametrize("current_time", TIMES)
+    async def test_dry_run_matches_engine(self, db, dataset, current_time):
+        rows = await evaluate_pushdown(db, RuleEngine(), current_time, dry_run=True)
+
+        assert {campaign_id: (status, rule) for campaign_id, status, rule in rows} \
+            == python_results(dataset, current_time)
+
+    async def test_matches_evaluate_with_details(self, db, dataset):
+        campaigns, schedules = dataset
+        engine = RuleEngine()
+        current_time = TIMES[0]
+        rows = await evaluate_pushdown(db, engine, current_time, dry_run=True)
+        by_id = {c.id: c for c in campaigns}
+
+        for campaign_id, status, rule in rows[:500]:
+            expected, expected_rule, _ = await engine.evaluate(
+                by_id[campaign_id], schedules.get(campaign_id, []), current_time
+            )
+            assert (status, rule) == (expected, expected_rule)
+
+    async def test_persists_statuses_and_logs(self, db, dataset, monkeypatch):
+        monkeypatch.setattr(settings, "EVALUATION_LOG_POLICY", LogPolicy.ALWAYS)
+        campaigns, schedules = dataset
+        engine = RuleEngine()
+        current_time = TIMES[0]
+        expected = python_results(dataset, current_time)
+
+        rows = await evaluate_pushdown(db, engine, current_time)
+
+        assert len(rows) == len(expected)
+        result = await db.execute(select(Campaign.id, Campaign.target_status).where(Campaign.is_managed == True))
+        assert {campaign_id: status for campaign_id, status in result} \
+            == {campaign_id: status for campaign_id, (status, _) in expected.items()}
+
+        logs = {log.campaign_id: log for log in (await db.execute(select(RuleEvaluationLog))).scalars()}
+        assert logs.keys() == expected.keys()
+        for campaign in campaigns:
+            if not campaign.is_managed:
+                continue
+            status, rule = expected[campaign.id]
+            slots = schedules.get(campaign.id, [])
+            row = engine.build_log_row(campaign, status, rule, slots, current_time)
+            log = logs[campaign.id]
+            excerpt = row.pop("schedule_excerpt")
+            row.pop("created_at")
+            assert {key: getattr(log, key) for key in row} == row
+            assert log.schedule_excerpt == excerpt
+
+    async def test_on_transition_logs_only_changes(self, db, dataset, monkeypatch):
+        monkeypatch.setattr(settings, "EVALUATION_LOG_POLICY", LogPolicy.ON_TRANSITION)
+        campaigns, _ = dataset
+        previous = {c.id: c.target_status for c in campaigns}
+
+        rows = await evaluate_pushdown(db, RuleEngine(), TIMES[0])
+
+        changed = {campaign_id for campaign_id, status, _ in rows if status != previous[campaign_id]}
+        logged = (await db.execute(select(RuleEvaluationLog.campaign_id))).scalars().all()
+        assert changed and sorted(logged) == sorted(changed)
+
+    async def test_where_limits_campaigns(self, db, dataset):
+        campaign_id = next(c.id for c in dataset[0] if c.is_managed)
+
+        rows = await evaluate_pushdown(db, RuleEngine(), TIMES[0], dry_run=True, where=Campaign.id == campaign_id)
+
+        assert [row[0] for row in rows] == [campaign_id]
@@ -0,0 +1,113 @@
+import random
+import pytest
+from datetime import datetime, time
+from decimal import Decimal
+
+from app.evaluations.engine import RuleEngine
+from app.evaluations.batch import CampaignBatch
+from app.rules import get_all_rules
+from app.rules.base import Rule
+from app.core.enums import CampaignStatus, TriggeredRule
+
+
+class RemoteStopRule(Rule):
+    """Правило с I/O без пакетного режима: останавливает кампании из stopped"""
+    requires_io = True
+    priority = 0
+    rule_name = TriggeredRule.BUDGET_EXCEEDED
+    target_status = CampaignStatus.PAUSED
+    
+    def __init__(self, stopped=()):
+        self.stopped = set(stopped)
+    
+    async def evaluate(self, campaign, schedules=None, current_time=None):
+        return campaign.id in self.stopped, None
+
+
+def engine_with(rule: Rule) -> RuleEngine:
+    """Движок с дополнительным правилом (отдельный класс: цепочка кэшируется на классе)"""
+    return type("CustomEngine", (RuleEngine,), {"_rules": [rule] + get_all_rules(), "_compiled": None})()
+
+
+def random_campaign(rnd, make_campaign):
+    return make_campaign(
+        target_status=rnd.choice([None, CampaignStatus.ACTIVE, CampaignStatus.PAUSED]),
+        is_managed=rnd.random() > 0.2,
+        budget_limit=rnd.choice([None, Decimal(rnd.randint(0, 2000)) / 100]),
+        spend_today=Decimal(rnd.randint(0, 2000)) / 100,
+        stock_days_left=rnd.choice([None, rnd.randint(0, 10)]),
+        stock_days_min=rnd.choice([None, rnd.randint(0, 10)]),
+        schedule_enabled=rnd.random() > 0.5,
+    )
+
+
+def random_slots(rnd, make_slot):
+    slots = []
+    for _ in range(rnd.randint(0, 3)):
+        start = rnd.randint(0, 22)
+        slots.append(make_slot(rnd.randint(0, 6), time(start, 0), time(rnd.randint(start + 1, 23), 59)))
+    return slots
+
+
+@pytest.mark.asyncio
+class TestBatchEvaluation:
+    
+    async def test_matches_evaluate(self, make_campaign, make_slot):
+        rnd = random.Random(42)
+        engine = RuleEngine()
+        current_time = datetime(2024, 1, 10, 15, 30)
+        
+        campaigns = [random_campaign(rnd, make_campaign) for _ in range(500)]
+        schedules = {c.id: random_slots(rnd, make_slot) for c in campaigns}
+        
+        batch = CampaignBatch.from_campaigns(campaigns, schedules, current_time)
+        statuses, rules = engine.evaluate_batch(batch)
+        
+        for campaign, status, rule in zip(campaigns, statuses, rules):
+            expected_status, expected_rule, _ = await engine.evaluate(
+                campaign, schedules[campaign.id], current_time
+            )
+            assert (status, rule) == (expected_status, expected_rule)
+    
+    async def test_priority(self, make_campaign, make_slot):
+        campaign = make_campaign(
+            schedule_enabled=True,
+            budget_limit=Decimal('1000'),
+            spend_today=Decimal('1500'),
+            stock_days_left=1,
+            stock_days_min=5,
+        )
+        current_time = datetime(2024, 1, 10, 22, 30)
+        schedules = {campaign.id: [make_slot(2, time(9, 0), time(21, 0))]}
+        
+        batch = CampaignBatch.from_campaigns([campaign], schedules, current_time)
+        statuses, rules = RuleEngine().evaluate_batch(batch)
+        
+        assert statuses == [CampaignStatus.PAUSED]
+        assert rules == [TriggeredRule.SCHEDULE]
+    
+    async def test_disabled_management_keeps_target(self, make_campaign):
+        campaign = make_campaign(is_managed=False, target_status=CampaignStatus.PAUSED)
+        
+        batch = CampaignBatch.from_campaigns([campaign])
+        statuses, rules = RuleEngine().evaluate_batch(batch)
+        
+        assert statuses == [CampaignStatus.PAUSED]
+        assert rules == [TriggeredRule.DISABLED_MANAGEMENT]
+    
+    async def test_empty_batch(self):
+        batch = CampaignBatch.from_campaigns([])
+        
+        assert RuleEngine().evaluate_batch(batch) == ([], [])
+    
+    async def test_evaluate_many_falls_back_without_batch_support(self, make_campaign):
+        stopped = make_campaign()
+        campaigns = [stopped, make_campaign(is_managed=False, target_status=CampaignStatus.PAUSED)]
+        engine = engine_with(RemoteStopRule([stopped.id]))
+        
+        assert RuleEngine().supports_batch
+        assert not engine.supports_batch
+        statuses, rules = await engine.evaluate_many(campaigns, {}, datetime(2024, 1, 10))
+        
+        assert statuses == [CampaignStatus.PAUSED, CampaignStatus.PAUSED]
+        assert rules == [TriggeredRule.BUDGET_EXCEEDED, TriggeredRule.DISABLED_MANAGEMENT]
@@ -0,0 +1,107 @@
+import pytest
+from unittest.mock import MagicMock
+from decimal import Decimal
+
+from app.evaluations.engine import RuleEngine, compile_rules
+from app.rules import get_all_rules
+from app.rules.base import Rule
+from app.core.enums import CampaignStatus, TriggeredRule
+
+
+class RemoteStopRule(Rule):
+    """Правило с I/O: опрашивает внешний сервис"""
+    requires_io = True
+    
+    def __init__(self, stopped: bool):
+        self.stopped = stopped
+        self.calls = 0
+    
+    @property
+    def priority(self) -> int:
+        return 0
+    
+    @property
+    def rule_name(self) -> TriggeredRule:
+        return TriggeredRule.BUDGET_EXCEEDED
+    
+    @property
+    def target_status(self):
+        return CampaignStatus.PAUSED
+    
+    async def evaluate(self, campaign, schedules=None, current_time=None):
+        self.calls += 1
+        return self.stopped, "остановлено внешним сервисом" if self.stopped else None
+
+
+class LegacyStopRule(Rule):
+    """Правило по старому контракту: переопределен только evaluate()"""
+    
+    @property
+    def priority(self) -> int:
+        return 0
+    
+    @property
+    def rule_name(self) -> TriggeredRule:
+        return TriggeredRule.LOW_STOCK
+    
+    @property
+    def target_status(self):
+        return CampaignStatus.PAUSED
+    
+    async def evaluate(self, campaign, schedules=None, current_time=None):
+        return True, "старое правило"
+
+
+@pytest.fixture
+def campaign():
+    campaign = MagicMock()
+    campaign.target_status = None
+    campaign.is_managed = True
+    campaign.budget_limit = Decimal('100')
+    campaign.spend_today = Decimal('150')
+    campaign.stock_days_left = None
+    campaign.stock_days_min = None
+    campaign.schedule_enabled = False
+    return campaign
+
+
+@pytest.mark.asyncio
+class TestCompiledRules:
+    
+    async def test_builtin_rules_are_sync(self, campaign):
+        decide, _ = compile_rules(get_all_rules())
+        
+        assert decide is not None
+        status, rule, details = decide(campaign, [], None)
+        assert status == CampaignStatus.PAUSED
+        assert rule == TriggeredRule.BUDGET_EXCEEDED
+    
+    async def test_evaluate_sync_matches_evaluate(self, campaign):
+        engine = RuleEngine()
+        
+        assert engine.is_sync
+        assert engine.evaluate_sync(campaign) == await engine.evaluate(campaign)
+    
+    async def test_io_rule_opts_into_async(self, campaign):
+        io_rule = RemoteStopRule(stopped=True)
+        decide, decide_async = compile_rules([io_rule] + get_all_rules())
+        
+        assert decide is None
+        status, rule, details = await decide_async(campaign, [], None)
+        assert io_rule.calls == 1
+        assert details == "остановлено внешним сервисом"
+    
+    async def test_io_rule_falls_through(self, campaign):
+        io_rule = RemoteStopRule(stopped=False)
+        _, decide_async = compile_rules([io_rule] + get_all_rules())
+        
+        status, rule, details = await decide_async(campaign, [], None)
+        assert io_rule.calls == 1
+        assert rule == TriggeredRule.BUDGET_EXCEEDED
+    
+    async def test_evaluate_only_rule_is_async(self, campaign):
+        decide, decide_async = compile_rules([LegacyStopRule()] + get_all_rules())
+        
+        assert LegacyStopRule().is_async
+        assert decide is None
+        assert await decide_async(campaign, [], None) == (CampaignStatus.PAUSED, TriggeredRule.LOW_STOCK, "старое правило")
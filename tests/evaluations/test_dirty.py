@@ -0,0 +1,106 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from uuid import uuid4
+
+from app.evaluations.dirty import DirtyCampaigns, DirtyCampaignConsumer
+from app.evaluations.engine import RuleEngine
+from app.evaluations.snapshots import SNAPSHOT_COLUMNS
+
+
+def session_factory(db):
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=db)
+    context.__aexit__ = AsyncMock(return_value=False)
+    return lambda: context
+
+
+class TestDirtyCampaigns:
+    
+    def test_repeated_writes_coalesce(self):
+        dirty = DirtyCampaigns()
+        campaign_id = uuid4()
+        for _ in range(3):
+            dirty.mark(campaign_id)
+        
+        assert len(dirty) == 1
+        assert dirty.drain(10) == [campaign_id]
+        assert len(dirty) == 0
+    
+    def test_drain_in_batches(self):
+        dirty = DirtyCampaigns()
+        for _ in range(5):
+            dirty.mark(uuid4())
+        
+        assert len(dirty.drain(2)) == 2
+        assert len(dirty.drain(10)) == 3
+    
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr("app.evaluations.dirty.settings.INCREMENTAL_EVALUATION", False)
+        dirty = DirtyCampaigns()
+        dirty.mark(uuid4())
+        
+        assert len(dirty) == 0
+
+
+@pytest.mark.asyncio
+class TestDirtyCampaignConsumer:
+    
+    async def test_process_pending(self, db, make_campaign):
+        campaign = make_campaign()
+        result = MagicMock()
+        result.all.return_value = [tuple(getattr(campaign, column.name) for column in SNAPSHOT_COLUMNS)]
+        db.execute = AsyncMock(return_value=result)
+        
+        dirty = DirtyCampaigns()
+        dirty.mark(campaign.id)
+        consumer = DirtyCampaignConsumer(dirty, RuleEngine(), session_factory(db), delay=0, batch_size=10)
+        
+        assert await consumer.process_pending() == 1
+        statements = [str(call.args[0]) for call in db.execute.await_args_list]
+        assert any("UPDATE campaigns SET target_status" in s for s in statements)
+        db.commit.assert_awaited_once()
+        assert len(dirty) == 0
+    
+    async def test_failed_batch_is_requeued(self, db):
+        db.execute = AsyncMock(side_effect=RuntimeError("db down"))
+        campaign_id = uuid4()
+        
+        dirty = DirtyCampaigns()
+        dirty.mark(campaign_id)
+        consumer = DirtyCampaignConsumer(dirty, RuleEngine(), session_factory(db), delay=0, batch_size=10)
+        
+        assert await consumer.process_pending() == 0
+        assert dirty.drain(10) == [campaign_id]
+    
+    async def test_backoff_grows_and_resets(self, db, make_campaign):
+        db.execute = AsyncMock(side_effect=RuntimeError("db down"))
+        dirty = DirtyCampaigns()
+        consumer = DirtyCampaignConsumer(
+            dirty, RuleEngine(), session_factory(db), delay=0.5, batch_size=10, max_backoff=3
+        )
+        
+        assert consumer.backoff() == 0.5
+        for expected in (1, 2, 3, 3):
+            dirty.mark(uuid4())
+            await consumer.process_pending()
+            assert consumer.backoff() == expected
+        
+        campaign = make_campaign()
+        result = MagicMock()
+        result.all.return_value = [tuple(getattr(campaign, column.name) for column in SNAPSHOT_COLUMNS)]
+        db.execute = AsyncMock(return_value=result)
+        await consumer.process_pending()
+        
+        assert consumer.failures == 0
+        assert consumer.backoff() == 0.5
+    
+    async def test_repeated_failures_logged_sparsely(self, db, caplog):
+        db.execute = AsyncMock(side_effect=RuntimeError("db down"))
+        dirty = DirtyCampaigns()
+        consumer = DirtyCampaignConsumer(dirty, RuleEngine(), session_factory(db), delay=0, batch_size=10)
+        
+        for _ in range(8):
+            dirty.mark(uuid4())
+            await consumer.process_pending()
+        
+        assert len([r for r in caplog.records if r.exc_info]) == 4  # 1, 2, 4, 8
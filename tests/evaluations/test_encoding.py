@@ -0,0 +1,77 @@
+import json
+import pytest
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.main import app
+from app.evaluations import router
+from app.evaluations.engine import RuleEngine
+from app.evaluations.encoding import bulk_evaluation_json, ndjson_lines
+from app.evaluations.schemas import BulkEvaluationItem, BulkEvaluationResponse
+from app.core.enums import CampaignStatus, TriggeredRule
+
+
+def make_rows():
+    rows = [(uuid4(), status, rule) for status in CampaignStatus for rule in (None, *TriggeredRule)]
+    return rows + [(uuid4(), CampaignStatus.ACTIVE, None)]
+
+
+def fastapi_body(rows) -> bytes:
+    """Как тело сериализовал бы FastAPI через response_model"""
+    model = BulkEvaluationResponse(
+        evaluated=len(rows),
+        results=[
+            BulkEvaluationItem(campaign_id=campaign_id, target_status=status, triggered_rule=rule)
+            for campaign_id, status, rule in rows
+        ]
+    )
+    return JSONResponse(jsonable_encoder(model)).body
+
+
+class TestBulkEncoding:
+
+    def test_same_bytes_as_response_model(self):
+        rows = make_rows()
+
+        assert bulk_evaluation_json(rows).encode() == fastapi_body(rows)
+
+    def test_empty(self):
+        assert bulk_evaluation_json([]).encode() == fastapi_body([])
+
+    def test_ndjson_same_as_json_dumps(self):
+        rows = make_rows()
+        expected = "".join(
+            json.dumps({
+                "campaign_id": str(campaign_id),
+                "target_status": status.value,
+                "triggered_rule": rule.value if rule else None
+            }) + "\n"
+            for campaign_id, status, rule in rows
+        )
+
+        assert ndjson_lines(rows) == expected
+        assert ndjson_lines([]) == ""
+
+    def test_openapi_schema_unchanged(self):
+        paths = app.openapi()["paths"]
+
+        for path in ("/api/v1/campaigns/evaluate-all", "/api/v1/campaigns/evaluate-due"):
+            schema = paths[path]["post"]["responses"]["200"]["content"]["application/json"]["schema"]
+            assert schema == {"$ref": "#/components/schemas/BulkEvaluationResponse"}
+
+
+@pytest.mark.asyncio
+class TestBulkEndpoints:
+
+    async def test_evaluate_all_returns_json(self, db, monkeypatch):
+        rows = make_rows()
+        monkeypatch.setattr(router, "evaluate_all", AsyncMock(return_value=rows))
+
+        response = await router.evaluate_all_campaigns(False, db, RuleEngine())
+
+        assert response.media_type == "application/json"
+        assert response.body == fastapi_body(rows)
+        assert BulkEvaluationResponse.model_validate_json(response.body).evaluated == len(rows)
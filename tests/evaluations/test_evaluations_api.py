@@ -0,0 +1,44 @@
+import pytest
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+from app.evaluations.router import evaluate_campaign
+from app.evaluations.engine import RuleEngine
+from app.core.enums import CampaignStatus, TriggeredRule
+
+
+@pytest.mark.asyncio
+class TestEvaluationsAPI:
+    
+    async def test_evaluate_campaign(self, db, make_campaign):
+        campaign = make_campaign()
+        db.get = AsyncMock(return_value=campaign)
+        
+        result = await evaluate_campaign(campaign.id, False, db, RuleEngine())
+        
+        assert result.target_status == CampaignStatus.PAUSED
+        assert result.triggered_rule == TriggeredRule.BUDGET_EXCEEDED
+        statements = [str(call.args[0]) for call in db.execute.await_args_list]
+        assert any("INSERT INTO rule_evaluation_logs" in s for s in statements)
+        assert any("UPDATE campaigns SET target_status" in s for s in statements)
+        db.commit.assert_awaited_once()
+    
+    async def test_evaluate_campaign_dry_run(self, db, make_campaign):
+        campaign = make_campaign()
+        db.get = AsyncMock(return_value=campaign)
+        
+        result = await evaluate_campaign(campaign.id, True, db, RuleEngine())
+        
+        assert result.target_status == CampaignStatus.PAUSED
+        assert not db.execute.called
+        assert not db.commit.called
+    
+    async def test_evaluate_campaign_not_found(self, db):
+        from fastapi import HTTPException
+        
+        db.get = AsyncMock(return_value=None)
+        
+        with pytest.raises(HTTPException) as exc:
+            await evaluate_campaign(uuid4(), False, db, RuleEngine())
+        
+        assert exc.value.status_code == 404
@@ -0,0 +1,81 @@
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from app.evaluations.batch import CampaignBatch
+from app.evaluations.engine import RuleEngine
+from app.evaluations.hooks import EngineHook, instrument_check
+from app.rules import get_all_rules
+from app.core.enums import CampaignStatus, TriggeredRule
+
+
+class RecordingHook(EngineHook):
+    
+    def __init__(self):
+        self.events = []
+    
+    def before_rule(self, rule, campaign):
+        self.events.append(("before", rule))
+    
+    def after_rule(self, rule, campaign, triggered, details, elapsed):
+        assert elapsed >= 0
+        self.events.append(("after", rule, triggered))
+    
+    def after_evaluate(self, campaign, status, rule, elapsed):
+        self.events.append(("evaluate", status, rule))
+    
+    def after_batch(self, batch, statuses, rules, rule_timings, elapsed):
+        self.events.append(("batch", len(statuses), set(rule_timings)))
+
+
+@pytest.fixture
+def hook():
+    hook = RecordingHook()
+    RuleEngine.add_hook(hook)
+    yield hook
+    RuleEngine.remove_hook(hook)
+
+
+@pytest.mark.asyncio
+class TestEngineHooks:
+    
+    async def test_rule_and_evaluate_events(self, hook, make_campaign):
+        status, rule, _ = await RuleEngine().evaluate(make_campaign(), [], datetime(2024, 1, 10))
+        
+        assert rule == TriggeredRule.BUDGET_EXCEEDED
+        assert hook.events == [
+            ("before", TriggeredRule.DISABLED_MANAGEMENT),
+            ("after", TriggeredRule.DISABLED_MANAGEMENT, False),
+            ("before", TriggeredRule.SCHEDULE),
+            ("after", TriggeredRule.SCHEDULE, False),
+            ("before", TriggeredRule.LOW_STOCK),
+            ("after", TriggeredRule.LOW_STOCK, False),
+            ("before", TriggeredRule.BUDGET_EXCEEDED),
+            ("after", TriggeredRule.BUDGET_EXCEEDED, True),
+            ("evaluate", CampaignStatus.PAUSED, TriggeredRule.BUDGET_EXCEEDED),
+        ]
+    
+    async def test_batch_event_has_rule_timings(self, hook, make_campaign):
+        campaigns = [make_campaign(), make_campaign()]
+        batch = CampaignBatch.from_campaigns(campaigns, {}, datetime(2024, 1, 10))
+        
+        RuleEngine().evaluate_batch(batch)
+        
+        assert hook.events == [("batch", 2, {r.rule_name for r in get_all_rules()})]
+    
+    async def test_removed_hook_is_not_called(self, make_campaign):
+        hook = RecordingHook()
+        RuleEngine.add_hook(hook)
+        RuleEngine.remove_hook(hook)
+        
+        await RuleEngine().evaluate(make_campaign(), [], datetime(2024, 1, 10))
+        
+        assert hook.events == []
+    
+    async def test_noop_hooks_leave_checks_unwrapped(self):
+        check = MagicMock(return_value=(False, None))
+        
+        # Без хуков или с хуком без переопределенных методов оберток нет
+        assert instrument_check(check, TriggeredRule.SCHEDULE, ()) is check
+        assert instrument_check(check, TriggeredRule.SCHEDULE, [EngineHook()]) is check
+        assert instrument_check(check, TriggeredRule.SCHEDULE, [RecordingHook()]) is not check
@@ -0,0 +1,75 @@
+import pytest
+from datetime import datetime, time
+from decimal import Decimal
+
+from app.evaluations.engine import RuleEngine
+from app.evaluations.fingerprint import campaign_fingerprint
+from app.evaluations.service import evaluate_campaigns
+from app.core.enums import CampaignStatus, LogPolicy
+
+
+class TestFingerprint:
+    
+    def test_stable(self, make_campaign, make_slot):
+        campaign = make_campaign()
+        slots = [make_slot(2, time(9), time(21)), make_slot(1, time(9), time(21))]
+        
+        assert campaign_fingerprint(campaign, slots) == campaign_fingerprint(campaign, list(reversed(slots)))
+    
+    def test_changes_with_inputs(self, make_campaign):
+        campaign = make_campaign()
+        before = campaign_fingerprint(campaign, [])
+        campaign.spend_today = Decimal('60.00')
+        
+        assert campaign_fingerprint(campaign, []) != before
+
+
+class TestShouldLog:
+    
+    def test_always(self, make_campaign):
+        campaign = make_campaign()
+        
+        assert RuleEngine().should_log(campaign, CampaignStatus.ACTIVE, [], LogPolicy.ALWAYS) == (True, None)
+    
+    def test_on_transition(self, make_campaign):
+        engine = RuleEngine()
+        campaign = make_campaign()
+        
+        assert engine.should_log(campaign, CampaignStatus.ACTIVE, [], LogPolicy.ON_TRANSITION) == (False, None)
+        assert engine.should_log(campaign, CampaignStatus.PAUSED, [], LogPolicy.ON_TRANSITION) == (True, None)
+    
+    def test_on_input_change(self, make_campaign):
+        engine = RuleEngine()
+        campaign = make_campaign()
+        
+        write_log, fingerprint = engine.should_log(campaign, CampaignStatus.ACTIVE, [], LogPolicy.ON_INPUT_CHANGE)
+        assert write_log is True
+        assert fingerprint == campaign_fingerprint(campaign, [])
+        
+        campaign.evaluation_fingerprint = fingerprint
+        assert engine.should_log(campaign, CampaignStatus.ACTIVE, [], LogPolicy.ON_INPUT_CHANGE) == (False, None)
+        assert engine.should_log(campaign, CampaignStatus.PAUSED, [], LogPolicy.ON_INPUT_CHANGE) == (True, None)
+
+
+@pytest.mark.asyncio
+class TestBulkLogPolicy:
+    
+    async def test_unchanged_campaign_skips_log(self, db, monkeypatch, make_campaign):
+        monkeypatch.setattr("app.evaluations.engine.settings.EVALUATION_LOG_POLICY", LogPolicy.ON_INPUT_CHANGE)
+        campaign = make_campaign(spend_today=Decimal('50'))
+        campaign.evaluation_fingerprint = campaign_fingerprint(campaign, [])
+        
+        await evaluate_campaigns(RuleEngine(), db, [campaign], {}, datetime(2024, 1, 10))
+        
+        assert not db.execute.called
+    
+    async def test_changed_campaign_logs_and_stores_fingerprint(self, db, monkeypatch, make_campaign):
+        monkeypatch.setattr("app.evaluations.engine.settings.EVALUATION_LOG_POLICY", LogPolicy.ON_INPUT_CHANGE)
+        campaign = make_campaign()
+        
+        await evaluate_campaigns(RuleEngine(), db, [campaign], {}, datetime(2024, 1, 10))
+        
+        statements = [str(call.args[0]) for call in db.execute.await_args_list]
+        assert any("INSERT INTO rule_evaluation_logs" in s for s in statements)
+        assert any("evaluation_fingerprint" in s for s in statements)
+        assert campaign.evaluation_fingerprint == campaign_fingerprint(campaign, [])
@@ -0,0 +1,165 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from datetime import datetime, time
+from decimal import Decimal
+from uuid import uuid4
+
+from app.evaluations.log_sink import EvaluationLogSink
+from app.evaluations.models import RuleEvaluationLog
+from app.evaluations.engine import RuleEngine
+from app.campaigns.models import Campaign
+from app.schedules.models import CampaignSchedule
+from app.core.enums import CampaignStatus, TriggeredRule
+
+
+def make_row():
+    return {
+        "campaign_id": uuid4(),
+        "triggered_rule": TriggeredRule.LOW_STOCK,
+        "previous_target": None,
+        "new_target": CampaignStatus.PAUSED,
+        "created_at": datetime(2024, 1, 10, 15, 30),
+        "current_status": CampaignStatus.ACTIVE,
+        "is_managed": True,
+        "budget_limit": None,
+        "spend_today": Decimal("10.50"),
+        "stock_days_left": 1,
+        "stock_days_min": 3,
+        "schedule_enabled": True,
+        "current_weekday": 2,
+        "schedules_count": 1,
+        "schedule_excerpt": [[2, "09:00:00", "18:00:00"]],
+        "engine_version": "1.0",
+    }
+
+
+@pytest.mark.asyncio
+class TestEvaluationLogSink:
+    
+    async def test_insert_in_batches(self, db):
+        sink = EvaluationLogSink(db, batch_size=2, use_copy=False)
+        for _ in range(5):
+            await sink.add(make_row())
+        
+        assert [len(call.args[1]) for call in db.execute.await_args_list] == [2, 2]
+        assert len(sink) == 1
+        
+        assert await sink.flush() == 1
+        assert sink.written == 5
+        assert len(sink) == 0
+        assert [len(call.args[1]) for call in db.execute.await_args_list] == [2, 2, 1]
+        assert all(row["id"] is not None for call in db.execute.await_args_list for row in call.args[1])
+    
+    async def test_flush_empty(self, db):
+        sink = EvaluationLogSink(db, batch_size=2, use_copy=False)
+        
+        assert await sink.flush() == 0
+        assert not db.execute.called
+    
+    async def test_copy(self, db):
+        driver = MagicMock()
+        driver.copy_records_to_table = AsyncMock()
+        raw = MagicMock()
+        raw.driver_connection = driver
+        connection = MagicMock()
+        connection.get_raw_connection = AsyncMock(return_value=raw)
+        db.connection = AsyncMock(return_value=connection)
+        
+        sink = EvaluationLogSink(db, batch_size=10, use_copy=True)
+        row = make_row()
+        await sink.add(row)
+        await sink.flush()
+        
+        db.flush.assert_awaited()
+        args, kwargs = driver.copy_records_to_table.await_args
+        assert args[0] == "rule_evaluation_logs"
+        record = kwargs["records"][0]
+        assert record[1] == row["campaign_id"]
+        assert record[2:5] == ("LOW_STOCK", None, "PAUSED")
+        assert record[6] == "ACTIVE"
+        assert record[9] == Decimal("10.50")
+        assert record[15] == '[[2, "09:00:00", "18:00:00"]]'
+        assert len(record) == len(RuleEvaluationLog.__table__.columns)
+
+
+class TestLogRow:
+    
+    def test_typed_columns_and_context(self):
+        campaign = Campaign(
+            id=uuid4(),
+            name="test",
+            current_status=CampaignStatus.ACTIVE,
+            target_status=CampaignStatus.ACTIVE,
+            is_managed=True,
+            budget_limit=Decimal("100.00"),
+            spend_today=Decimal("150.00"),
+            stock_days_left=None,
+            stock_days_min=None,
+            schedule_enabled=True,
+        )
+        schedules = [
+            CampaignSchedule(day_of_week=day, start_time=time(9), end_time=time(18))
+            for day in range(7)
+        ]
+        current_time = datetime(2024, 1, 10, 15, 30)
+        
+        row = RuleEngine().build_log_row(
+            campaign, CampaignStatus.PAUSED, TriggeredRule.BUDGET_EXCEEDED, schedules, current_time
+        )
+        
+        assert row["spend_today"] == Decimal("150.00")
+        assert row["current_weekday"] == 2
+        assert row["schedules_count"] == 7
+        assert len(row["schedule_excerpt"]) == 5
+        assert row["schedule_excerpt"][0] == [0, "09:00:00", "18:00:00"]
+        
+        # Ответ evaluation-history сохраняет прежний формат context
+        context = RuleEvaluationLog(**row).context
+        assert context["budget_limit"] == "100.00"
+        assert context["spend_today"] == "150.00"
+        assert context["current_status"] == "active"
+        assert context["current_time"] == current_time.isoformat()
+        assert context["schedules"][0] == {"day": 0, "start": "09:00:00", "end": "18:00:00"}
+    
+    def test_excerpt_sorted_by_day_and_time(self):
+        campaign = Campaign(
+            id=uuid4(),
+            current_status=CampaignStatus.ACTIVE,
+            target_status=CampaignStatus.ACTIVE,
+            is_managed=True,
+            budget_limit=None,
+            spend_today=Decimal("0"),
+            schedule_enabled=True,
+        )
+        # Порядок загрузки не совпадает с порядком SQL-бэкенда (день, начало, конец)
+        schedules = [
+            CampaignSchedule(day_of_week=day, start_time=time(start), end_time=time(end))
+            for day, start, end in [(6, 9, 18), (3, 12, 20), (0, 10, 12), (3, 8, 20), (5, 0, 1), (0, 10, 11)]
+        ]
+        
+        row = RuleEngine().build_log_row(campaign, CampaignStatus.ACTIVE, None, schedules, datetime(2024, 1, 10))
+        
+        assert row["schedules_count"] == 6
+        assert row["schedule_excerpt"] == [
+            [0, "10:00:00", "11:00:00"],
+            [0, "10:00:00", "12:00:00"],
+            [3, "08:00:00", "20:00:00"],
+            [3, "12:00:00", "20:00:00"],
+            [5, "00:00:00", "01:00:00"],
+        ]
+    
+    def test_no_schedules(self):
+        campaign = Campaign(
+            id=uuid4(),
+            current_status=CampaignStatus.ACTIVE,
+            target_status=CampaignStatus.ACTIVE,
+            is_managed=False,
+            budget_limit=None,
+            spend_today=Decimal("0"),
+            schedule_enabled=False,
+        )
+        
+        row = RuleEngine().build_log_row(campaign, CampaignStatus.ACTIVE, None, [], datetime(2024, 1, 10))
+        
+        assert row["schedule_excerpt"] is None
+        assert RuleEvaluationLog(**row).context["schedules"] == []
@@ -0,0 +1,148 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from datetime import date, datetime
+from uuid import uuid4
+
+from fastapi import HTTPException
+
+from app.evaluations.partitions import (
+    partition_name,
+    partition_day,
+    ensure_partitions,
+    drop_partitions_before,
+    maintain_partitions,
+)
+from app.evaluations.router import get_history
+from app.core.pagination import encode_cursor
+
+
+def mock_partitions(db, names):
+    result = MagicMock()
+    result.all.return_value = [(name,) for name in names]
+    result.scalars.return_value.all.return_value = []
+    result.scalar.return_value = None
+    db.execute = AsyncMock(return_value=result)
+    return result
+
+
+def executed_sql(db):
+    return [str(call.args[0]) for call in db.execute.await_args_list]
+
+
+class TestPartitionNames:
+    
+    def test_roundtrip(self):
+        assert partition_name(date(2024, 1, 10)) == "rule_evaluation_logs_p20240110"
+        assert partition_day("rule_evaluation_logs_p20240110") == date(2024, 1, 10)
+    
+    def test_default_partition_ignored(self):
+        assert partition_day("rule_evaluation_logs_default") is None
+
+
+@pytest.mark.asyncio
+class TestPartitionMaintenance:
+    
+    async def test_ensure_creates_missing(self, db):
+        mock_partitions(db, ["rule_evaluation_logs_p20240110"])
+        
+        created = await ensure_partitions(db, date(2024, 1, 10), 2)
+        
+        assert created == ["rule_evaluation_logs_p20240111"]
+        assert "FOR VALUES FROM ('2024-01-11') TO ('2024-01-12')" in executed_sql(db)[-1]
+    
+    async def test_each_partition_in_own_transaction(self, db):
+        result = mock_partitions(db, [])
+        
+        async def execute(sql, *args):
+            if "CREATE" in str(sql) and "2024-01-10" in str(sql):
+                raise RuntimeError("default partition contains rows")
+            return result
+        db.execute.side_effect = execute
+        
+        created = await ensure_partitions(db, date(2024, 1, 10), 2)
+        
+        assert created == ["rule_evaluation_logs_p20240111"]
+        db.rollback.assert_awaited_once()
+        assert db.commit.await_count == 2
+    
+    async def test_rows_moved_out_of_default(self, db):
+        result = mock_partitions(db, ["rule_evaluation_logs_default"])
+        result.scalars.return_value.all.return_value = [date(2024, 1, 8)]
+        result.scalar.return_value = 1
+        
+        created = await ensure_partitions(db, date(2024, 1, 10), 1)
+        
+        assert created == ["rule_evaluation_logs_p20240108", "rule_evaluation_logs_p20240110"]
+        sql = executed_sql(db)
+        detach = next(i for i, s in enumerate(sql) if "DETACH PARTITION" in s)
+        assert "PARTITION OF" in sql[detach + 1]
+        assert sql[detach + 2].startswith('INSERT INTO "rule_evaluation_logs_p20240108"')
+        assert sql[detach + 3].startswith("DELETE FROM")
+        assert "ATTACH PARTITION" in sql[detach + 4]
+    
+    async def test_today_from_database(self, db):
+        result = mock_partitions(db, ["rule_evaluation_logs_p20240110"])
+        result.scalar_one.return_value = date(2024, 1, 10)
+        
+        outcome = await maintain_partitions(db, retention_days=0, days_ahead=0)
+        
+        assert executed_sql(db)[0] == "SELECT CURRENT_DATE"
+        assert outcome["created"] == []
+    
+    async def test_drop_before_cutoff(self, db):
+        mock_partitions(db, [
+            "rule_evaluation_logs_default",
+            "rule_evaluation_logs_p20240101",
+            "rule_evaluation_logs_p20240110",
+        ])
+        
+        dropped = await drop_partitions_before(db, date(2024, 1, 5))
+        
+        assert dropped == ["rule_evaluation_logs_p20240101"]
+        assert not any("DELETE" in sql for sql in executed_sql(db))
+    
+    async def test_retention_disabled(self, db):
+        mock_partitions(db, ["rule_evaluation_logs_p20000101"])
+        
+        result = await maintain_partitions(db, date(2024, 1, 10), retention_days=0, days_ahead=0)
+        
+        assert result["dropped"] == []
+        db.commit.assert_awaited()
+
+
+@pytest.mark.asyncio
+class TestHistoryWindow:
+    
+    async def test_window_filters_created_at(self, db):
+        db.get = AsyncMock(return_value=MagicMock())
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = []
+        db.execute = AsyncMock(return_value=result)
+        
+        await get_history(uuid4(), MagicMock(), 0, 50, datetime(2024, 1, 1), datetime(2024, 1, 2), None, db)
+        
+        sql = executed_sql(db)[0]
+        assert "rule_evaluation_logs.created_at >= " in sql
+        assert "rule_evaluation_logs.created_at < " in sql
+
+    
+    async def test_history_cursor(self, db):
+        db.get = AsyncMock(return_value=MagicMock())
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = []
+        db.execute = AsyncMock(return_value=result)
+        cursor = encode_cursor(datetime(2024, 1, 1, 12, 0).isoformat(), uuid4())
+        
+        await get_history(uuid4(), MagicMock(), 0, 50, None, None, cursor, db)
+        
+        sql = executed_sql(db)[0]
+        assert "(rule_evaluation_logs.created_at, rule_evaluation_logs.id) < " in sql
+        assert "OFFSET" not in sql
+    
+    async def test_history_forged_cursor(self, db):
+        db.get = AsyncMock(return_value=MagicMock())
+        
+        with pytest.raises(HTTPException) as exc:
+            await get_history(uuid4(), MagicMock(), 0, 50, None, None, "WzEsMl0", db)  # base64 от [1,2]
+        
+        assert exc.value.status_code == 400
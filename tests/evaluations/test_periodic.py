@@ -0,0 +1,112 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from uuid import uuid4
+
+from app.evaluations import periodic
+from app.evaluations.engine import RuleEngine
+from app.evaluations.periodic import PeriodicEvaluator
+from app.core.enums import CampaignStatus, OverrunPolicy
+
+
+def session_factory(db):
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=db)
+    context.__aexit__ = AsyncMock(return_value=False)
+    return lambda: context
+
+
+def make_evaluator(db=None, overrun=OverrunPolicy.SKIP):
+    return PeriodicEvaluator(
+        engine=RuleEngine(),
+        session_factory=session_factory(db),
+        interval=10,
+        jitter=0,
+        overrun=overrun
+    )
+
+
+class TestNextDelay:
+    
+    def test_waits_rest_of_interval(self):
+        evaluator = make_evaluator()
+        
+        assert evaluator.next_delay(3) == 7
+        assert evaluator.overruns == 0
+    
+    def test_skip_waits_for_next_boundary(self):
+        evaluator = make_evaluator(overrun=OverrunPolicy.SKIP)
+        
+        assert evaluator.next_delay(25) == 5
+        assert evaluator.overruns == 1
+        assert evaluator.skipped == 2
+    
+    def test_queue_runs_immediately(self):
+        evaluator = make_evaluator(overrun=OverrunPolicy.QUEUE)
+        
+        assert evaluator.next_delay(25) == 0
+        assert evaluator.overruns == 1
+        assert evaluator.skipped == 0
+    
+    def test_jitter_is_bounded(self):
+        evaluator = make_evaluator()
+        evaluator.jitter = 2
+        
+        assert all(7 <= evaluator.next_delay(3) <= 9 for _ in range(100))
+    
+    def test_rejects_zero_interval(self):
+        with pytest.raises(ValueError):
+            PeriodicEvaluator(engine=RuleEngine(), interval=0)
+
+
+@pytest.mark.asyncio
+class TestRunOnce:
+    
+    async def test_reuses_evaluate_all(self, db, monkeypatch):
+        evaluate_all = AsyncMock(return_value=[(uuid4(), CampaignStatus.ACTIVE, None)])
+        monkeypatch.setattr(periodic, "evaluate_all", evaluate_all)
+        evaluator = make_evaluator(db)
+        
+        assert await evaluator.run_once() == 1
+        assert evaluate_all.await_args.args[0] is db
+        assert evaluator.runs == 1
+    
+    async def test_error_does_not_stop_loop(self, db, monkeypatch):
+        monkeypatch.setattr(periodic, "evaluate_all", AsyncMock(side_effect=RuntimeError))
+        evaluator = make_evaluator(db)
+        
+        assert await evaluator.run_once() == 0
+        assert evaluator.runs == 0
+
+
+@pytest.mark.asyncio
+class TestDueTicks:
+    
+    async def test_ticks_evaluate_due_between_sweeps(self, db, monkeypatch):
+        evaluate_due = AsyncMock(return_value=[(uuid4(), CampaignStatus.PAUSED, None)])
+        monkeypatch.setattr(periodic, "evaluate_due_owned", evaluate_due)
+        evaluator = make_evaluator(db)
+        evaluator.due_interval = 0.01
+        
+        await evaluator.wait(0.035)
+        
+        # Тик не чаще due_interval; на медленной машине тиков может быть меньше
+        assert 1 <= evaluate_due.await_count <= 3
+        assert evaluate_due.await_args.args[0] is db
+        assert evaluator.due_runs == evaluate_due.await_count
+    
+    async def test_disabled_only_sleeps(self, db, monkeypatch):
+        evaluate_due = AsyncMock(return_value=[])
+        monkeypatch.setattr(periodic, "evaluate_due_owned", evaluate_due)
+        evaluator = make_evaluator(db)
+        evaluator.due_interval = 0
+        
+        await evaluator.wait(0.02)
+        
+        evaluate_due.assert_not_awaited()
+    
+    async def test_due_error_does_not_stop_loop(self, db, monkeypatch):
+        monkeypatch.setattr(periodic, "evaluate_due_owned", AsyncMock(side_effect=RuntimeError))
+        evaluator = make_evaluator(db)
+        
+        assert await evaluator.run_due() == 0
+        assert evaluator.due_runs == 0
@@ -0,0 +1,135 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.core.enums import CampaignStatus, EvaluationBackend, LogPolicy, TriggeredRule
+from app.evaluations import pushdown, service
+from app.evaluations.engine import RuleEngine
+from app.evaluations.hooks import EngineHook
+from app.evaluations.pushdown import (
+    pushdown_supported,
+    use_pushdown,
+    evaluation_statement,
+    evaluate_pushdown,
+)
+from app.rules.base import Rule
+from app.rules.disabled_management import DisabledManagementRule
+
+
+CURRENT_TIME = datetime(2024, 1, 10, 12, 30)
+
+
+def compiled(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class CustomRule(DisabledManagementRule):
+    """Правило только с check(): SQL-версии нет"""
+    sql_condition = Rule.sql_condition
+
+
+class TestPushdownSupported:
+
+    def test_builtin_rules_are_supported(self):
+        assert pushdown_supported(RuleEngine(), LogPolicy.ALWAYS)
+        assert pushdown_supported(RuleEngine(), LogPolicy.ON_TRANSITION)
+
+    def test_input_change_policy_needs_python(self):
+        assert not pushdown_supported(RuleEngine(), LogPolicy.ON_INPUT_CHANGE)
+
+    def test_rule_without_sql_condition(self, monkeypatch):
+        monkeypatch.setattr(RuleEngine, "_rules", [CustomRule()])
+
+        assert not pushdown_supported(RuleEngine(), LogPolicy.ALWAYS)
+
+    def test_hooks_need_python(self):
+        hook = EngineHook()
+        RuleEngine.add_hook(hook)
+        try:
+            assert not pushdown_supported(RuleEngine(), LogPolicy.ALWAYS)
+        finally:
+            RuleEngine.remove_hook(hook)
+
+    def test_backend_setting(self, monkeypatch):
+        monkeypatch.setattr(settings, "EVALUATION_LOG_POLICY", LogPolicy.ALWAYS)
+        monkeypatch.setattr(settings, "EVALUATION_BACKEND", EvaluationBackend.PYTHON)
+        assert not use_pushdown(RuleEngine())
+
+        monkeypatch.setattr(settings, "EVALUATION_BACKEND", EvaluationBackend.SQL)
+        assert use_pushdown(RuleEngine())
+
+
+class TestEvaluationStatement:
+
+    def test_single_statement_with_dml_ctes(self):
+        sql = compiled(evaluation_statement(RuleEngine(), CURRENT_TIME, policy=LogPolicy.ALWAYS))
+
+        assert sql.startswith("WITH evaluated AS")
+        assert "updated AS \n(UPDATE campaigns SET target_status=evaluated.new_target" in sql
+        assert "logged AS \n(INSERT INTO rule_evaluation_logs" in sql
+        assert "campaigns.target_status IS DISTINCT FROM evaluated.new_target" in sql
+
+    def test_rule_conditions_rendered_once(self):
+        sql = compiled(evaluation_statement(RuleEngine(), CURRENT_TIME, policy=LogPolicy.ALWAYS))
+
+        assert sql.count("campaigns.stock_days_left < campaigns.stock_days_min") == 1
+        assert sql.count("campaign_schedules.end_time >=") == 1
+
+    def test_on_transition_filters_logs(self):
+        always = compiled(evaluation_statement(RuleEngine(), CURRENT_TIME, policy=LogPolicy.ALWAYS))
+        transition = compiled(evaluation_statement(RuleEngine(), CURRENT_TIME, policy=LogPolicy.ON_TRANSITION))
+
+        assert "evaluated.new_target IS DISTINCT FROM evaluated.previous_target" not in always
+        assert "evaluated.new_target IS DISTINCT FROM evaluated.previous_target" in transition
+
+
+@pytest.mark.asyncio
+class TestEvaluatePushdown:
+
+    async def test_returns_rows_and_counts_logs(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "EVALUATION_LOG_POLICY", LogPolicy.ON_TRANSITION)
+        written = MagicMock()
+        monkeypatch.setattr(pushdown, "log_rows_written", written)
+        changed, same = uuid4(), uuid4()
+        db.execute.return_value = [
+            (changed, CampaignStatus.PAUSED, TriggeredRule.BUDGET_EXCEEDED, CampaignStatus.ACTIVE),
+            (same, CampaignStatus.ACTIVE, None, CampaignStatus.ACTIVE),
+        ]
+
+        rows = await evaluate_pushdown(db, RuleEngine(), CURRENT_TIME)
+
+        assert rows == [
+            (changed, CampaignStatus.PAUSED, TriggeredRule.BUDGET_EXCEEDED),
+            (same, CampaignStatus.ACTIVE, None),
+        ]
+        written.inc.assert_called_once_with(1)
+        db.commit.assert_not_awaited()
+
+    async def test_dry_run_only_selects(self, db):
+        db.execute.return_value = []
+
+        await evaluate_pushdown(db, RuleEngine(), CURRENT_TIME, dry_run=True)
+        sql = compiled(db.execute.await_args.args[0])
+
+        assert "UPDATE" not in sql and "INSERT" not in sql
+
+    async def test_unsupported_chain_raises(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "EVALUATION_LOG_POLICY", LogPolicy.ON_INPUT_CHANGE)
+
+        with pytest.raises(RuntimeError):
+            await evaluate_pushdown(db, RuleEngine(), CURRENT_TIME)
+
+    async def test_evaluate_managed_uses_sql_backend(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "EVALUATION_LOG_POLICY", LogPolicy.ALWAYS)
+        monkeypatch.setattr(settings, "EVALUATION_BACKEND", EvaluationBackend.SQL)
+        evaluate = AsyncMock(return_value=[])
+        monkeypatch.setattr(service, "evaluate_pushdown", evaluate)
+
+        await service.evaluate_managed(db, RuleEngine(), CURRENT_TIME)
+
+        evaluate.assert_awaited_once()
+        db.commit.assert_awaited_once()
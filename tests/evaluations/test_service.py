@@ -0,0 +1,99 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from datetime import datetime
+from decimal import Decimal
+
+from app.evaluations.engine import RuleEngine
+from app.evaluations.service import stream_evaluations, evaluate_campaigns
+from app.evaluations.snapshots import SNAPSHOT_COLUMNS
+from app.core.enums import CampaignStatus, TriggeredRule
+
+
+def snapshot_row(campaign):
+    return tuple(getattr(campaign, column.name) for column in SNAPSHOT_COLUMNS)
+
+
+def mock_stream(db, chunks):
+    """Серверный курсор: порции строк колонок снимка"""
+    async def partitions(size):
+        for chunk in chunks:
+            yield [snapshot_row(campaign) for campaign in chunk]
+    
+    stream = MagicMock()
+    stream.partitions = partitions
+    db.stream = AsyncMock(return_value=stream)
+
+
+@pytest.mark.asyncio
+class TestStreamEvaluations:
+    
+    async def test_yields_per_chunk(self, db, make_campaign):
+        db.add = MagicMock()
+        chunks = [
+            [make_campaign(spend_today=Decimal('150')), make_campaign(spend_today=Decimal('50'))],
+            [make_campaign(spend_today=Decimal('100'))],
+        ]
+        mock_stream(db, chunks)
+        
+        results = [
+            rows async for rows in stream_evaluations(db, RuleEngine(), chunk_size=2, current_time=datetime(2024, 1, 10))
+        ]
+        
+        assert [len(rows) for rows in results] == [2, 1]
+        assert [rule for _, _, rule in results[0]] == [TriggeredRule.BUDGET_EXCEEDED, None]
+        statements = [str(call.args[0]) for call in db.execute.await_args_list]
+        assert sum("INSERT INTO rule_evaluation_logs" in s for s in statements) == 2
+        assert not db.add.called
+        db.commit.assert_awaited_once()
+    
+    async def test_dry_run_does_not_write(self, db, make_campaign):
+        db.add = MagicMock()
+        campaign = make_campaign(spend_today=Decimal('150'))
+        mock_stream(db, [[campaign]])
+        
+        results = [rows async for rows in stream_evaluations(db, RuleEngine(), dry_run=True)]
+        
+        assert results[0][0][1] == CampaignStatus.PAUSED
+        assert campaign.target_status == CampaignStatus.ACTIVE
+        assert not db.add.called
+        assert not db.execute.called
+        assert not db.commit.called
+
+
+@pytest.mark.asyncio
+class TestSetBasedUpdates:
+    
+    async def test_only_changed_rows_are_updated(self, db, make_campaign):
+        paused = make_campaign(spend_today=Decimal('150'))
+        unchanged = make_campaign(spend_today=Decimal('50'))
+        
+        rows = await evaluate_campaigns(RuleEngine(), db, [paused, unchanged], {}, datetime(2024, 1, 10))
+        
+        assert [status for _, status, _ in rows] == [CampaignStatus.PAUSED, CampaignStatus.ACTIVE]
+        updates = [call.args[0] for call in db.execute.await_args_list if "UPDATE" in str(call.args[0])]
+        assert len(updates) == 1
+        assert updates[0].compile().params["ids"] == [paused.id]
+        assert paused.target_status == CampaignStatus.PAUSED
+    
+    async def test_no_update_when_nothing_changed(self, db, make_campaign):
+        campaign = make_campaign(spend_today=Decimal('50'))
+        
+        await evaluate_campaigns(RuleEngine(), db, [campaign], {}, datetime(2024, 1, 10))
+        
+        assert not any("UPDATE" in str(call.args[0]) for call in db.execute.await_args_list)
+    
+    async def test_evaluate_and_log_uses_persist_results(self, db, make_campaign):
+        db.add = MagicMock()
+        campaign = make_campaign()
+        
+        status, rule, _ = await RuleEngine().evaluate_and_log(campaign, db, [], datetime(2024, 1, 10))
+        
+        assert (status, rule) == (CampaignStatus.PAUSED, TriggeredRule.BUDGET_EXCEEDED)
+        statements = [str(call.args[0]) for call in db.execute.await_args_list]
+        assert any("INSERT INTO rule_evaluation_logs" in s for s in statements)
+        assert any("UPDATE campaigns" in s for s in statements)
+        assert not db.add.called
+        
+        db.execute.reset_mock()
+        await RuleEngine().evaluate_and_log(make_campaign(), db, [], datetime(2024, 1, 10), dry_run=True)
+        assert not db.execute.called
@@ -0,0 +1,137 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from datetime import datetime
+from uuid import UUID, uuid4
+
+from sqlalchemy.dialects import postgresql
+
+from app.evaluations import shards, service
+from app.evaluations.engine import RuleEngine
+from app.evaluations.shards import shard_of, claim_shard, release_shard, evaluate_sharded, evaluate_due_owned
+from app.evaluations.transitions import TransitionQueue
+from app.core.enums import CampaignStatus
+
+
+def mock_shards(db, monkeypatch, free):
+    """Подменяет аренду: свободны только шарды из free"""
+    db.execute.return_value = MagicMock()
+    db.expunge_all = MagicMock()
+    released = []
+    
+    async def claim(db, shard, owner, requested_at, lease_ttl):
+        return shard in free
+    
+    async def release(db, shard, owner, completed):
+        released.append((shard, completed))
+    
+    monkeypatch.setattr(shards, "claim_shard", claim)
+    monkeypatch.setattr(shards, "release_shard", release)
+    return released
+
+
+class TestShardOf:
+    
+    def test_uses_last_two_bytes(self):
+        campaign_id = UUID("00000000-0000-4000-8000-000000000105")
+        
+        assert shard_of(campaign_id, 1000) == 0x0105 % 1000
+    
+    def test_spreads_campaigns(self):
+        counts = [0] * 4
+        for _ in range(4000):
+            counts[shard_of(uuid4(), 4)] += 1
+        
+        assert all(count > 800 for count in counts)
+
+
+@pytest.mark.asyncio
+class TestShardLeases:
+    
+    async def test_claim_is_conditional_upsert(self, db):
+        db.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=3))
+        
+        assert await claim_shard(db, 3, "worker-a", datetime(2024, 1, 10), 60)
+        sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        
+        assert "ON CONFLICT (shard) DO UPDATE" in sql
+        assert "evaluation_shard_leases.leased_until < clock_timestamp()" in sql
+        assert "evaluation_shard_leases.started_at <" in sql
+    
+    async def test_completed_release_keeps_owner(self, db):
+        await release_shard(db, 3, "worker-a", completed=True)
+        completed = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        await release_shard(db, 3, "worker-a", completed=False)
+        failed = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        
+        assert "owner=" not in completed.split("WHERE")[0]
+        assert "owner=" in failed.split("WHERE")[0]
+    
+    async def test_busy_shard_is_not_claimed(self, db):
+        db.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=None))
+        
+        assert not await claim_shard(db, 3, "worker-a", datetime(2024, 1, 10), 60)
+    
+    async def test_evaluates_only_claimed_shards(self, db, monkeypatch):
+        released = mock_shards(db, monkeypatch, free={1, 3})
+        row = (uuid4(), CampaignStatus.ACTIVE, None)
+        evaluate_shard = AsyncMock(return_value=[row])
+        monkeypatch.setattr(shards, "evaluate_shard", evaluate_shard)
+        
+        rows, evaluated = await evaluate_sharded(db, RuleEngine(), shards=4, owner="worker-a")
+        
+        assert sorted(evaluated) == [1, 3]
+        assert rows == [row, row]
+        assert sorted(call.args[2] for call in evaluate_shard.await_args_list) == [1, 3]
+        assert sorted(released) == [(1, True), (3, True)]
+    
+    async def test_failed_shard_is_released(self, db, monkeypatch):
+        released = mock_shards(db, monkeypatch, free={0})
+        monkeypatch.setattr(shards, "evaluate_shard", AsyncMock(side_effect=RuntimeError))
+        
+        with pytest.raises(RuntimeError):
+            await evaluate_sharded(db, RuleEngine(), shards=1, owner="worker-a")
+        
+        db.rollback.assert_awaited_once()
+        assert released == [(0, False)]
+    
+    async def test_rejects_bad_shard_count(self, db):
+        with pytest.raises(ValueError):
+            await evaluate_sharded(db, RuleEngine(), shards=-1)
+    
+    async def test_unclaimed_shards_dropped_from_transition_queue(self, db, monkeypatch):
+        mock_shards(db, monkeypatch, free={0})
+        monkeypatch.setattr(shards, "evaluate_shard", AsyncMock(return_value=[]))
+        queue = TransitionQueue()
+        monkeypatch.setattr(shards, "transition_queue", queue)
+        mine = UUID("00000000-0000-4000-8000-000000000000")
+        other = UUID("00000000-0000-4000-8000-000000000001")
+        for campaign_id in (mine, other):
+            queue.schedule(campaign_id, datetime(2024, 1, 10, 21, 0))
+        
+        await evaluate_sharded(db, RuleEngine(), shards=2, owner="worker-a")
+        
+        assert queue.pop_due(datetime(2024, 1, 10, 21, 0)) == [mine]
+    
+    async def test_two_owners_never_evaluate_same_due_campaign(self, db, monkeypatch):
+        monkeypatch.setattr(shards.settings, "EVALUATION_SHARDS", 2)
+        campaign_id = UUID("00000000-0000-4000-8000-000000000001")  # шард 1
+        leases = {"worker-a": {0}, "worker-b": {1}}
+        monkeypatch.setattr(shards, "owned_shards", AsyncMock(side_effect=lambda db, owner: leases[owner]))
+        monkeypatch.setattr(service, "evaluate_campaigns", AsyncMock(return_value=[]))
+        
+        loaded = {}
+        for owner in leases:
+            # У каждой реплики своя очередь, и обе успели поставить срок этой кампании
+            queue = TransitionQueue()
+            queue.schedule(campaign_id, datetime(2024, 1, 10, 21, 0))
+            monkeypatch.setattr(service, "transition_queue", queue)
+            monkeypatch.setattr(shards, "transition_queue", queue)
+            load = AsyncMock(return_value=([], {}))
+            monkeypatch.setattr(service, "load_snapshots", load)
+            
+            await evaluate_due_owned(db, RuleEngine(), datetime(2024, 1, 10, 21, 1), owner=owner)
+            
+            loaded[owner] = [list(call.args[1]) for call in load.await_args_list]
+            assert len(queue) == 0
+        
+        assert loaded == {"worker-a": [], "worker-b": [[campaign_id]]}
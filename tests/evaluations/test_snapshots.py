@@ -0,0 +1,265 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from datetime import datetime, time
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.evaluations.snapshots import (
+    CampaignSnapshot, ScheduleSlot, SnapshotCache, SNAPSHOT_COLUMNS, snapshot_cache, invalidate_after_commit
+)
+from app.evaluations.service import load_snapshot, load_snapshots, load_campaigns, load_schedules
+from app.evaluations.engine import RuleEngine
+from app.campaigns.models import Campaign
+from app.schedules.models import CampaignSchedule
+from app.core.enums import CampaignStatus, TriggeredRule
+from app.evaluations.dirty import evaluate_dirty
+
+
+@pytest.fixture
+def make_snapshot(make_campaign):
+    def factory(**fields):
+        return CampaignSnapshot.from_model(make_campaign(**fields))
+    return factory
+
+
+@pytest.mark.asyncio
+class TestLoadSnapshots:
+    
+    async def test_campaigns_loaded_by_columns(self, db, make_campaign):
+        campaign = make_campaign(stock_days_left=2, stock_days_min=5)
+        result = MagicMock()
+        result.all.return_value = [(
+            campaign.id, campaign.current_status, campaign.target_status, True,
+            campaign.budget_limit, campaign.spend_today, 2, 5, False, None
+        )]
+        db.execute.return_value = result
+        
+        snapshots = await load_campaigns(db, Campaign.is_managed == True)
+        sql = str(db.execute.await_args.args[0])
+        
+        assert "campaigns.name" not in sql and "campaigns.created_at" not in sql
+        assert isinstance(snapshots[0], CampaignSnapshot)
+        assert (snapshots[0].id, snapshots[0].stock_days_left, snapshots[0].stock_days_min) == (campaign.id, 2, 5)
+        status, rule, _ = await RuleEngine().evaluate(snapshots[0])
+        assert rule == TriggeredRule.LOW_STOCK
+    
+    async def test_schedules_grouped_as_slots(self, db, make_campaign):
+        campaign = make_campaign(schedule_enabled=True)
+        result = MagicMock()
+        result.all.return_value = [(uuid4(), campaign.id, day, time(9), time(21)) for day in (0, 1)]
+        db.execute.return_value = result
+        
+        schedules = await load_schedules(db, [campaign])
+        
+        assert [slot.day_of_week for slot in schedules[campaign.id]] == [0, 1]
+        assert all(isinstance(slot, ScheduleSlot) for slot in schedules[campaign.id])
+
+
+class TestSnapshotCache:
+    
+    def test_hit_and_miss(self, make_snapshot):
+        cache = SnapshotCache(maxsize=10)
+        snapshot = make_snapshot()
+        
+        assert cache.get(snapshot.id) is None
+        cache.put(snapshot)
+        assert cache.get(snapshot.id) is snapshot
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_lru_eviction(self, make_snapshot):
+        cache = SnapshotCache(maxsize=2)
+        first, second, third = make_snapshot(), make_snapshot(), make_snapshot()
+        cache.put(first)
+        cache.put(second)
+        cache.get(first.id)
+        cache.put(third)
+        
+        assert cache.get(second.id) is None
+        assert cache.get(first.id) is first
+        assert cache.stats()["evictions"] == 1
+    
+    def test_unmanaged_not_cached(self, make_snapshot):
+        cache = SnapshotCache(maxsize=10)
+        cache.put(make_snapshot(is_managed=False))
+        
+        assert len(cache) == 0
+    
+    def test_disabled(self, make_snapshot):
+        cache = SnapshotCache(maxsize=0)
+        cache.put(make_snapshot())
+        
+        assert len(cache) == 0
+    
+    def test_invalidate(self, make_snapshot):
+        cache = SnapshotCache(maxsize=10)
+        snapshot = make_snapshot()
+        cache.put(snapshot)
+        cache.invalidate(snapshot.id)
+        
+        assert cache.get(snapshot.id) is None
+    
+    def test_put_ignored_after_invalidation_during_load(self, make_snapshot):
+        cache = SnapshotCache(maxsize=10)
+        stale, other = make_snapshot(), make_snapshot()
+        generation = cache.generation()
+        cache.invalidate(stale.id)
+        
+        cache.put(stale, generation)
+        cache.put(other, generation)
+        
+        assert cache.get(stale.id) is None
+        assert cache.get(other.id) is other
+    
+    def test_forgotten_invalidations_reject_older_loads(self, make_snapshot):
+        cache = SnapshotCache(maxsize=1)
+        snapshot = make_snapshot()
+        generation = cache.generation()
+        cache.invalidate(snapshot.id)
+        cache.invalidate(uuid4())  # вытесняет сброс snapshot.id
+        
+        cache.put(snapshot, generation)
+        assert cache.get(snapshot.id) is None
+        
+        cache.put(snapshot, cache.generation())
+        assert cache.get(snapshot.id) is snapshot
+
+
+@pytest.mark.asyncio
+class TestInvalidateAfterCommit:
+    
+    async def test_invalidated_only_after_commit(self, monkeypatch, make_snapshot):
+        monkeypatch.setattr(snapshot_cache, "maxsize", 10)
+        snapshot = make_snapshot()
+        snapshot_cache.put(snapshot)
+        db = AsyncSession()
+        await db.begin()
+        
+        invalidate_after_commit(db, [snapshot.id])
+        assert snapshot_cache.get(snapshot.id) is snapshot
+        
+        await db.commit()
+        assert snapshot_cache.get(snapshot.id) is None
+    
+    async def test_invalidated_after_rollback(self, monkeypatch, make_snapshot):
+        monkeypatch.setattr(snapshot_cache, "maxsize", 10)
+        snapshot = make_snapshot()
+        snapshot_cache.put(snapshot)
+        db = AsyncSession()
+        await db.begin()
+        
+        invalidate_after_commit(db, [snapshot.id])
+        await db.rollback()
+        
+        assert snapshot_cache.get(snapshot.id) is None
+    
+    async def test_pending_capped_by_cache_size(self, monkeypatch, make_snapshot):
+        monkeypatch.setattr(snapshot_cache, "maxsize", 2)
+        snapshot = make_snapshot()
+        snapshot_cache.put(snapshot)
+        db = AsyncSession()
+        await db.begin()
+        
+        invalidate_after_commit(db, [uuid4(), uuid4()])
+        invalidate_after_commit(db, [uuid4()])
+        assert db.sync_session.info["snapshot_cache_invalidations"] == "clear"
+        assert snapshot_cache.get(snapshot.id) is snapshot
+        
+        await db.commit()
+        assert len(snapshot_cache) == 0
+
+
+@pytest.mark.asyncio
+class TestLoadSnapshot:
+    
+    async def test_cache_hit_skips_db(self, db, monkeypatch, make_snapshot):
+        monkeypatch.setattr(snapshot_cache, "maxsize", 10)
+        snapshot = make_snapshot()
+        snapshot_cache.put(snapshot)
+        
+        assert await load_snapshot(db, snapshot.id) is snapshot
+        assert not db.get.called
+        snapshot_cache.invalidate(snapshot.id)
+    
+    async def test_miss_loads_campaign_and_schedule(self, db, make_campaign):
+        campaign = make_campaign(schedule_enabled=True)
+        slot = CampaignSchedule(id=uuid4(), campaign_id=campaign.id, day_of_week=2,
+                                start_time=time(9), end_time=time(21))
+        db.get = AsyncMock(return_value=campaign)
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = [slot]
+        db.execute = AsyncMock(return_value=result)
+        
+        snapshot = await load_snapshot(db, campaign.id)
+        
+        assert snapshot.id == campaign.id
+        assert snapshot.schedules[0].start_time == time(9)
+    
+    async def test_write_during_load_not_cached(self, db, monkeypatch, make_campaign):
+        monkeypatch.setattr(snapshot_cache, "maxsize", 10)
+        campaign = make_campaign()
+        
+        async def get(model, campaign_id):
+            # PATCH коммитит и сбрасывает кэш, пока загрузка ждет БД
+            snapshot_cache.invalidate(campaign_id)
+            return campaign
+        
+        db.get = AsyncMock(side_effect=get)
+        
+        assert (await load_snapshot(db, campaign.id)).id == campaign.id
+        assert snapshot_cache.get(campaign.id) is None
+    
+    async def test_not_found(self, db):
+        db.get = AsyncMock(return_value=None)
+        
+        assert await load_snapshot(db, uuid4()) is None
+    
+    async def test_bulk_hits_skip_db(self, db, monkeypatch, make_snapshot):
+        monkeypatch.setattr(snapshot_cache, "maxsize", 10)
+        snapshot = make_snapshot(schedule_enabled=True)
+        snapshot.schedules = (ScheduleSlot(uuid4(), snapshot.id, 2, time(9), time(21)),)
+        snapshot_cache.put(snapshot)
+        
+        snapshots, schedules = await load_snapshots(db, [snapshot.id])
+        
+        assert snapshots == [snapshot]
+        assert schedules == {snapshot.id: list(snapshot.schedules)}
+        assert snapshot.compiled_schedule.contains(datetime(2024, 1, 10, 15, 30))  #Ср
+        assert not db.execute.called
+        snapshot_cache.invalidate(snapshot.id)
+    
+    async def test_bulk_misses_loaded_and_cached(self, db, monkeypatch, make_campaign):
+        monkeypatch.setattr(snapshot_cache, "maxsize", 10)
+        campaign = make_campaign(schedule_enabled=True)
+        campaigns_result = MagicMock()
+        campaigns_result.all.return_value = [tuple(getattr(campaign, c.name) for c in SNAPSHOT_COLUMNS)]
+        schedules_result = MagicMock()
+        schedules_result.all.return_value = [(uuid4(), campaign.id, 2, time(9), time(21))]
+        db.execute.side_effect = [campaigns_result, schedules_result]
+        
+        snapshots, schedules = await load_snapshots(db, [campaign.id])
+        
+        assert snapshot_cache.get(campaign.id) is snapshots[0]
+        assert snapshots[0].compiled_schedule is not None
+        assert [slot.day_of_week for slot in schedules[campaign.id]] == [2]
+        snapshot_cache.invalidate(campaign.id)
+    
+    async def test_dirty_evaluation_reads_cache(self, db, monkeypatch, make_snapshot):
+        monkeypatch.setattr(snapshot_cache, "maxsize", 10)
+        snapshot = make_snapshot()
+        snapshot_cache.put(snapshot)
+        db.sync_session = MagicMock(info={})
+        
+        rows = await evaluate_dirty(db, RuleEngine(), [snapshot.id])
+        
+        assert rows == [(snapshot.id, CampaignStatus.PAUSED, TriggeredRule.BUDGET_EXCEEDED)]
+        statements = [str(call.args[0]) for call in db.execute.await_args_list]
+        assert not any(s.startswith("SELECT") for s in statements)
+        snapshot_cache.invalidate(snapshot.id)
+    
+    async def test_engine_accepts_snapshot(self, make_snapshot):
+        status, rule, details = await RuleEngine().evaluate(make_snapshot())
+        
+        assert status == CampaignStatus.PAUSED
+        assert rule == TriggeredRule.BUDGET_EXCEEDED
@@ -0,0 +1,113 @@
+import pytest
+from unittest.mock import MagicMock
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+from app.evaluations.engine import RuleEngine
+from app.evaluations.service import evaluate_campaigns, evaluate_due
+from app.evaluations.transitions import TransitionQueue, transition_queue
+from app.evaluations.snapshots import SNAPSHOT_COLUMNS, ScheduleSlot
+from app.schedules.index import CompiledSchedule
+from app.core.enums import CampaignStatus, TriggeredRule
+
+
+class TestNextTransition:
+    
+    def test_inside_slot(self, make_slot):
+        compiled = CompiledSchedule([make_slot(2, time(9, 0), time(21, 0))])
+        
+        due = compiled.next_transition(datetime(2024, 1, 10, 15, 30))  #Ср
+        assert due == datetime(2024, 1, 10, 21, 0, 0, 1)
+        assert not compiled.contains(due)
+    
+    def test_before_slot(self, make_slot):
+        compiled = CompiledSchedule([make_slot(2, time(9, 0), time(21, 0))])
+        
+        assert compiled.next_transition(datetime(2024, 1, 10, 8, 0)) == datetime(2024, 1, 10, 9, 0)
+    
+    def test_wraps_to_next_week(self, make_slot):
+        compiled = CompiledSchedule([make_slot(2, time(9, 0), time(21, 0))])
+        
+        assert compiled.next_transition(datetime(2024, 1, 13, 12, 0)) == datetime(2024, 1, 17, 9, 0)  #Сб -> Ср
+    
+    def test_empty(self):
+        assert CompiledSchedule([]).next_transition(datetime(2024, 1, 10)) is None
+
+
+class TestTransitionQueue:
+    
+    def test_pop_due(self):
+        queue = TransitionQueue()
+        now = datetime(2024, 1, 10, 12, 0)
+        first, second = uuid4(), uuid4()
+        queue.schedule(first, now)
+        queue.schedule(second, now + timedelta(hours=1))
+        
+        assert queue.pop_due(now) == [first]
+        assert queue.next_due() == now + timedelta(hours=1)
+        assert len(queue) == 1
+    
+    def test_reschedule_replaces_due(self):
+        queue = TransitionQueue()
+        now = datetime(2024, 1, 10, 12, 0)
+        campaign_id = uuid4()
+        queue.schedule(campaign_id, now)
+        queue.schedule(campaign_id, now + timedelta(hours=1))
+        
+        assert queue.pop_due(now) == []
+        assert queue.pop_due(now + timedelta(hours=1)) == [campaign_id]
+    
+    def test_discard(self):
+        queue = TransitionQueue()
+        campaign_id = uuid4()
+        queue.schedule(campaign_id, datetime(2024, 1, 10))
+        queue.discard(campaign_id)
+        
+        assert queue.pop_due(datetime(2024, 1, 11)) == []
+
+
+@pytest.mark.asyncio
+class TestEvaluateDue:
+    
+    async def test_bulk_evaluation_schedules_transition(self, db, make_campaign, make_slot):
+        campaign = make_campaign(budget_limit=None, spend_today=Decimal('0'), schedule_enabled=True)
+        schedules = {campaign.id: [make_slot(2, time(9, 0), time(21, 0))]}
+        
+        await evaluate_campaigns(RuleEngine(), db, [campaign], schedules, datetime(2024, 1, 10, 15, 30))
+        
+        assert transition_queue.pop_due(datetime(2024, 1, 10, 21, 0)) == []
+        assert transition_queue.pop_due(datetime(2024, 1, 10, 21, 1)) == [campaign.id]
+    
+    async def test_evaluates_only_due(self, db, make_campaign, make_slot):
+        campaign = make_campaign(budget_limit=None, spend_today=Decimal('0'), schedule_enabled=True)
+        slots = [make_slot(2, time(9, 0), time(21, 0))]
+        transition_queue.schedule(campaign.id, datetime(2024, 1, 10, 21, 0, 0, 1))
+        
+        for slot in slots:
+            slot.campaign_id = campaign.id
+        campaigns_result = MagicMock()
+        campaigns_result.all.return_value = [tuple(getattr(campaign, column.name) for column in SNAPSHOT_COLUMNS)]
+        schedules_result = MagicMock()
+        schedules_result.all.return_value = [tuple(getattr(slot, field) for field in ScheduleSlot._fields) for slot in slots]
+        db.execute.side_effect = [campaigns_result, schedules_result] + [MagicMock()] * 5
+        
+        rows = await evaluate_due(db, RuleEngine(), datetime(2024, 1, 10, 21, 1))
+        
+        assert rows == [(campaign.id, CampaignStatus.PAUSED, TriggeredRule.SCHEDULE)]
+        db.commit.assert_awaited_once()
+        transition_queue.discard(campaign.id)
+    
+    async def test_requeued_when_db_fails(self, db):
+        campaign_id = uuid4()
+        transition_queue.schedule(campaign_id, datetime(2024, 1, 10, 21, 0, 0, 1))
+        db.execute.side_effect = ConnectionError("connection lost")
+        
+        with pytest.raises(ConnectionError):
+            await evaluate_due(db, RuleEngine(), datetime(2024, 1, 10, 21, 1))
+        
+        assert transition_queue.pop_due(datetime(2024, 1, 10, 21, 1)) == [campaign_id]
+    
+    async def test_nothing_due(self, db):
+        assert await evaluate_due(db, RuleEngine(), datetime(2000, 1, 1)) == []
+        assert not db.execute.called
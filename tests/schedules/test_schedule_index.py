@@ -0,0 +1,111 @@
+from datetime import datetime, time
+from uuid import uuid4
+
+from app.schedules.index import CompiledSchedule, ScheduleIndex
+
+
+class TestCompiledSchedule:
+    
+    def test_inclusive_bounds(self, make_slot):
+        compiled = CompiledSchedule([make_slot(2, time(9, 0), time(21, 0))])
+        
+        assert compiled.contains(datetime(2024, 1, 10, 9, 0))  #Ср 09:00
+        assert compiled.contains(datetime(2024, 1, 10, 21, 0))  #Ср 21:00
+        assert not compiled.contains(datetime(2024, 1, 10, 21, 0, 1))
+        assert not compiled.contains(datetime(2024, 1, 10, 8, 59, 59))
+    
+    def test_other_day(self, make_slot):
+        compiled = CompiledSchedule([make_slot(2, time(9, 0), time(21, 0))])
+        
+        assert not compiled.contains(datetime(2024, 1, 13, 15, 30))  #Сб
+    
+    def test_overlapping_slots_are_merged(self, make_slot):
+        compiled = CompiledSchedule([
+            make_slot(0, time(9, 0), time(12, 0)),
+            make_slot(0, time(11, 0), time(15, 0)),
+            make_slot(0, time(18, 0), time(20, 0)),
+        ])
+        
+        assert compiled.starts == (9 * 3600 * 10**6, 18 * 3600 * 10**6)
+        assert compiled.contains(datetime(2024, 1, 8, 14, 0))  #Пн
+        assert not compiled.contains(datetime(2024, 1, 8, 16, 0))
+    
+    def test_empty(self):
+        compiled = CompiledSchedule([])
+        
+        assert not compiled
+        assert not compiled.contains(datetime(2024, 1, 8, 14, 0))
+
+
+class TestScheduleIndex:
+    
+    def test_cached_until_invalidated(self, make_slot):
+        index = ScheduleIndex()
+        campaign_id = uuid4()
+        slots = [make_slot(2, time(9, 0), time(21, 0))]
+        
+        compiled = index.get(campaign_id, slots)
+        assert index.get(campaign_id, slots) is compiled
+        
+        index.invalidate(campaign_id)
+        assert index.get(campaign_id, slots) is not compiled
+    
+    def test_rebuilt_when_slots_replaced(self, make_slot):
+        index = ScheduleIndex()
+        campaign_id = uuid4()
+        
+        compiled = index.get(campaign_id, [make_slot(2, time(9, 0), time(21, 0))])
+        replaced = index.get(campaign_id, [make_slot(2, time(10, 0), time(11, 0))])
+        
+        assert replaced is not compiled
+        assert not replaced.contains(datetime(2024, 1, 10, 15, 30))
+    
+    def test_lru_eviction(self, make_slot):
+        index = ScheduleIndex(maxsize=2)
+        first, second, third = uuid4(), uuid4(), uuid4()
+        slots = [make_slot(2, time(9, 0), time(21, 0))]
+        
+        compiled = index.get(first, slots)
+        index.get(second, slots)
+        assert index.get(first, slots) is compiled
+        index.get(third, slots)
+        
+        assert len(index) == 2
+        assert index.get(first, slots) is compiled
+        assert second not in index._compiled
+    
+    def test_disabled(self, make_slot):
+        index = ScheduleIndex(maxsize=0)
+        
+        assert index.get(uuid4(), [make_slot(2, time(9, 0), time(21, 0))]).contains(datetime(2024, 1, 10, 15, 30))
+        assert len(index) == 0
+    
+    def test_short_schedule_checked_without_index(self, make_slot):
+        index = ScheduleIndex()
+        slots = [make_slot(2, time(9, 0), time(21, 0))]
+        
+        assert index.contains(uuid4(), slots, datetime(2024, 1, 10, 21, 0))  #Ср 21:00
+        assert not index.contains(uuid4(), slots, datetime(2024, 1, 13, 15, 30))  #Сб
+        assert len(index) == 0
+    
+    def test_get_many_compiles_once(self, make_slot):
+        index = ScheduleIndex()
+        first, second = uuid4(), uuid4()
+        slots = [make_slot(2, time(9, 0), time(21, 0))]
+        
+        compiled = index.get_many({first: slots, second: slots})
+        
+        assert index.get(first, slots) is compiled[first]
+        assert index.get_many({first: slots})[first] is compiled[first]
+    
+    def test_get_many_larger_than_index_is_not_stored(self, make_slot):
+        index = ScheduleIndex(maxsize=1)
+        first = uuid4()
+        slots = [make_slot(2, time(9, 0), time(21, 0))]
+        compiled = index.get(first, slots)
+        
+        many = index.get_many({first: slots, uuid4(): slots})
+        
+        assert many[first] is compiled
+        assert len(index) == 1
+        assert first in index._compiled